@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""转换、口音与查询热点路径的基准测试。
+
+使用 dist 目录中的数据文件，语料由词表中的词条与例句按固定的随机种子组成，同一份数据每次生成的语料完全相同。
+每项基准测试逐项计时，报告吞吐量与延迟分位数；结果可写出为 JSON，并与保存的基线比较。
+
+示例：
+    python benchmark.py
+    python benchmark.py --output results.json
+    python benchmark.py --baseline baseline.json --threshold 0.25
+    python benchmark.py -k convert -k fuzzy --rounds 3
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import platform
+import random
+import sys
+import time
+
+from pathlib import Path
+from typing import Any, Callable, Optional, Sequence
+
+import click
+
+import libpuj.pujpb as pb
+from libpuj import (
+    clear_word_cache,
+    convert,
+    load_accents,
+    load_entries,
+    load_phrases,
+    project_accents,
+    set_word_cache_capacity,
+    word_cache_info,
+)
+from libpuj.pujcommon import Pronunciation, Sentence
+from libpuj.pujutils import PUJUtils
+
+# 允许通过 -h 打印帮助信息。
+CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
+
+DIST_PATH = Path(__file__).resolve().parent / 'dist'
+RESULTS_VERSION = 1
+CORPUS_SEED = 20240101
+DEFAULT_SENTENCES = 2000
+DEFAULT_ROUNDS = 5
+# 与基线比较时，中位延迟变慢或吞吐量下降超过此比例视为退步。
+DEFAULT_THRESHOLD = 0.25
+# 基准测试使用的口音；口音规则较多，能覆盖较长的规则链。
+BENCHMARK_ACCENT = 'ShanTou_ShiQu'
+
+
+@dataclasses.dataclass
+class Corpus:
+    """基准测试语料。"""
+    sentences: list[str]
+    """带声调数字的 ASCII 白话字句子，首字母大写、带标点"""
+    teochew: list[str]
+    """与 `sentences` 对应的汉字句子"""
+
+    @property
+    def words(self) -> list[str]:
+        """全部句子中的音节，按出现顺序排列，含重复。"""
+        return [token for sentence in self.sentences for kind, token, _, _, _ in Sentence.iter_tokens(sentence)
+                if kind == Sentence.TOKEN_WORD]
+
+    def sha256(self) -> str:
+        digest = hashlib.sha256()
+        for sentence, teochew in zip(self.sentences, self.teochew):
+            digest.update(f'{sentence}\t{teochew}\n'.encode('utf-8'))
+        return digest.hexdigest()
+
+
+def build_corpus(phrases: pb.Phrases, sentences: int = DEFAULT_SENTENCES, seed: int = CORPUS_SEED) -> Corpus:
+    """
+    以词表中的例句与词条组成语料：每句随机取 3 至 8 个词，以空格或逗号相连，句末加句号。
+
+    Args:
+        phrases: 词表数据。
+        sentences: 句子数。
+        seed: 随机种子。
+    """
+    units = []
+    for phrase in phrases.phrases:
+        for example in phrase.examples:
+            if example.teochew and example.puj:
+                units.append((example.teochew[0], example.puj[0]))
+        if phrase.teochew and phrase.puj:
+            units.append((phrase.teochew[0], phrase.puj[0]))
+    rng = random.Random(seed)
+    corpus = Corpus([], [])
+    for _ in range(sentences):
+        picked = [units[rng.randrange(len(units))] for _ in range(rng.randint(3, 8))]
+        puj, teochew = picked[0][1], picked[0][0]
+        for han, word in picked[1:]:
+            comma = rng.random() < 0.2
+            puj += (', ' if comma else ' ') + word
+            teochew += ('，' if comma else '') + han
+        corpus.sentences.append(puj[:1].upper() + puj[1:] + '.')
+        corpus.teochew.append(teochew + '。')
+    return corpus
+
+
+@dataclasses.dataclass
+class Benchmark:
+    name: str
+    stage: str
+    """所属的处理阶段，如 `parse`、`fuzzy`、`convert`"""
+    items: Sequence[Any]
+    run: Callable[[Any], Any]
+    """处理一项；每项单独计时"""
+    setup: Optional[Callable[[], None]] = None
+    """每轮开始前调用，不计时"""
+    teardown: Optional[Callable[[], None]] = None
+    """全部轮次结束后调用"""
+
+
+def _load_benchmarks(dist: Path) -> list[Benchmark]:
+    once = [None]
+    return [
+        Benchmark('load.accents', 'load', once, lambda _: load_accents(dist / 'accents.pb')),
+        Benchmark('load.entries', 'load', once, lambda _: load_entries(dist / 'entries.pb', lazy=True)),
+        Benchmark('load.phrases', 'load', once, lambda _: load_phrases(dist / 'phrases.pb')),
+        Benchmark('load.pujutils', 'load', once, lambda _: PUJUtils(
+            dist / 'accents.pb', dist / 'entries.pb', phrases_pb_path=dist / 'phrases.pb')),
+    ]
+
+
+def make_benchmarks(dist: Path, corpus: Corpus) -> list[Benchmark]:
+    """全部基准测试，按处理阶段排列。"""
+    utils = PUJUtils(dist / 'accents.pb', dist / 'entries.pb', phrases_pb_path=dist / 'phrases.pb')
+    accents = list(utils.get_accents())
+    accent = utils.get_accent(BENCHMARK_ACCENT)
+    words = corpus.words
+    prons = [Pronunciation.from_combination(word) for word in words]
+    written = [pron.to_written() for pron in prons]
+    unique_prons = list(dict.fromkeys(prons))
+    accent_prons = [(a, pron) for a in accents for pron in unique_prons]
+    # 未编译声韵转换表的口音，投影时每条规则都执行正则运算。
+    regex_accents = list(load_accents(dist / 'accents.pb', compiled=False).values())
+    lower_sentences = [sentence.lower() for sentence in corpus.sentences]
+    chars = [c for text in corpus.teochew for c in text if PUJUtils.is_cjk_character(c)]
+    transliterator = utils.get_transliterator()
+    cache_capacity = word_cache_info()['capacity']
+
+    def convert_benchmark(name: str, source: str, target: str, fuzzy_rule=None, sentences=corpus.sentences,
+                          cached: bool = True) -> Benchmark:
+        # 不使用单词缓存时，每个单词都经过完整的解析、口音规则与格式化。
+        return Benchmark(
+            name, 'convert', sentences, lambda s: convert(s, source, target, fuzzy_rule),
+            setup=clear_word_cache if cached else lambda: set_word_cache_capacity(0),
+            teardown=None if cached else lambda: set_word_cache_capacity(cache_capacity))
+
+    puj_sentences = [convert(s, 'apuj', 'puj')[0] for s in corpus.sentences]
+    return _load_benchmarks(dist) + [
+        Benchmark('tokenize', 'tokenize', corpus.sentences, lambda s: list(Sentence.iter_tokens(s))),
+        Benchmark('parse.combination', 'parse', words, Pronunciation.from_combination),
+        Benchmark('parse.written', 'parse', written, Pronunciation.from_written),
+        Benchmark('fuzzy.compiled', 'fuzzy', accent_prons, lambda item: item[0].fuzzy_result(item[1])),
+        Benchmark('fuzzy.regex', 'fuzzy', accent_prons, lambda item: item[0]._fuzzy(item[1])),
+        Benchmark('fuzzy.projection', 'fuzzy', [None], lambda _: project_accents(regex_accents, unique_prons)),
+        Benchmark('format.puj', 'format', prons, Pronunciation.to_written),
+        Benchmark('format.ipa', 'format', prons, lambda pron: pron.to_ipa().to_written()),
+        Benchmark('case', 'case', corpus.sentences, lambda s: Sentence.change_letter_case(
+            s.lower(), Sentence.determine_letter_case(s))),
+        convert_benchmark('convert.apuj2puj', 'apuj', 'puj'),
+        convert_benchmark('convert.apuj2puj.uncached', 'apuj', 'puj', cached=False),
+        convert_benchmark('convert.puj2ipa.accent', 'puj', 'ipa', accent, sentences=puj_sentences),
+        convert_benchmark('convert.puj2ipa.accent.uncached', 'puj', 'ipa', accent, sentences=puj_sentences,
+                          cached=False),
+        convert_benchmark('convert.apuj2pitch', 'apuj', 'pitch', accent),
+        Benchmark('sandhi.tones', 'sandhi', lower_sentences, accent.get_sentence_actual_tones),
+        Benchmark('lookup.han', 'lookup', chars, utils.get_entry_from_han),
+        Benchmark('lookup.pronunciation', 'lookup', unique_prons,
+                  lambda pron: utils.get_entry_from_pronunciation(pron.initial, pron.final, pron.tone)),
+        Benchmark('lookup.accent_pronunciation', 'lookup', unique_prons,
+                  lambda pron: utils.get_entry_from_accent_pronunciation(
+                      BENCHMARK_ACCENT, pron.initial, pron.final, pron.tone)),
+        Benchmark('transliterate', 'transliterate', corpus.teochew, transliterator.transliterate),
+    ]
+
+
+def _percentile(sorted_values: list[int], q: float) -> int:
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def run_benchmark(benchmark: Benchmark, rounds: int) -> dict[str, Any]:
+    """
+    先运行一轮预热（不计入结果），再运行 `rounds` 轮并逐项计时。
+
+    Returns:
+        处理项数、总耗时、吞吐量（项/秒）与延迟（微秒）的均值及 p50、p90、p99、最大值。
+    """
+    run = benchmark.run
+    items = benchmark.items
+    latencies: list[int] = []
+    perf_counter_ns = time.perf_counter_ns
+    try:
+        for i in range(rounds + 1):
+            if benchmark.setup is not None:
+                benchmark.setup()
+            round_latencies = []
+            for item in items:
+                start = perf_counter_ns()
+                run(item)
+                round_latencies.append(perf_counter_ns() - start)
+            if i:
+                latencies.extend(round_latencies)
+    finally:
+        if benchmark.teardown is not None:
+            benchmark.teardown()
+    total = sum(latencies)
+    latencies.sort()
+    return {
+        'stage': benchmark.stage,
+        'ops': len(latencies),
+        'seconds': total / 1e9,
+        'ops_per_sec': len(latencies) / (total / 1e9) if total else 0.0,
+        'mean_us': total / len(latencies) / 1e3 if latencies else 0.0,
+        'p50_us': _percentile(latencies, 0.5) / 1e3 if latencies else 0.0,
+        'p90_us': _percentile(latencies, 0.9) / 1e3 if latencies else 0.0,
+        'p99_us': _percentile(latencies, 0.99) / 1e3 if latencies else 0.0,
+        'max_us': latencies[-1] / 1e3 if latencies else 0.0,
+    }
+
+
+def run_benchmarks(dist: Path = DIST_PATH, rounds: int = DEFAULT_ROUNDS, sentences: int = DEFAULT_SENTENCES,
+                   filters: Sequence[str] = (),
+                   progress: Optional[Callable[[str, dict[str, Any]], None]] = None) -> dict[str, Any]:
+    """
+    运行基准测试。
+
+    Args:
+        dist: 数据文件所在目录。
+        rounds: 每项基准测试计时的轮数。
+        sentences: 语料句子数。
+        filters: 只运行名称包含其中任一字符串的基准测试；为空时全部运行。
+        progress: 每项基准测试完成后以 (名称, 结果) 调用。
+
+    Returns:
+        可序列化为 JSON 的结果，`results` 以基准测试名称为键，见 `run_benchmark`。
+    """
+    phrases = pb.Phrases()
+    phrases.ParseFromString((dist / 'phrases.pb').read_bytes())
+    corpus = build_corpus(phrases, sentences)
+    results = {}
+    for benchmark in make_benchmarks(dist, corpus):
+        if filters and not any(f in benchmark.name for f in filters):
+            continue
+        results[benchmark.name] = result = run_benchmark(benchmark, rounds)
+        if progress is not None:
+            progress(benchmark.name, result)
+    return {
+        'version': RESULTS_VERSION,
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'rounds': rounds,
+        'corpus': {
+            'sentences': len(corpus.sentences),
+            'words': len(corpus.words),
+            'sha256': corpus.sha256(),
+        },
+        'results': results,
+    }
+
+
+def compare_results(current: dict[str, Any], baseline: dict[str, Any],
+                    threshold: float = DEFAULT_THRESHOLD) -> list[dict[str, Any]]:
+    """
+    逐项比较两次运行中都有的基准测试。
+
+    Returns:
+        每项一个字典：名称、基线与本次的中位延迟（微秒）及吞吐量、变化比例（正数为变慢），
+        以及中位延迟或吞吐量变化超过 `threshold` 时为 True 的 `regressed`。
+    """
+    comparisons = []
+    for name, result in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            continue
+        p50_change = result['p50_us'] / base['p50_us'] - 1 if base['p50_us'] else 0.0
+        throughput_change = base['ops_per_sec'] / result['ops_per_sec'] - 1 if result['ops_per_sec'] else 0.0
+        comparisons.append({
+            'name': name,
+            'baseline_p50_us': base['p50_us'],
+            'p50_us': result['p50_us'],
+            'baseline_ops_per_sec': base['ops_per_sec'],
+            'ops_per_sec': result['ops_per_sec'],
+            'change': max(p50_change, throughput_change),
+            'regressed': p50_change > threshold or throughput_change > threshold,
+        })
+    return comparisons
+
+
+def _format_result(name: str, result: dict[str, Any]) -> str:
+    return (f"{name:<36} {result['ops_per_sec']:>12.1f}/s  p50 {result['p50_us']:>10.2f}us  "
+            f"p90 {result['p90_us']:>10.2f}us  p99 {result['p99_us']:>10.2f}us")
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.option('--dist', 'dist', type=click.Path(exists=True, file_okay=False, path_type=Path), default=DIST_PATH,
+              show_default=True, help='数据文件（accents.pb、entries.pb、phrases.pb）所在目录。')
+@click.option('--output', '-o', 'output', type=click.Path(dir_okay=False, path_type=Path), default=None,
+              help='将结果以 JSON 写入此文件，可作为以后比较的基线。')
+@click.option('--baseline', '-b', 'baseline', type=click.Path(exists=True, dir_okay=False, path_type=Path),
+              default=None, help='与此 JSON 结果比较；有退步时以状态 1 退出。')
+@click.option('--threshold', type=float, default=DEFAULT_THRESHOLD, show_default=True,
+              help='中位延迟变慢或吞吐量下降超过此比例时视为退步。')
+@click.option('--rounds', '-r', type=click.IntRange(min=1), default=DEFAULT_ROUNDS, show_default=True,
+              help='每项基准测试计时的轮数（另有一轮预热）。')
+@click.option('--sentences', type=click.IntRange(min=1), default=DEFAULT_SENTENCES, show_default=True,
+              help='语料句子数。')
+@click.option('--filter', '-k', 'filters', multiple=True,
+              help='只运行名称包含此字符串的基准测试，可多次指定。')
+def main(dist: Path, output: Optional[Path], baseline: Optional[Path], threshold: float, rounds: int,
+         sentences: int, filters: tuple[str, ...]) -> None:
+    """运行转换、口音与查询热点路径的基准测试。"""
+    results = run_benchmarks(dist, rounds, sentences, filters,
+                             progress=lambda name, result: click.echo(_format_result(name, result)))
+    if output is not None:
+        output.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding='utf-8')
+    if baseline is None:
+        return
+    baseline_results = json.loads(baseline.read_text(encoding='utf-8'))
+    if baseline_results.get('corpus', {}).get('sha256') != results['corpus']['sha256']:
+        click.echo("警告：语料与基线不同（数据文件或 --sentences 不同），比较结果仅供参考。", err=True)
+    comparisons = compare_results(results, baseline_results, threshold)
+    click.echo()
+    for comparison in comparisons:
+        mark = '退步' if comparison['regressed'] else ''
+        click.echo(f"{comparison['name']:<36} p50 {comparison['baseline_p50_us']:>10.2f}us -> "
+                   f"{comparison['p50_us']:>10.2f}us  {comparison['change']:>+8.1%}  {mark}")
+    if any(comparison['regressed'] for comparison in comparisons):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
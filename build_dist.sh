@@ -12,6 +12,7 @@ pushd libpuj
   python3 generate_db.py
 popd
 ls -l dist/entries.pb
+ls -l dist/entries.idx
 ls -l dist/accents.pb
 ls -l dist/phrases.pb
 
@@ -11,36 +11,61 @@
 
 目前支持的源方案：`puj`（白话字 ASCII 形式，如 `peng1`）、
 `dp`（潮拼，如 `bêng1`）。
+
+目标方案 `pitch`、`ipa-sandhi` 按口音的连读变调输出实际调值（见 `SANDHI_TARGETS`），
+以整句为单位转换，须指定口音。
 """
 
 from __future__ import annotations
 
+import collections
 import pathlib
+import threading
+import time
+import unicodedata
 
-from typing import Callable, Optional, Union, Tuple
+from typing import Any, Callable, Hashable, Iterable, Iterator, Mapping, Optional, Union, Tuple
 
 import libpuj.pujpb as pb
 
 from .pujcommon import (
     Accent,
+    AccentSet,
     ConversionError,
     DPPronunciation,
     Entry,
-    FuzzyRuleDescriptor,
     IPAPronunciation,
     Pronunciation,
     PronunciationWilliamDuffus,
     Sentence,
+    SentenceSandhiGroups,
 )
+from .pujentries import LazyEntries
+from .pujphrases import PhraseStore
+from .pujprojection import AccentProjection, project_accents
 
 __all__ = [
+    'AccentProjection',
+    'AccentSet',
+    'ConversionStats',
+    'DeaccentIndex',
+    'LazyEntries',
+    'PhraseStore',
     'convert',
+    'convert_lines',
+    'convert_many',
     'load_accents',
     'load_entries',
+    'load_phrases',
+    'project_accents',
     'try_deaccent',
     'ConversionError',
     'SUPPORTED_SOURCES',
     'SUPPORTED_TARGETS',
+    'SANDHI_TARGETS',
+    'clear_word_cache',
+    'set_word_cache_capacity',
+    'word_cache_info',
 ]
 
 # 口音（模糊音规则）对象的类型。
@@ -49,7 +74,11 @@ FuzzyRuleLike = Optional[Accent]
 # 支持的源拼音方案标识。
 SUPPORTED_SOURCES = ('apuj', 'puj', 'dp', 'duffus')
 # 支持的目标拼音方案标识。
-SUPPORTED_TARGETS = ('apuj', 'puj', 'dp', 'ipa', 'xsampa', 'duffus')
+SUPPORTED_TARGETS = ('apuj', 'puj', 'dp', 'ipa', 'xsampa', 'duffus', 'ipa-sandhi', 'pitch')
+# 按口音连读变调输出实际调值的目标方案，须指定口音：
+# `pitch` 为不带调号的 ASCII 白话字加五度调值数字（如 `ua52`），
+# `ipa-sandhi` 为国际音标加赵元任调型符号（如 `ua˥˨`）。
+SANDHI_TARGETS = ('ipa-sandhi', 'pitch')
 
 
 # 源方案名 -> 解析函数（单个拼音单词 -> Pronunciation）。
@@ -100,6 +129,27 @@ _TARGET_FORMATTERS: dict[str, Callable[[Pronunciation], str]] = {
     'duffus': _pron_to_duffus,
 }
 
+def _pron_to_toneless_apuj(pron: Pronunciation) -> str:
+    """Pronunciation -> 不带调号的白话字(ASCII 形式)。"""
+    return f"{pron.initial}{pron.final}"
+
+
+def _pron_to_toneless_ipa(pron: Pronunciation) -> str:
+    """Pronunciation -> 不带调号的国际音标 (IPA，书面形式)。"""
+    return pron.to_ipa()._replace(tone=0).to_written()
+
+
+def _pitch_to_digits(pitch: int) -> str:
+    """实际调值 -> 五度调值数字，调值为 0 时为空字符串。"""
+    return str(pitch) if pitch else ''
+
+
+# 连读变调目标方案名 -> (格式化函数（Pronunciation -> 不带声调的音节）, 实际调值 -> 调值字符串)。
+_SANDHI_TARGET_FORMATTERS: dict[str, tuple[Callable[[Pronunciation], str], Callable[[int], str]]] = {
+    'ipa-sandhi': (_pron_to_toneless_ipa, IPAPronunciation.pitch_to_tone_letters),
+    'pitch': (_pron_to_toneless_apuj, _pitch_to_digits),
+}
+
 # 目标方案名 -> 对应的输出音标类（用于判断该方案是否区分大小写）。
 _TARGET_OUTPUT_CLASS: dict[str, type] = {
     'apuj': Pronunciation,
@@ -108,6 +158,8 @@ _TARGET_OUTPUT_CLASS: dict[str, type] = {
     'ipa': IPAPronunciation,
     'xsampa': IPAPronunciation,
     'duffus': PronunciationWilliamDuffus,
+    'ipa-sandhi': IPAPronunciation,
+    'pitch': Pronunciation,
 }
 
 
@@ -116,6 +168,181 @@ def _target_has_case(target: str) -> bool:
     return getattr(_TARGET_OUTPUT_CLASS[target], 'has_case')
 
 
+class WordCache:
+    """
+    单词级转换结果的 LRU 缓存。
+
+    以 (源方案, 目标方案, 口音的 `cache_key`, 单词) 为键缓存转换结果（连读变调目标方案缓存
+    (不带声调的音节, 调类)，见 `SandhiWordConverter`）。实际文本中
+    少量音节即可覆盖绝大多数单词，缓存可省去重复的解析、口音规则与格式化。
+    解析失败的单词不缓存。可在多线程中共享。
+
+    Attributes:
+        hits: 命中次数。
+        misses: 未命中次数。
+    """
+
+    def __init__(self, capacity: int = 65536) -> None:
+        """
+        Args:
+            capacity: 最多缓存的条目数；为 0 时不缓存。
+        """
+        self._capacity = capacity
+        self._data: collections.OrderedDict[tuple, Union[str, tuple[str, int]]] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def capacity(self) -> int:
+        """最多缓存的条目数。"""
+        return self._capacity
+
+    @capacity.setter
+    def capacity(self, capacity: int) -> None:
+        with self._lock:
+            self._capacity = max(0, capacity)
+            while len(self._data) > self._capacity:
+                self._data.popitem(last=False)
+
+    def get(self, key: tuple) -> Optional[Union[str, tuple[str, int]]]:
+        """查找缓存，未命中时返回 None。"""
+        if not self._capacity:
+            return None
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: tuple, value: Union[str, tuple[str, int]]) -> None:
+        """写入缓存，超出容量时淘汰最久未使用的条目。"""
+        with self._lock:
+            if not self._capacity:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self._capacity:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """清空缓存并重置计数。"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> dict[str, int]:
+        """返回缓存的命中次数、未命中次数、当前条目数与容量。"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._data),
+                'capacity': self._capacity,
+            }
+
+
+# 所有 WordConverter 与单词转换函数（puj2dp 等）共享的单词缓存。
+_WORD_CACHE = WordCache()
+
+
+def word_cache_info() -> dict[str, int]:
+    """返回共享单词缓存的统计信息，见 `WordCache.info`。"""
+    return _WORD_CACHE.info()
+
+
+def set_word_cache_capacity(capacity: int) -> None:
+    """设置共享单词缓存的容量；设为 0 可关闭缓存。"""
+    _WORD_CACHE.capacity = capacity
+
+
+def clear_word_cache() -> None:
+    """清空共享单词缓存并重置计数。"""
+    _WORD_CACHE.clear()
+
+
+class ConversionStats:
+    """
+    转换流水线各阶段的计数与累计耗时，通过 `convert` 等函数的 `stats` 参数启用。
+
+    阶段包括分词（`tokenize`）、解析（`parse`）、口音规则（`fuzzy`）、格式化（`format`）、
+    连读变调（`sandhi`，仅连读变调目标方案）与恢复大小写（`case`）。口音规则阶段计时的是实际转换
+    所用的 `Accent.fuzzy_result`。命中单词缓存的单词不经过解析、口音规则与格式化，只计入 `cache_hits`。
+    可在多个线程中共用。
+
+    `rule_detail` 为 True 时口音规则另按规则描述符 id 逐条计时，可找出耗时的规则（未编译声韵转换表
+    或转换表未命中时执行正则规则，耗时差别最明显）。逐条应用规则不经过口音整体的转换表与读音缓存，
+    因此口音规则阶段的耗时高于实际转换，仅供分析规则之用。
+
+    不传入 `stats` 时转换不经过任何计时代码。
+    """
+
+    STAGES = ('tokenize', 'parse', 'fuzzy', 'format', 'sandhi', 'case')
+
+    def __init__(self, rule_detail: bool = False) -> None:
+        """
+        Args:
+            rule_detail: 是否按口音规则逐条计时。
+        """
+        self.rule_detail = rule_detail
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """清空全部统计。"""
+        with self._lock:
+            self._stages: dict[str, list] = {stage: [0, 0.0] for stage in self.STAGES}
+            self._rules: dict[str, list] = {}
+            self._cache_hits = 0
+
+    def add(self, stage: str, seconds: float, count: int = 1) -> None:
+        with self._lock:
+            record = self._stages[stage]
+            record[0] += count
+            record[1] += seconds
+
+    def add_rule(self, rule_id: str, seconds: float) -> None:
+        with self._lock:
+            record = self._rules.get(rule_id)
+            if record is None:
+                record = self._rules[rule_id] = [0, 0.0]
+            record[0] += 1
+            record[1] += seconds
+
+    def add_cache_hit(self) -> None:
+        with self._lock:
+            self._cache_hits += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        当前统计的副本，可直接序列化为 JSON：
+
+            {'cache_hits': 3,
+             'stages': {'tokenize': {'count': 2, 'seconds': 0.0001}, ...},
+             'rules': {'N_As_NG': {'count': 5, 'seconds': 0.00002}, ...}}
+
+        `count` 对分词、连读变调与恢复大小写为句数，对其余阶段与口音规则为音节数。
+        未启用 `rule_detail` 时 `rules` 为空。
+        """
+        with self._lock:
+            return {
+                'cache_hits': self._cache_hits,
+                'stages': {stage: {'count': count, 'seconds': seconds}
+                           for stage, (count, seconds) in self._stages.items()},
+                'rules': {rule_id: {'count': count, 'seconds': seconds}
+                          for rule_id, (count, seconds) in self._rules.items()},
+            }
+
+
+def _rule_cache_key(fuzzy_rule: FuzzyRuleLike) -> Hashable:
+    # 单词缓存键中的口音部分，见 `Accent.cache_key`。
+    return None if fuzzy_rule is None else getattr(fuzzy_rule, 'cache_key', fuzzy_rule)
+
+
 class WordConverter:
     """
     将单个拼音单词从 `source` 方案转换为 `target` 方案的转换器。
@@ -126,13 +353,19 @@ class WordConverter:
 
     Attributes:
         errors: 转换过程中记录的解析错误消息列表。
+        stats: 记录各阶段耗时的 `ConversionStats`，仅 `InstrumentedWordConverter` 等计时的转换器设置。
     """
 
+    stats: Optional[ConversionStats] = None
+
     def __init__(self, source: str, target: str,
                  fuzzy_rule: FuzzyRuleLike = None) -> None:
+        self.source = source
+        self.target = target
         self.parser = _SOURCE_PARSERS[source]
         self.formatter = _TARGET_FORMATTERS[target]
         self.fuzzy_rule = fuzzy_rule
+        self._rule_key = _rule_cache_key(fuzzy_rule)
         self.errors: list[str] = []
 
     @property
@@ -141,6 +374,10 @@ class WordConverter:
         return bool(self.errors)
 
     def __call__(self, word: str) -> str:
+        key = (self.source, self.target, self._rule_key, word)
+        result = _WORD_CACHE.get(key)
+        if result is not None:
+            return result
         try:
             pron = self.parser(word)
         except ConversionError as e:
@@ -148,17 +385,207 @@ class WordConverter:
             return word
         if self.fuzzy_rule is not None:
             pron = self.fuzzy_rule.fuzzy_result(pron)
-        return self.formatter(pron)
+        result = self.formatter(pron)
+        _WORD_CACHE.put(key, result)
+        return result
+
+
+class SandhiWordConverter(WordConverter):
+    """
+    连读变调目标方案（见 `SANDHI_TARGETS`）的转换器。
+
+    单词只转换为不带声调的音节与调类并缓存；实际调值取决于单词在连调单位中的位置，
+    由 `convert_sentence` 对整句划分连调单位后按口音的调值表一次求出。
+    """
+
+    def __init__(self, source: str, target: str, fuzzy_rule: Accent) -> None:
+        if fuzzy_rule is None or getattr(fuzzy_rule, 'citation_tones', None) is None:
+            raise ConversionError(f"目标拼音方案 {target!r} 须指定口音")
+        self.source = source
+        self.target = target
+        self.parser = _SOURCE_PARSERS[source]
+        self.formatter, self.pitch_formatter = _SANDHI_TARGET_FORMATTERS[target]
+        self.fuzzy_rule = fuzzy_rule
+        self._rule_key = _rule_cache_key(fuzzy_rule)
+        self.errors: list[str] = []
+
+    def split(self, word: str) -> tuple[Optional[str], int]:
+        """
+        将单词转换为 (不带声调的音节, 调类)。解析失败时记录错误并返回 (None, 0)。
+        """
+        key = (self.source, self.target, self._rule_key, word)
+        result = _WORD_CACHE.get(key)
+        if result is not None:
+            return result
+        try:
+            pron = self.parser(word)
+        except ConversionError as e:
+            self.errors.append(str(e))
+            return None, 0
+        pron = self.fuzzy_rule.fuzzy_result(pron)
+        result = self.formatter(pron), pron.tone
+        _WORD_CACHE.put(key, result)
+        return result
+
+    def __call__(self, word: str) -> str:
+        syllable, _ = self.split(word)
+        return word if syllable is None else syllable
+
+    def convert_sentence(self, sentence: str) -> str:
+        """
+        转换整句：按连字符划分连调单位（见 `Sentence.build_sandhi_groups`），
+        每个音节输出为不带声调的音节加实际调值，非单词片段原样保留。
+        """
+        sentence = unicodedata.normalize('NFD', sentence)
+        groups, syllables = self._build_sandhi_groups(sentence)
+        return self._render_sentence(sentence, groups, syllables)
+
+    def _build_sandhi_groups(self, sentence: str) -> tuple[SentenceSandhiGroups, list[str]]:
+        syllables = []
+
+        def tone_number_of(word: str) -> int:
+            syllable, tone_number = self.split(word)
+            syllables.append(word if syllable is None else syllable)
+            return tone_number
+
+        return Sentence.build_sandhi_groups(sentence, tone_number_of), syllables
+
+    def _render_sentence(self, sentence: str, groups: SentenceSandhiGroups, syllables: list[str]) -> str:
+        pitches = self.fuzzy_rule.get_sentence_actual_tones(groups)
+        result = []
+        position = 0
+        for syllable, (start, end), tone_number, pitch in zip(syllables, groups.spans, groups.tone_numbers, pitches):
+            result.append(sentence[position:start])
+            result.append(syllable)
+            if tone_number:
+                result.append(self.pitch_formatter(pitch))
+            position = end
+        result.append(sentence[position:])
+        return ''.join(result)
+
+
+def _timed_fuzzy_rules(fuzzy_rule: Accent, pron: Pronunciation, stats: ConversionStats) -> Pronunciation:
+    # 逐条规则应用并分别计时，与 `Accent._fuzzy_initial_final` 的规则链等价，结果与 `fuzzy_result` 相同。
+    rules = getattr(fuzzy_rule, 'rules', None)
+    if rules is None:
+        return fuzzy_rule.fuzzy_result(pron)
+    perf_counter = time.perf_counter
+    initial, final = pron.initial, pron.final
+    for rule in rules:
+        start = perf_counter()
+        initial, final = rule.transition(initial, final)
+        stats.add_rule(rule.descriptor_id, perf_counter() - start)
+    return pron._replace(initial=initial, final=final)
+
+
+def _timed_convert_word(converter: WordConverter, word: str, stats: ConversionStats):
+    # 依次解析、应用口音规则，分别计时。返回读音，解析失败时记录错误并返回 None。
+    perf_counter = time.perf_counter
+    start = perf_counter()
+    try:
+        pron = converter.parser(word)
+    except ConversionError as e:
+        converter.errors.append(str(e))
+        return None
+    finally:
+        stats.add('parse', perf_counter() - start)
+    if converter.fuzzy_rule is not None:
+        start = perf_counter()
+        if stats.rule_detail:
+            pron = _timed_fuzzy_rules(converter.fuzzy_rule, pron, stats)
+        else:
+            pron = converter.fuzzy_rule.fuzzy_result(pron)
+        stats.add('fuzzy', perf_counter() - start)
+    return pron
+
+
+class InstrumentedWordConverter(WordConverter):
+    """
+    记录各阶段耗时的 `WordConverter`，转换结果与 `WordConverter` 相同。见 `ConversionStats`。
+    """
+
+    def __init__(self, source: str, target: str, fuzzy_rule: FuzzyRuleLike = None,
+                 stats: Optional[ConversionStats] = None) -> None:
+        super().__init__(source, target, fuzzy_rule)
+        self.stats = stats if stats is not None else ConversionStats()
+
+    def __call__(self, word: str) -> str:
+        key = (self.source, self.target, self._rule_key, word)
+        result = _WORD_CACHE.get(key)
+        if result is not None:
+            self.stats.add_cache_hit()
+            return result
+        pron = _timed_convert_word(self, word, self.stats)
+        if pron is None:
+            return word
+        start = time.perf_counter()
+        result = self.formatter(pron)
+        self.stats.add('format', time.perf_counter() - start)
+        _WORD_CACHE.put(key, result)
+        return result
+
+
+class InstrumentedSandhiWordConverter(SandhiWordConverter):
+    """
+    记录各阶段耗时的 `SandhiWordConverter`。划分连调单位计入分词，求实际调值并输出整句计入连读变调。
+    """
+
+    def __init__(self, source: str, target: str, fuzzy_rule: Accent,
+                 stats: Optional[ConversionStats] = None) -> None:
+        super().__init__(source, target, fuzzy_rule)
+        self.stats = stats if stats is not None else ConversionStats()
+        # 当前句子中单词转换的耗时，从划分连调单位的耗时中扣除。
+        self._split_seconds = 0.0
+
+    def split(self, word: str) -> tuple[Optional[str], int]:
+        start = time.perf_counter()
+        key = (self.source, self.target, self._rule_key, word)
+        result = _WORD_CACHE.get(key)
+        if result is not None:
+            self.stats.add_cache_hit()
+        else:
+            pron = _timed_convert_word(self, word, self.stats)
+            if pron is None:
+                result = None, 0
+            else:
+                format_start = time.perf_counter()
+                result = self.formatter(pron), pron.tone
+                self.stats.add('format', time.perf_counter() - format_start)
+                _WORD_CACHE.put(key, result)
+        self._split_seconds += time.perf_counter() - start
+        return result
+
+    def convert_sentence(self, sentence: str) -> str:
+        start = time.perf_counter()
+        sentence = unicodedata.normalize('NFD', sentence)
+        self._split_seconds = 0.0
+        groups, syllables = self._build_sandhi_groups(sentence)
+        self.stats.add('tokenize', time.perf_counter() - start - self._split_seconds)
+        start = time.perf_counter()
+        result = self._render_sentence(sentence, groups, syllables)
+        self.stats.add('sandhi', time.perf_counter() - start)
+        return result
 
 
 def _make_word_converter(source: str, target: str,
-                         fuzzy_rule: FuzzyRuleLike = None) -> WordConverter:
+                         fuzzy_rule: FuzzyRuleLike = None,
+                         stats: Optional[ConversionStats] = None) -> WordConverter:
     """
     构造将单个拼音单词从 `source` 转换为 `target` 的 `WordConverter`。
 
     若传入 `fuzzy_rule`（口音），则在解析后、格式化前应用口音模糊音规则
-    （`fuzzy_rule.fuzzy_result`）。
+    （`fuzzy_rule.fuzzy_result`）。连读变调目标方案返回 `SandhiWordConverter`。
+    给定 `stats` 时返回记录各阶段耗时的转换器。
+
+    Raises:
+        ConversionError: 连读变调目标方案未指定口音。
     """
+    if target in SANDHI_TARGETS:
+        if stats is not None:
+            return InstrumentedSandhiWordConverter(source, target, fuzzy_rule, stats)
+        return SandhiWordConverter(source, target, fuzzy_rule)
+    if stats is not None:
+        return InstrumentedWordConverter(source, target, fuzzy_rule, stats)
     return WordConverter(source, target, fuzzy_rule)
 
 
@@ -181,60 +608,97 @@ def _convert_sentence(sentence: str, word_converter: Callable[[str], str],
     Returns:
         转换后的句子字符串。
     """
-    chunks: list[str] = []
-
-    def on_word(word: str, next_hyphen_count: int) -> None:
-        chunks.append(word_converter(word))
+    stats = getattr(word_converter, 'stats', None)
+    if stats is not None:
+        return _timed_convert_sentence(sentence, word_converter, has_case, stats)
+    text = sentence.lower() if has_case else sentence
+    if isinstance(word_converter, SandhiWordConverter):
+        result = word_converter.convert_sentence(text)
+    else:
+        word_kind = Sentence.TOKEN_WORD
+        result = ''.join([word_converter(token) if kind == word_kind else token
+                          for kind, token, _, _, _ in Sentence.iter_tokens(text)])
+    if has_case:
+        letter_case = Sentence.determine_letter_case(sentence)
+        result = Sentence.change_letter_case(result, letter_case)
+    return result
 
-    def on_non_word(non_word: str) -> None:
-        chunks.append(non_word)
 
+def _timed_convert_sentence(sentence: str, word_converter: WordConverter, has_case: bool,
+                            stats: ConversionStats) -> str:
+    # 与 `_convert_sentence` 相同，另记录分词与恢复大小写的耗时；单词各阶段由转换器自行记录。
+    perf_counter = time.perf_counter
+    start = perf_counter()
+    text = sentence.lower() if has_case else sentence
+    if isinstance(word_converter, SandhiWordConverter):
+        result = word_converter.convert_sentence(text)
+    else:
+        tokens = list(Sentence.iter_tokens(text))
+        stats.add('tokenize', perf_counter() - start)
+        word_kind = Sentence.TOKEN_WORD
+        result = ''.join([word_converter(token) if kind == word_kind else token
+                          for kind, token, _, _, _ in tokens])
     if has_case:
-        Sentence.for_each_word_in_sentence(sentence.lower(), on_word, on_non_word)
-        result = ''.join(chunks)
+        start = perf_counter()
         letter_case = Sentence.determine_letter_case(sentence)
         result = Sentence.change_letter_case(result, letter_case)
-    else:
-        Sentence.for_each_word_in_sentence(sentence, on_word, on_non_word)
-        result = ''.join(chunks)
+        stats.add('case', perf_counter() - start)
     return result
 
 
-def load_accents(accent_pb_path: Union[str, pathlib.Path]) -> dict[str, Accent]:
+def load_accents(accent_pb_path: Union[str, pathlib.Path],
+                 possible_pronunciations: Optional[Iterable[Pronunciation]] = None,
+                 compiled: bool = True) -> AccentSet:
     """
     从 protobuf 数据文件加载全部口音（`Accent`）对象。
 
-    参考 `pujutils.PUJUtils.__init__` 的口音加载逻辑：先初始化
-    `FuzzyRuleDescriptor` 的规则描述符表，再逐个解析 `Accent`。
+    规则描述符表由返回的 `AccentSet` 持有，不修改全局状态，因此可在多个线程中
+    同时加载，也可同时持有多份不同版本的口音数据。
+
+    默认为每个口音启用声韵转换表（见 `FuzzyRule.compile_transitions`），
+    转换表在转换过程中按需补充。给定 `possible_pronunciations` 时，立即以
+    这些读音填充各口音的缓存（见 `FuzzyRule.cache_possible_pronunciations_map`），
+    此后可通过 `Accent.candidates_for` 反查标准读音。
 
     Args:
         accent_pb_path: `accents.pb` 文件路径。
+        possible_pronunciations: 需缓存的读音，通常取自字表；为 None 时
+            不建立缓存。
+        compiled: 是否启用声韵转换表；为 False 时每次转换都执行正则规则。
 
     Returns:
-        以口音 id 为键、`Accent` 对象为值的字典。
+        以口音 id 为键、`Accent` 对象为值的只读映射。
     """
     accent_pb_path = pathlib.Path(accent_pb_path)
     with open(accent_pb_path, 'rb') as f:
         accents_raw = pb.Accents()
         accents_raw.ParseFromString(f.read())
-    FuzzyRuleDescriptor.init_from_pb(accents_raw.fuzzy_rule_descriptors)
-    accents: dict[str, Accent] = {}
-    for a in accents_raw.accents:
-        accents[a.id] = Accent.from_pb(a)
+    accents = AccentSet.from_pb(accents_raw)
+    possible_pronunciations = list(possible_pronunciations or [])
+    for accent in accents.values():
+        if compiled:
+            accent.compile_transitions()
+        if possible_pronunciations:
+            accent.cache_possible_pronunciations_map(possible_pronunciations)
     return accents
 
 
-def load_entries(entries_pb_path: Union[str, pathlib.Path]) -> dict[str, list[Entry]]:
+def load_entries(entries_pb_path: Union[str, pathlib.Path],
+                 lazy: bool = False) -> Union[dict[str, list[Entry]], LazyEntries]:
     """
     从 protobuf 数据文件加载字表，并按汉字建立索引。
 
     Args:
         entries_pb_path: `entries.pb` 文件路径。
+        lazy: 为 True 时返回按需解码的 `LazyEntries`，只建立索引，
+            查询某个字时才解码其条目。
 
     Returns:
         以汉字为键、`Entry` 对象列表为值的字典。同一个字可能对应多个读音，
         故值为列表；繁体与简体形式均会作为键收录。
     """
+    if lazy:
+        return LazyEntries(entries_pb_path)
     entries_pb_path = pathlib.Path(entries_pb_path)
     with open(entries_pb_path, 'rb') as f:
         entries_raw = pb.Entries()
@@ -247,6 +711,179 @@ def load_entries(entries_pb_path: Union[str, pathlib.Path]) -> dict[str, list[En
     return han_to_entry
 
 
+def load_phrases(phrases_pb_path: Union[str, pathlib.Path]) -> PhraseStore:
+    """
+    从 protobuf 数据文件加载词表，并建立索引。
+
+    Args:
+        phrases_pb_path: `phrases.pb` 文件路径。
+
+    Returns:
+        `PhraseStore` 对象，可按潮州话写法、白话字读音、普通话对译、
+        非正式写法与标签查询词条。
+    """
+    phrases_pb_path = pathlib.Path(phrases_pb_path)
+    with open(phrases_pb_path, 'rb') as f:
+        phrases_raw = pb.Phrases()
+        phrases_raw.ParseFromString(f.read())
+    return PhraseStore(phrases_raw)
+
+
+def _append_unique(standards: list[str], standard: str) -> None:
+    if standard not in standards:
+        standards.append(standard)
+
+
+class DeaccentIndex:
+    """
+    某个口音的"反推标准音"索引。
+
+    对字表中的读音应用口音规则，建立 (汉字, 口音读音) -> 标准读音
+    与 口音读音 -> 标准读音 两张表，反推时只需查表。除规则转换得到的读音外，
+    还收录字表中为该口音记录的又音（`Entry.pron_aka`）与鼻化读音
+    （`Entry.accents_nasalized`）。
+
+    两张表都按需建立：`lookup` 第一次查询某个字时只转换该字的读音，
+    `candidates` 第一次调用时才转换整个字表。只查少量汉字时（如命令行调用）
+    无需转换全部读音。多个线程可同时查询。
+
+    同一口音读音可能对应多个标准读音，查询结果按字表顺序排列，且由规则
+    转换得到的读音总是排在又音、鼻化读音之前。
+
+    索引建立后不再跟踪字表的变化；字表修改后需重新建立索引。
+    """
+
+    def __init__(self, accent: Accent, han_to_entry: Mapping[str, list[Entry]]) -> None:
+        """
+        Args:
+            accent: 口音对象。
+            han_to_entry: `load_entries` 返回的字表索引。
+        """
+        self.accent = accent
+        self.han_to_entry = han_to_entry
+        # 汉字 -> {口音读音: [标准读音]}，按需逐字建立。
+        self._char_maps: dict[str, dict[str, list[str]]] = {}
+        self._pron_map: Optional[dict[str, list[str]]] = None
+        # 繁简同形的字在字表索引中会出现两次，按条目缓存避免重复计算。
+        self._entry_forms: dict[int, tuple[str, list[str], list[str]]] = {}
+
+    def _forms_of(self, entries: list[Entry]) -> list[tuple[str, list[str], list[str]]]:
+        forms = []
+        for entry in entries:
+            key = id(entry)
+            form = self._entry_forms.get(key)
+            if form is None:
+                form = self._entry_forms[key] = self._accented_forms(entry)
+            forms.append(form)
+        return forms
+
+    @staticmethod
+    def _add_forms(mapping: dict[str, list[str]], forms: list[tuple[str, list[str], list[str]]]) -> None:
+        # 先收录规则转换得到的读音，再收录又音与鼻化读音。
+        for standard, accented_forms, _ in forms:
+            for accented in accented_forms:
+                _append_unique(mapping.setdefault(accented, []), standard)
+        for standard, _, extra_forms in forms:
+            for accented in extra_forms:
+                _append_unique(mapping.setdefault(accented, []), standard)
+
+    def _char_map(self, char: str) -> dict[str, list[str]]:
+        char_map = self._char_maps.get(char)
+        if char_map is None:
+            entries = self.han_to_entry.get(char)
+            if not entries:
+                # 不在字表中的输入不缓存，缓存的字数不超过字表的字数。
+                return {}
+            # 建好后整体写入，其他线程不会读到建了一半的表；重复建立的结果相同。
+            char_map = {}
+            self._add_forms(char_map, self._forms_of(entries))
+            self._char_maps[char] = char_map
+        return char_map
+
+    def _get_pron_map(self) -> dict[str, list[str]]:
+        pron_map = self._pron_map
+        if pron_map is None:
+            pron_map = {}
+            for entries in self.han_to_entry.values():
+                self._add_forms(pron_map, self._forms_of(entries))
+            self._pron_map = pron_map
+        return pron_map
+
+    def _accented_forms(self, entry: Entry) -> tuple[str, list[str], list[str]]:
+        """求字表条目的标准读音、规则转换得到的口音读音，以及又音与鼻化读音。"""
+        accent_id = self.accent.id
+        pron = entry.pron
+        accented_forms = []
+        extra_forms = []
+        replaced = False
+        for aka in entry.pron_aka:
+            if aka.accent_id != accent_id:
+                continue
+            replaced = replaced or aka.replace
+            extra_forms.extend(Pronunciation.from_pb(p).to_combination() for p in aka.prons)
+        if not replaced:
+            accented_forms.append(self.accent.fuzzy_result(pron).to_combination())
+        if accent_id in entry.accents_nasalized:
+            nasalized = Pronunciation(pron.initial, pron.final + 'nn', pron.tone)
+            extra_forms.append(self.accent.fuzzy_result(nasalized).to_combination())
+        return pron.to_combination(), accented_forms, extra_forms
+
+    @staticmethod
+    def _normalize(accent_pron: str) -> str:
+        return Pronunciation.from_combination(accent_pron).to_combination()
+
+    def lookup(self, char: str, accent_pron: str) -> list[str]:
+        """
+        查找汉字 `char` 读作口音读音 `accent_pron` 时对应的标准读音。
+
+        Args:
+            char: 汉字（繁体或简体均可）。
+            accent_pron: 带口音的拼音（ASCII 白话字形式，如 `lieng7`）。
+
+        Returns:
+            标准读音（ASCII 白话字形式）列表；没有匹配时返回空列表。
+
+        Raises:
+            ConversionError: `accent_pron` 无法解析。
+        """
+        char_map = self._char_map(char)
+        standards = char_map.get(accent_pron)
+        if standards is None:
+            standards = char_map.get(self._normalize(accent_pron), [])
+        return list(standards)
+
+    def candidates(self, accent_pron: str) -> list[str]:
+        """
+        不限汉字，查找口音读音 `accent_pron` 可能对应的所有标准读音。
+
+        Raises:
+            ConversionError: `accent_pron` 无法解析。
+        """
+        pron_map = self._get_pron_map()
+        standards = pron_map.get(accent_pron)
+        if standards is None:
+            standards = pron_map.get(self._normalize(accent_pron), [])
+        return list(standards)
+
+    def deaccent(self, char: str, accent_pron: str) -> str:
+        """
+        将汉字 `char` 的口音读音 `accent_pron` 反推为标准音。
+
+        Returns:
+            第一个匹配的标准读音；没有匹配时原样返回 `accent_pron`。
+        """
+        standards = self.lookup(char, accent_pron)
+        return standards[0] if standards else accent_pron
+
+
+def _get_deaccent_index(accent: Accent, han_to_entry: dict[str, list[Entry]]) -> DeaccentIndex:
+    # 最近一次建立的反推索引记录在口音对象上，随口音一同回收。
+    index = accent._deaccent_index
+    if index is None or index.han_to_entry is not han_to_entry:
+        index = accent._deaccent_index = DeaccentIndex(accent, han_to_entry)
+    return index
+
+
 def try_deaccent(char: str, accent_pron: str, accent: Accent,
                  han_to_entry: dict[str, list[Entry]]) -> str:
     """
@@ -256,6 +893,9 @@ def try_deaccent(char: str, accent_pron: str, accent: Accent,
     规则，若得到的口音化读音与输入的 `accent_pron` 一致，则返回该标准读音；
     否则原样返回输入的 `accent_pron`。
 
+    第一次以某组 (`accent`, `han_to_entry`) 调用时建立 `DeaccentIndex`，
+    之后的调用直接查表。
+
     Args:
         char: 汉字（繁体或简体均可）。
         accent_pron: 带口音的拼音（ASCII 白话字形式，如 `lieng7`）。
@@ -265,17 +905,11 @@ def try_deaccent(char: str, accent_pron: str, accent: Accent,
     Returns:
         找到匹配时的标准读音；否则返回原输入的 `accent_pron`。
     """
-    input_pron = Pronunciation.from_combination(accent_pron)
-    input_comb = input_pron.to_combination()
-    for entry in han_to_entry.get(char, []):
-        accented = accent.fuzzy_result(entry.pron)
-        if accented.to_combination() == input_comb:
-            return entry.pron.to_combination()
-    return accent_pron
+    return _get_deaccent_index(accent, han_to_entry).deaccent(char, accent_pron)
 
 
 def convert(text: str, source: str = 'puj', target: str = 'puj',
-            fuzzy_rule: FuzzyRuleLike = None) -> Tuple[str, list[str]]:
+            fuzzy_rule: FuzzyRuleLike = None, stats: Optional[ConversionStats] = None) -> Tuple[str, list[str]]:
     """
     将拼音 `text` 从 `source` 方案转换为 `target` 方案。
 
@@ -287,38 +921,126 @@ def convert(text: str, source: str = 'puj', target: str = 'puj',
         text: 待转换的一个拼音或一句拼音。
         source: 源拼音方案，可选 `'puj'`、`'dp'`。
         target: 目标拼音方案，可选 `'apuj'`、`'puj'`、`'dp'`、
-            `'ipa'`、`'xsampa'`。
+            `'ipa'`、`'xsampa'`，以及按连读变调输出实际调值的 `'pitch'`、`'ipa-sandhi'`。
         fuzzy_rule: 口音（`Accent`）对象，用于应用口音模糊音规则；
-            为 None 时不应用口音。
+            为 None 时不应用口音。目标方案为 `'pitch'`、`'ipa-sandhi'` 时必须指定。
+        stats: 给定时将各阶段的计数与耗时累计到其中，见 `ConversionStats`。
 
     Returns:
         转换后的拼音字符串。
 
     Raises:
-        ConversionError: 输入无法解析，或指定了不支持的方案。
+        ConversionError: 输入无法解析，指定了不支持的方案，或连读变调目标方案未指定口音。
+    """
+    _check_schemes(source, target)
+    word_converter = _make_word_converter(source, target, fuzzy_rule, stats)
+    result = _convert_sentence(text, word_converter, has_case=_target_has_case(target))
+    return result, word_converter.errors
+
+
+def convert_many(texts: Iterable[str], source: str = 'puj', target: str = 'puj',
+                 fuzzy_rule: FuzzyRuleLike = None,
+                 stats: Optional[ConversionStats] = None) -> Iterator[Tuple[str, list[str]]]:
+    """
+    批量转换多段拼音文本，按输入顺序逐项产出结果。
+
+    每一项的结果与单独调用 `convert` 完全相同，但整批只检查一次方案、
+    共用同一个 `WordConverter`，且批内重复出现的文本只转换一次，
+    适合服务端成批处理大量短文本。`texts` 可以是任意可迭代对象（包括
+    生成器），结果按需产出。
+
+    Args:
+        texts: 待转换的拼音文本。
+        source: 源拼音方案，同 `convert`。
+        target: 目标拼音方案，同 `convert`。
+        fuzzy_rule: 口音（`Accent`）对象，同 `convert`。
+        stats: 同 `convert`。批内重复的文本只转换一次，也只计一次。
+
+    Returns:
+        依次产出 (转换结果, 该项的解析错误消息列表) 的迭代器，第 i 个结果
+        对应 `texts` 的第 i 项。
+
+    Raises:
+        ConversionError: 指定了不支持的方案（调用时立即检查）。
     """
+    _check_schemes(source, target)
+    word_converter = _make_word_converter(source, target, fuzzy_rule, stats)
+    return _iter_convert_many(texts, word_converter, _target_has_case(target))
+
+
+# convert_many 批内结果缓存的最大条目数，超过后清空重新缓存。
+_CONVERT_MANY_MEMO_SIZE = 4096
+
+
+def _iter_convert_many(texts: Iterable[str], word_converter: WordConverter,
+                       has_case: bool) -> Iterator[Tuple[str, list[str]]]:
+    memo: dict[str, Tuple[str, list[str]]] = {}
+    for text in texts:
+        cached = memo.get(text)
+        if cached is None:
+            word_converter.errors = []
+            result = _convert_sentence(text, word_converter, has_case=has_case)
+            cached = result, word_converter.errors
+            if len(memo) >= _CONVERT_MANY_MEMO_SIZE:
+                memo.clear()
+            memo[text] = cached
+        yield cached[0], list(cached[1])
+
+
+def convert_lines(lines: Iterable[str], source: str = 'puj', target: str = 'puj',
+                  fuzzy_rule: FuzzyRuleLike = None,
+                  stats: Optional[ConversionStats] = None) -> Iterator[Tuple[str, list[str]]]:
+    """
+    逐行转换拼音文本，适用于从文件或标准输入流式读取的大量文本。
+
+    每行作为一个独立的句子转换，大小写按该行单独恢复；行尾的换行符等
+    非拼音片段原样保留。结果逐行产出，不会一次性读入全部输入。
+
+    Args:
+        lines: 待转换的行，例如打开的文本文件。
+        source: 源拼音方案，同 `convert`。
+        target: 目标拼音方案，同 `convert`。
+        fuzzy_rule: 口音（`Accent`）对象，同 `convert`。
+        stats: 同 `convert`。
+
+    Returns:
+        依次产出 (转换后的行, 该行的解析错误消息列表) 的迭代器，见 `convert_many`。
+
+    Raises:
+        ConversionError: 指定了不支持的方案。
+    """
+    return convert_many(lines, source=source, target=target, fuzzy_rule=fuzzy_rule, stats=stats)
+
+
+def _check_schemes(source: str, target: str) -> None:
+    """检查源方案与目标方案是否受支持，不支持时抛出 `ConversionError`。"""
     if source not in SUPPORTED_SOURCES:
         raise ConversionError(
             f"不支持的源拼音方案：{source!r}，可用：{', '.join(SUPPORTED_SOURCES)}")
     if target not in SUPPORTED_TARGETS:
         raise ConversionError(
             f"不支持的目标拼音方案：{target!r}，可用：{', '.join(SUPPORTED_TARGETS)}")
-    word_converter = _make_word_converter(source, target, fuzzy_rule)
-    result = _convert_sentence(text, word_converter, has_case=_target_has_case(target))
-    return result, word_converter.errors
 
 
 # 为每种 (源, 目标) 组合生成便捷的"源方案 2 目标方案"函数，如：
 # puj2apuj、puj2puj、puj2dp、puj2ipa、puj2xsampa、dp2apuj、dp2dp 等。
+# 连读变调目标方案以整句为单位转换，不生成单词函数。
 for _source in SUPPORTED_SOURCES:
-    for _target in SUPPORTED_TARGETS:
+    for _target in _TARGET_FORMATTERS:
         _name = f"{_source}2{_target}"
 
         def _single_word_api(text: str,
+                             _source=_source,
+                             _target=_target,
                              _parser=_SOURCE_PARSERS[_source],
                              _formatter=_TARGET_FORMATTERS[_target]) -> str:
             """将单个拼音单词从源方案转换为目标方案。"""
-            return _formatter(_parser(text))
+            key = (_source, _target, None, text)
+            result = _WORD_CACHE.get(key)
+            if result is None:
+                result = _formatter(_parser(text))
+                _WORD_CACHE.put(key, result)
+            return result
 
         _single_word_api.__name__ = _name
         _single_word_api.__qualname__ = _name
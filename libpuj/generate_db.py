@@ -1,11 +1,29 @@
+import argparse
+
 import libpuj.generate_entries_db
 import libpuj.generate_phrases_db
 
+from libpuj.generate_manifest import BuildManifest
+from typing import Optional
+
+
+def main(force: bool = False, jobs: Optional[int] = None):
+    """
+    生成全部数据文件。默认增量构建：输入未改变的目标直接跳过，见 `libpuj.generate_manifest`。
 
-def main():
-    libpuj.generate_entries_db.main()
-    libpuj.generate_phrases_db.main()
+    Args:
+        force: 为 True 时忽略构建清单，全部重新生成。
+        jobs: 并行解析的工作进程数；为 None 时取 CPU 核数。
+    """
+    manifest = BuildManifest(clean=force)
+    libpuj.generate_entries_db.main(manifest, jobs)
+    libpuj.generate_phrases_db.main(manifest, jobs)
+    manifest.save()
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='从 data 目录中的 YAML 源文件生成 dist 中的数据文件。')
+    parser.add_argument('--force', action='store_true', help='忽略构建清单，全部重新生成。')
+    parser.add_argument('--jobs', '-j', type=int, default=None, help='并行解析的工作进程数，默认为 CPU 核数。')
+    args = parser.parse_args()
+    main(force=args.force, jobs=args.jobs)
@@ -1,11 +1,44 @@
 # -*- coding: utf-8 -*-
+import collections
+import concurrent.futures
+import os
 import re
 from pathlib import Path
 
 import sys
 import yaml
+import libpuj.pujentries as pujentries
 from entries_pb2 import *
 from accents_pb2 import *
+from typing import Iterable, Iterator, Optional
+from libpuj.generate_manifest import BuildManifest
+
+_LIBPUJ_DIR_PATH = Path(__file__).parent
+ENTRIES_YML_PATH = Path('../data/entries.yml')
+FUZZY_RULES_YML_PATH = Path('../data/fuzzy_rules.yml')
+ACCENTS_YML_PATH = Path('../data/accents.yml')
+ENTRIES_PB_PATH = Path('../dist/entries.pb')
+ENTRIES_IDX_PATH = Path('../dist/entries.idx')
+ACCENTS_PB_PATH = Path('../dist/accents.pb')
+# 各构建目标的输入：数据文件，以及会影响输出的生成脚本与 protobuf 模块。
+ENTRIES_INPUTS = [
+    ENTRIES_YML_PATH,
+    Path(__file__),
+    _LIBPUJ_DIR_PATH / 'pujentries.py',
+    _LIBPUJ_DIR_PATH / 'entries_pb2.py',
+]
+# 优先使用 libyaml 实现的解析器，解析结果与 `yaml.Loader` 相同。
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+# 流式构建字表时每段解析的顶层条目（汉字）数。
+ENTRIES_CHUNK_SIZE = 512
+# Entries.entries 字段（编号 1，长度前缀类型）的标签字节。
+_ENTRIES_FIELD_TAG = b'\x0a'
+ACCENTS_INPUTS = [
+    FUZZY_RULES_YML_PATH,
+    ACCENTS_YML_PATH,
+    Path(__file__),
+    _LIBPUJ_DIR_PATH / 'accents_pb2.py',
+]
 
 
 def _verify_pronunciation(entry: Entry):
@@ -21,10 +54,19 @@ def _verify_pronunciation(entry: Entry):
 
 
 def _create_entries(yaml_entries) -> Entries:
+    entries = Entries()
+    for index, entry in enumerate(_iter_entries(yaml_entries)):
+        entry.index = index
+        entries.entries.append(entry)
+    return entries
+
+
+def _iter_entries(yaml_entries) -> Iterator[Entry]:
+    """
+    逐个生成字表条目并校验读音。条目编号（`index`）留空，由调用方按全表顺序填写。
+    """
     EF = EntryFrequency
     EC = EntryCategory
-    entries = Entries()
-    index = 0
     for yaml_ent in yaml_entries:
         chars, pronunciations = yaml_ent
         char, char_sim = chars.split(',')
@@ -77,8 +119,7 @@ def _create_entries(yaml_entries) -> Entries:
                                 detail.examples.append(EntryDetailExample(teochew=teochew, puj=puj, mandarin=mandarin))
                         entry_details.append(detail)
                 pron = Pronunciation(initial=initial, final=final, tone=int(tone))
-                entries.entries.append(Entry(
-                    index=index,
+                entry = Entry(
                     char=char,
                     char_sim=char_sim,
                     pron=pron,
@@ -89,36 +130,141 @@ def _create_entries(yaml_entries) -> Entries:
                     accents_nasalized=accents_nasalized,
                     sp_nasal=sp_nasal,
                     pron_aka=pron_aka,
-                ))
-                index += 1
+                )
+                _verify_pronunciation(entry)
+                yield entry
         except Exception as e:
             print(f'Error {e} of char {char}', file=sys.stderr)
             raise
-    for entry in entries.entries:
-        _verify_pronunciation(entry)
-    return entries
 
 
-def main():
-    entries_file = Path('../data/entries.yml')
+def iter_entries_yml_chunks(path: Path, chunk_size: int = ENTRIES_CHUNK_SIZE) -> Iterator[str]:
+    """
+    逐行读取 `entries.yml`，按顶层列表项切分为若干段 YAML 文本，每段至多 `chunk_size` 项。
+
+    顶层列表项均以行首的 `- ` 开始；文档头（`--- !!omap`）复制到每一段前，
+    因此每段可单独解析，解析结果依次拼接即为整个文件的解析结果。
+    """
+    header = []
+    chunk = []
+    items = 0
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('- '):
+                if items == chunk_size:
+                    yield ''.join(header + chunk)
+                    chunk, items = [], 0
+                items += 1
+            elif not items and not chunk:
+                header.append(line)
+                continue
+            chunk.append(line)
+    if chunk:
+        yield ''.join(header + chunk)
+
+
+def _create_entry_records(yaml_text: str) -> list[bytes]:
+    # 解析一段 entries.yml 并序列化其中的条目，可在工作进程中执行。
+    yaml_entries = yaml.load(yaml_text, YAML_LOADER) or []
+    return [entry.SerializeToString() for entry in _iter_entries(yaml_entries)]
+
+
+def iter_entry_records(chunks: Iterable[str], jobs: int = 1) -> Iterator[bytes]:
+    """
+    解析各段 entries.yml，按原顺序逐个产出序列化的条目（未填写编号）。
+
+    Args:
+        chunks: `iter_entries_yml_chunks` 切分出的 YAML 文本。
+        jobs: 工作进程数。大于 1 时各段在进程池中并行解析，同时在途的段数有上限，内存占用与文件大小无关。
+    """
+    if jobs <= 1:
+        for chunk in chunks:
+            yield from _create_entry_records(chunk)
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_create_entry_records, chunk))
+            if len(pending) >= jobs * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _encode_varint(value: int) -> bytes:
+    result = bytearray()
+    while value > 0x7F:
+        result.append(value & 0x7F | 0x80)
+        value >>= 7
+    result.append(value)
+    return bytes(result)
+
+
+def write_entries(path: Path, records: Iterable[bytes]) -> int:
+    """
+    依次为条目填写编号，以长度前缀记录的形式逐个写入 `path`。
+
+    每条记录为 `Entries.entries` 字段的标签、长度与条目内容，整个文件即为一个 `Entries` 消息，
+    与一次性序列化 `Entries` 的结果逐字节相同。
+
+    Returns:
+        条目数。
+    """
+    entry = Entry()
+    count = 0
+    tmp_path = Path(f'{path}.tmp')
+    with open(tmp_path, 'wb') as f:
+        for count, record in enumerate(records, 1):
+            entry.ParseFromString(record)
+            entry.index = count - 1
+            data = entry.SerializeToString()
+            f.write(_ENTRIES_FIELD_TAG)
+            f.write(_encode_varint(len(data)))
+            f.write(data)
+    tmp_path.replace(path)
+    return count
+
+
+def main(manifest: Optional[BuildManifest] = None, jobs: Optional[int] = 1):
+    """
+    生成 `entries.pb`（及其索引 `entries.idx`）与 `accents.pb`。
+
+    Args:
+        manifest: 构建清单。给定时跳过输入未改变的目标并记录本次构建；为 None 时总是全部重新生成。
+        jobs: 解析 `entries.yml` 的工作进程数；为 None 时取 CPU 核数。
+    """
+    build_entries(manifest, jobs)
+    build_accents(manifest)
+
+
+def build_entries(manifest: Optional[BuildManifest] = None, jobs: Optional[int] = 1):
+    """
+    流式生成 `entries.pb`：分段解析 `entries.yml`，逐个校验并写出条目，不在内存中保留整个字表。
+    """
+    entries_file = ENTRIES_YML_PATH
     assert entries_file.exists(), 'entries.yml not found'
-    with open(entries_file, 'r', encoding='utf-8') as f:
-        yaml_entries = yaml.load(f, yaml.Loader)
-    entries = _create_entries(yaml_entries)
+    outputs = [ENTRIES_PB_PATH, ENTRIES_IDX_PATH]
+    if manifest is not None and manifest.up_to_date('entries', ENTRIES_INPUTS, outputs):
+        print('entries.pb: up to date')
+        return
     Path('../dist').mkdir(exist_ok=True)
-    with open('../dist/entries.pb', 'wb') as f:
-        f.write(entries.SerializeToString())
-    with open('../dist/entries.pb', 'rb') as f:
-        entries = Entries()
-        entries.ParseFromString(f.read())
-
-    entries_index_map = {
-        f"{entry.char},{entry.char_sim},{entry.pron.initial},{entry.pron.final},{entry.pron.tone}": entry.index
-        for entry in entries.entries
-    }
-
-    fuzzy_rules_file = Path('../data/fuzzy_rules.yml')
+    jobs = jobs or os.cpu_count() or 1
+    write_entries(ENTRIES_PB_PATH, iter_entry_records(iter_entries_yml_chunks(entries_file), jobs))
+    # 生成索引时逐个解码全部条目，同时检查了写出的文件。
+    pujentries.write_entries_index(ENTRIES_PB_PATH, ENTRIES_IDX_PATH)
+    if manifest is not None:
+        manifest.record('entries', ENTRIES_INPUTS, outputs)
+
+
+def build_accents(manifest: Optional[BuildManifest] = None):
+    fuzzy_rules_file = FUZZY_RULES_YML_PATH
     assert fuzzy_rules_file.exists(), 'fuzzy_rules.yml not found'
+    accents_file = ACCENTS_YML_PATH
+    assert accents_file.exists(), 'accents.yml not found'
+    outputs = [ACCENTS_PB_PATH]
+    if manifest is not None and manifest.up_to_date('accents', ACCENTS_INPUTS, outputs):
+        print('accents.pb: up to date')
+        return
     with open(fuzzy_rules_file, 'r', encoding='utf-8') as f:
         yaml_fuzzy_rules = yaml.load(f, yaml.Loader)
     fuzzy_rule_descriptors = []
@@ -153,8 +299,6 @@ def main():
             ipa=fuzzy_rule_ipa,
         ))
 
-    accents_file = Path('../data/accents.yml')
-    assert accents_file.exists(), 'accents.yml not found'
     with open(accents_file, 'r', encoding='utf-8') as f:
         yaml_entries = yaml.load(f, yaml.Loader)
     accents = Accents()
@@ -184,11 +328,15 @@ def main():
         ))
 
     Path('../dist').mkdir(exist_ok=True)
-    with open('../dist/accents.pb', 'wb') as f:
+    tmp_path = Path(f'{ACCENTS_PB_PATH}.tmp')
+    with open(tmp_path, 'wb') as f:
         f.write(accents.SerializeToString())
-    with open('../dist/accents.pb', 'rb') as f:
+    tmp_path.replace(ACCENTS_PB_PATH)
+    with open(ACCENTS_PB_PATH, 'rb') as f:
         accents = Accents()
         accents.ParseFromString(f.read())
+    if manifest is not None:
+        manifest.record('accents', ACCENTS_INPUTS, outputs)
 
 
 if __name__ == '__main__':
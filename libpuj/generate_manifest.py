@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+数据文件增量构建的清单。
+
+清单（`dist/.build/manifest.json`）记录每个构建目标上一次构建时各输入文件与输出文件的
+SHA-256。再次构建时，若输入文件（包括生成脚本本身）均未改变、输出文件也未被改动或删除，
+则跳过该目标。
+"""
+
+import hashlib
+import json
+
+from pathlib import Path
+from typing import Iterable, Union
+
+PathLike = Union[str, Path]
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+DIST_DIR_PATH = ROOT_PATH / 'dist'
+BUILD_DIR_PATH = DIST_DIR_PATH / '.build'
+MANIFEST_PATH = BUILD_DIR_PATH / 'manifest.json'
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path: PathLike) -> str:
+    """文件内容的 SHA-256（十六进制）。"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """
+    构建清单。以 `up_to_date` 判断目标是否需要重新构建，构建完成后以 `record` 记录，最后 `save`。
+
+    文件以解析后的绝对路径相对于仓库根目录的形式记录，与运行时的工作目录无关。
+    """
+
+    def __init__(self, path: PathLike = MANIFEST_PATH, clean: bool = False) -> None:
+        """
+        Args:
+            path: 清单文件路径。
+            clean: 为 True 时忽略已有的记录，所有目标都重新构建。
+        """
+        self.path = Path(path)
+        self._targets: dict[str, dict[str, dict[str, str]]] = {}
+        # 本次构建中已计算过的文件哈希，避免同一文件重复计算。
+        self._hashes: dict[Path, str] = {}
+        if clean:
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return
+        if data.get('version') == MANIFEST_VERSION:
+            self._targets = data.get('targets', {})
+
+    def _key(self, path: PathLike) -> str:
+        path = Path(path).resolve()
+        try:
+            return path.relative_to(ROOT_PATH).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    def hash(self, path: PathLike) -> str:
+        """文件的 SHA-256，同一次构建中只计算一次。"""
+        path = Path(path).resolve()
+        digest = self._hashes.get(path)
+        if digest is None:
+            digest = self._hashes[path] = file_sha256(path)
+        return digest
+
+    def _hashes_of(self, paths: Iterable[PathLike]) -> dict[str, str]:
+        return {self._key(path): self.hash(path) for path in paths}
+
+    def up_to_date(self, target: str, inputs: Iterable[PathLike], outputs: Iterable[PathLike]) -> bool:
+        """
+        目标 `target` 是否无需重新构建：上次构建的记录存在，输入与记录一致，且输出文件均存在并与记录一致。
+        """
+        record = self._targets.get(target)
+        if record is None:
+            return False
+        outputs = list(outputs)
+        if not all(Path(path).exists() for path in outputs):
+            return False
+        return record['inputs'] == self._hashes_of(inputs) and record['outputs'] == self._hashes_of(outputs)
+
+    def record(self, target: str, inputs: Iterable[PathLike], outputs: Iterable[PathLike]) -> None:
+        """记录目标 `target` 本次构建的输入与输出。输出文件已被改写，需重新计算哈希。"""
+        outputs = list(outputs)
+        for path in outputs:
+            self._hashes.pop(Path(path).resolve(), None)
+        self._targets[target] = {
+            'inputs': self._hashes_of(inputs),
+            'outputs': self._hashes_of(outputs),
+        }
+
+    def invalidate(self, target: str) -> None:
+        """删除目标 `target` 的记录，下次构建时必定重新构建。"""
+        self._targets.pop(target, None)
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {'version': MANIFEST_VERSION, 'targets': self._targets}
+        tmp_path = self.path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(data, indent=2, sort_keys=True, ensure_ascii=False), encoding='utf-8')
+        tmp_path.replace(self.path)
@@ -1,18 +1,33 @@
 import csv
 
+import concurrent.futures
+import hashlib
+import os
 import sys
 import yaml
 import libpuj.pujcommon as pujcommon
-import libpuj.pujutils as pujutils
 
 from phrases_pb2 import *
 from pathlib import Path
+from typing import Optional
+from libpuj.generate_manifest import BUILD_DIR_PATH, BuildManifest
 
 DATA_DIR_PATH = Path(__file__).parent.parent / 'data'
 PHRASES_STD_DIR_PATH = DATA_DIR_PATH / 'pujcorpora' / 'std'
 PHRASES_YML_FILES = sorted(PHRASES_STD_DIR_PATH.glob('**/*.std.yml')) + [
     DATA_DIR_PATH / 'phrases.yml'
 ]
+PHRASES_PB_PATH = Path('../dist/phrases.pb')
+# 逐个词表文件缓存的解析结果（片段），见 `load_phrase_fragment`。
+PHRASE_FRAGMENTS_DIR_PATH = BUILD_DIR_PATH / 'phrases'
+# 优先使用 libyaml 实现的解析器；词表只含普通数据，用安全的解析器即可，解析结果与 `yaml.Loader` 相同。
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+# 会影响解析结果的代码，任一改变时所有片段失效。
+PHRASES_CODE_PATHS = [
+    Path(__file__),
+    Path(__file__).parent / 'pujcommon.py',
+    Path(__file__).parent / 'phrases_pb2.py',
+]
 DONOR_LANG_MAP = {
     '英语': PLDL_ENGLISH,
     '普通话': PLDL_MANDARIN,
@@ -48,13 +63,15 @@ PHRASE_TAG_MAP = {
 }
 
 
-def get_phrase_tag(item) -> int:
+def get_phrase_tag(item, tag_map: Optional[dict[str, int]] = None) -> int:
+    if tag_map is None:
+        tag_map = PHRASE_TAG_MAP
     if not item:
         return 0
     if isinstance(item, str):
-        if item not in PHRASE_TAG_MAP:
-            PHRASE_TAG_MAP[item] = len(PHRASE_TAG_MAP)
-        return PHRASE_TAG_MAP[item]
+        if item not in tag_map:
+            tag_map[item] = len(tag_map)
+        return tag_map[item]
     return 0
 
 
@@ -70,29 +87,141 @@ def is_punctuation_full_width(c):
     return c in '，。？！：；、'
 
 
-def main():
+def parse_phrase_fragment(path: Path) -> Phrases:
+    """
+    解析单个词表文件，得到词表片段。
+
+    片段中的词条编号从 0 开始，标签编号为文件内的局部编号，`phrase_tag_display` 记录局部编号对应的标签名称。
+    片段与文件在词表中的位置无关，由 `merge_phrase_fragment` 按顺序合并为完整词表。
+    """
+    fragment = Phrases()
+    tag_map = {'': 0}
+    with open(path, 'r', encoding='utf-8') as f:
+        yaml_phrases = yaml.load(f, YAML_LOADER)
+        add_phrase(fragment, yaml_phrases, tag_map)
+    fragment.phrase_tag_display.extend(tag_map)
+    return fragment
+
+
+def merge_phrase_fragment(phrases: Phrases, fragment: Phrases):
+    """
+    将片段追加到词表末尾：词条编号顺延，局部标签编号换为全局编号。
+
+    局部编号按标签在文件中首次出现的顺序分配，因此按文件顺序合并时全局编号的分配顺序与逐个文件直接解析相同。
+    """
+    offset = len(phrases.phrases)
+    tag_ids = [get_phrase_tag(tag) for tag in fragment.phrase_tag_display]
+    for phrase in fragment.phrases:
+        phrase.index += offset
+        phrase.tag[:] = [tag_ids[tag] for tag in phrase.tag]
+    phrases.phrases.extend(fragment.phrases)
+
+
+def _parse_phrase_fragment_data(path: Path) -> bytes:
+    # 在工作进程中执行，以序列化的形式传回主进程。
+    return parse_phrase_fragment(path).SerializeToString()
+
+
+def _fragment_cache_path(path: Path, manifest: BuildManifest) -> Path:
+    # 缓存以文件内容与解析代码的哈希命名。
+    key = hashlib.sha256(''.join(manifest.hash(p) for p in [path, *PHRASES_CODE_PATHS]).encode()).hexdigest()
+    return PHRASE_FRAGMENTS_DIR_PATH / f'{key}.pb'
+
+
+def load_phrase_fragments(paths: list[Path], manifest: Optional[BuildManifest] = None,
+                          jobs: Optional[int] = None) -> list[tuple[Phrases, Optional[Path]]]:
+    """
+    取得各词表文件的片段，顺序与 `paths` 一致。
+
+    给定 `manifest` 时先查缓存，命中的片段直接读取；其余文件在进程池中并行解析与校验，
+    解析后写入缓存。各文件的片段互不依赖，合并顺序由调用方决定，因此结果与逐个解析相同。
+
+    Args:
+        paths: 词表文件。
+        manifest: 构建清单；为 None 时不使用缓存。
+        jobs: 工作进程数；为 None 时取 CPU 核数，为 1 或只需解析一个文件时在当前进程中解析。
+
+    Returns:
+        (片段, 缓存文件路径) 的列表；不使用缓存时缓存文件路径为 None。
+    """
+    results: list[Optional[Phrases]] = [None] * len(paths)
+    cache_paths: list[Optional[Path]] = [None] * len(paths)
+    pending = []
+    for i, path in enumerate(paths):
+        if manifest is not None:
+            cache_paths[i] = cache_path = _fragment_cache_path(path, manifest)
+            if cache_path.exists():
+                fragment = Phrases()
+                fragment.ParseFromString(cache_path.read_bytes())
+                results[i] = fragment
+                continue
+        pending.append(i)
+    jobs = min(jobs or os.cpu_count() or 1, len(pending))
+    if jobs > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            fragments_data = list(executor.map(_parse_phrase_fragment_data, [paths[i] for i in pending]))
+    else:
+        fragments_data = [_parse_phrase_fragment_data(paths[i]) for i in pending]
+    for i, data in zip(pending, fragments_data):
+        fragment = Phrases()
+        fragment.ParseFromString(data)
+        results[i] = fragment
+        cache_path = cache_paths[i]
+        if cache_path is not None:
+            PHRASE_FRAGMENTS_DIR_PATH.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix('.tmp')
+            tmp_path.write_bytes(data)
+            tmp_path.replace(cache_path)
+    return list(zip(results, cache_paths))
+
+
+def main(manifest: Optional[BuildManifest] = None, jobs: Optional[int] = None):
+    """
+    生成 `phrases.pb`。
+
+    Args:
+        manifest: 构建清单。给定时，所有词表文件均未改变则跳过；否则只重新解析改变了的文件，
+            其余文件取缓存的片段。为 None 时总是全部重新解析。
+        jobs: 并行解析词表文件的工作进程数，见 `load_phrase_fragments`。
+    """
     phrases_file = Path('../data/phrases.yml')
     assert phrases_file.exists(), 'phrases.yml not found'
-    phrases = Phrases()
+    inputs = [*PHRASES_YML_FILES, *PHRASES_CODE_PATHS]
+    outputs = [PHRASES_PB_PATH]
+    if manifest is not None and manifest.up_to_date('phrases', inputs, outputs):
+        print('phrases.pb: up to date')
+        return
     for path in PHRASES_YML_FILES:
         assert path.exists(), f'{path} not found'
-        with open(path, 'r', encoding='utf-8') as f:
-            yaml_phrases = yaml.load(f, yaml.Loader)
-            add_phrase(phrases, yaml_phrases)
+    phrases = Phrases()
+    used_cache_paths = set()
+    for fragment, cache_path in load_phrase_fragments(PHRASES_YML_FILES, manifest, jobs):
+        merge_phrase_fragment(phrases, fragment)
+        used_cache_paths.add(cache_path)
     # post_process_multiple_acceptable_written(phrases)
     phrases.phrase_tag_display.extend([''] * len(PHRASE_TAG_MAP))
     for k, v in PHRASE_TAG_MAP.items():
         phrases.phrase_tag_display[v] = k
     Path('../dist').mkdir(exist_ok=True)
-    with open('../dist/phrases.pb', 'wb') as f:
+    tmp_path = Path(f'{PHRASES_PB_PATH}.tmp')
+    with open(tmp_path, 'wb') as f:
         f.write(phrases.SerializeToString())
-    with open('../dist/phrases.pb', 'rb') as f:
+    tmp_path.replace(PHRASES_PB_PATH)
+    with open(PHRASES_PB_PATH, 'rb') as f:
         phrases = Phrases()
         phrases.ParseFromString(f.read())
+    if manifest is not None:
+        # 删除不再对应任何词表文件的片段。
+        for cache_path in PHRASE_FRAGMENTS_DIR_PATH.glob('*.pb'):
+            if cache_path not in used_cache_paths:
+                cache_path.unlink()
+        manifest.record('phrases', inputs, outputs)
 
 
 def verify_puj(puj_phrase: str):
-    def assert_puj_word(puj_word: str, *args):
+    for kind, puj_word, _, _, _ in pujcommon.Sentence.iter_tokens(puj_phrase):
+        if kind != pujcommon.Sentence.TOKEN_WORD:
+            continue
         matched = pujcommon.Pronunciation.REGEXP_WORD.match(puj_word)
         if not matched:
             raise ValueError(f'Invalid PUJ word: {puj_word}')
@@ -100,7 +229,6 @@ def verify_puj(puj_phrase: str):
             raise ValueError(f'PUJ word without final: {puj_word}')
         if not matched.group('tone'):
             raise ValueError(f'PUJ word without tone: {puj_word}')
-    pujutils.PUJUtils.for_each_word_in_sentence(puj_phrase, assert_puj_word)
 
 
 def get_cmn_no_paren_if_needed(cmn_list: list[str]):
@@ -129,7 +257,7 @@ def get_cmn_no_paren_if_needed(cmn_list: list[str]):
     return cmn_no_paren_list
 
 
-def add_phrase(phrases: Phrases, yaml_phrases):
+def add_phrase(phrases: Phrases, yaml_phrases, tag_map: Optional[dict[str, int]] = None):
     i = len(phrases.phrases)
     for yaml_phrase in yaml_phrases:
         k, v = next(iter(yaml_phrase.items()))
@@ -149,7 +277,7 @@ def add_phrase(phrases: Phrases, yaml_phrases):
                 cmn_list = cmn_may_have_paren_list
                 cmn_paren_list = []
             word_class_list = [get_word_class(x) for x in word_class_list.split('/')] if word_class_list else []
-            tag_list = [get_phrase_tag(x) for x in tag_list.split('/')] if tag_list else []
+            tag_list = [get_phrase_tag(x, tag_map) for x in tag_list.split('/')] if tag_list else []
             accents = []
             for accent in v.get('accents', []):
                 for accent_id, accent_puj in accent.items():
@@ -1,22 +1,100 @@
 import dataclasses
+import functools
+import itertools
 import libpuj.pujpb as pb
 import re
 import unicodedata
+import weakref
+
+from _weakref import _remove_dead_weakref
+from typing import Callable, Hashable, Iterable, Iterator, Mapping, Optional, Sequence, Union
 
 
 class ConversionError(ValueError):
     """拼音转换过程中出现的错误，例如无法解析或使用了不支持的方案。"""
 
 
-@dataclasses.dataclass
 class AbstractPronunciation:
-    initial: str = None
-    final: str = None
-    tone: int = 0
+    """
+    拼音的抽象基类。
+
+    实例不可变、可哈希，可直接作为字典的键。同一类中声韵调完全相同的读音经
+    驻留表共享同一个仍在使用的实例，因此无需也不应复制；需要改变声韵调时用 `_replace`
+    得到新的实例。相等比较要求类型相同且声韵调相同。
+    """
+    __slots__ = ('initial', 'final', 'tone', '_hash', '__weakref__')
+
+    initial: str
+    final: str
+    tone: int
     # 该方案输出是否存在大小写区分。为 False 时（如国际音标），
     # 句子转换结束后不进行大小写转换，因为大小写在音标中表示不同音素。
     has_case: bool = True
 
+    def __new__(cls, initial: str = None, final: str = None, tone: int = 0):
+        return cls._make(initial, final, tone)
+
+    @classmethod
+    def _make(cls, initial: Optional[str], final: Optional[str], tone: int) -> 'AbstractPronunciation':
+        """
+        取得声韵调为 (initial, final, tone) 的驻留实例，不经过子类构造时的规范化。
+        """
+        key = (cls, initial, final, tone)
+        ref = _INTERNED_PRONUNCIATIONS.get(key)
+        if ref is not None:
+            self = ref()
+            if self is not None:
+                return self
+        self = object.__new__(cls)
+        object.__setattr__(self, 'initial', initial)
+        object.__setattr__(self, 'final', final)
+        object.__setattr__(self, 'tone', tone)
+        object.__setattr__(self, '_hash', hash((initial, final, tone)))
+        ref = weakref.KeyedRef(self, _discard_interned, key)
+        while True:
+            # 多线程同时创建时以先写入者为准，保证同一读音只有一个实例。
+            current = _INTERNED_PRONUNCIATIONS.setdefault(key, ref)
+            if current is ref:
+                return self
+            existing = current()
+            if existing is not None:
+                return existing
+            # 旧实例已回收、尚未从驻留表中删除。
+            _remove_dead_weakref(_INTERNED_PRONUNCIATIONS, key)
+
+    def _replace(self, **changes) -> 'AbstractPronunciation':
+        """
+        返回替换了部分声韵调的实例，同样不经过规范化。
+        """
+        return self._make(changes.get('initial', self.initial),
+                          changes.get('final', self.final),
+                          changes.get('tone', self.tone))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.initial, self.final, self.tone) == (other.initial, other.final, other.tone)
+
+    def __hash__(self):
+        return self._hash
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return type(self)._make, (self.initial, self.final, self.tone)
+
     def __str__(self):
         return f'{self.initial}{self.final}{self.tone}'
 
@@ -24,10 +102,37 @@ class AbstractPronunciation:
         return self.__str__()
 
 
+# 读音驻留表 {(类型, initial, final, tone): 实例的弱引用}。解析任意输入得到的读音都会驻留，组合没有上限，
+# 因此只弱引用实例：不再使用的读音随之回收并从表中删除，驻留表的大小不超过仍在使用的读音数。
+# 不用 `weakref.WeakValueDictionary`，是为了让查找只经过一次字典查询与一次弱引用调用。
+_INTERNED_PRONUNCIATIONS: dict[tuple, weakref.KeyedRef] = {}
+
+
+def _discard_interned(ref: weakref.KeyedRef) -> None:
+    # 实例回收时删除其条目；条目已被同一读音的新实例替换时不删除。
+    _remove_dead_weakref(_INTERNED_PRONUNCIATIONS, ref.key)
+
+
+def _rank_tone_marks(possible_tone_marks: list[list[str]]) -> dict[str, tuple[int, int]]:
+    """
+    调符 -> (查找顺序, 声调)。
+
+    查找顺序即按声调从小到大、同一声调内按列表顺序逐个查找调符时的先后次序；
+    同一调符出现在多个声调中时取最先出现者。
+    """
+    ranks = {}
+    for tone, marks in enumerate(possible_tone_marks):
+        for mark in marks:
+            ranks.setdefault(mark, (len(ranks), tone))
+    return ranks
+
+
 class Pronunciation(AbstractPronunciation):
     """
     ASCII 白话字拼音。内部存储为 ASCII 形式（特殊字母 ṳ o̤ 记录为 ur or），可输出为书面形式。
     """
+    __slots__ = ()
+
     _special_vowels = {
         "ur": "ṳ",
         "or": "o̤",
@@ -63,6 +168,8 @@ class Pronunciation(AbstractPronunciation):
         ["\u0304"],  # 7
         ["\u0301", "\u0341", "\u0302", "\u030D"],  # 8
     ]
+    __puj_tone_mark_ranks = _rank_tone_marks(__puj_possible_tone_marks)
+    __puj_possible_tone_marks_set = frozenset(__puj_tone_mark_ranks)
     __puj_dp_initial_map = {
         '': '',
         '0': '',
@@ -137,7 +244,7 @@ class Pronunciation(AbstractPronunciation):
         'p': 'p_}',
     }
 
-    def __init__(self, initial: str = '', final: str = '', tone: int = 0):
+    def __new__(cls, initial: str = '', final: str = '', tone: int = 0):
         if initial == '0' or initial is None:
             initial = ''
         elif initial == 'ch':
@@ -148,7 +255,7 @@ class Pronunciation(AbstractPronunciation):
             initial = 'j'
         if final is None:
             final = ''
-        super().__init__(initial, final, tone)
+        return cls._make(initial, final, tone)
 
     def __copy__(self):
         return Pronunciation(self.initial, self.final, self.tone)
@@ -177,31 +284,41 @@ class Pronunciation(AbstractPronunciation):
     def from_written(cls, written: str) -> 'Pronunciation':
         if not written:
             return cls()
-        written = unicodedata.normalize('NFD', written)
+        parsed = cls._parse_written(written)
+        if parsed is None:
+            return cls()
+        return cls(*parsed)
+
+    @classmethod
+    @functools.lru_cache(maxsize=8192)
+    def _parse_written(cls, written: str) -> Optional[tuple[str, str, int]]:
+        """
+        解析书面白话字，返回 (initial, final, tone)；无法解析时返回 None。
+
+        结果按输入缓存。纯 ASCII 的输入不含调符与特殊字母，跳过规范化与调符处理。
+        """
         # 如果没有找到调符，默认 1 声
         tone = 1
-        # 消除调符
-        for i, possible_marks in enumerate(cls.__puj_possible_tone_marks):
-            for possible_tone_mark in possible_marks:
-                if possible_tone_mark in written:
-                    written = written.replace(possible_tone_mark, '')
-                    tone = i
-                    break
-            else:
-                continue
-            break
+        if not written.isascii():
+            written = unicodedata.normalize('NFD', written)
+            # 消除调符：一次找出所有出现的调符，取查找顺序最靠前的一个
+            marks = cls.__puj_possible_tone_marks_set.intersection(written)
+            if marks:
+                mark = min(marks, key=cls.__puj_tone_mark_ranks.__getitem__)
+                written = written.replace(mark, '')
+                tone = cls.__puj_tone_mark_ranks[mark][1]
+            # 特殊字符转 ASCII（书面 ṳ o̤ 转内部 ur or）
+            written = written.replace(cls._special_vowels['ur'], 'ur')
+            written = written.replace(cls._special_vowels['or'], 'or')
+            written = written.replace(cls._special_vowels['nn'], 'nn')
         # 消除末尾的数字声调
         if written[-1].isdigit():
             if tone:
-                return cls()
+                return None
             tone = int(written[-1])
             if not (1 <= tone <= 8):
-                return cls()
+                return None
             written = written[:-1]
-        # 特殊字符转 ASCII（书面 ṳ o̤ 转内部 ur or）
-        written = written.replace(cls._special_vowels['ur'], 'ur')
-        written = written.replace(cls._special_vowels['or'], 'or')
-        written = written.replace(cls._special_vowels['nn'], 'nn')
         # 入声做一次额外处理：4 声无调符，8 声的调符可能与 2 声或 5 声相同。
         # 这里简化了判断的依据。如果是入声韵并且有声调符号，那么就认为是 8 声。
         # 如果是入声韵并且前面没发现调符，就是 4 声。
@@ -209,10 +326,8 @@ class Pronunciation(AbstractPronunciation):
             tone = 8 if tone else 4
         match = cls.REGEXP_WORD.match(written)
         if not match:
-            return cls()
-        initial = match.group('initial') or ''
-        final = match.group('final')
-        return cls(initial, final, tone)
+            return None
+        return match.group('initial') or '', match.group('final'), tone
 
     def to_written(self) -> str:
         """
@@ -385,6 +500,7 @@ class PronunciationWilliamDuffus(Pronunciation):
     - 腭化 ch/chh/j 非腭化 ts/tsh/z
     - 存在 oa 写法（用于声母 t th 之后，含鼻化情况。序言中还说有 oai，但正文没有）
     """
+    __slots__ = ()
 
     REGEXP_WORD = re.compile(
         r"^(?P<word>(?P<initial>(pfh|pf|phf|ph|p|mv(?=u)|bv(?=u)|f|m|b|th|t|l|kh|k|ng|n|g|h|tsh|ts|chh|ch|c|s|j|z|0))?(?P<final>(?P<medial>(y|yi|i|u|iu)(?=[aeoiu])|(o)(?=a))?(?P<nucleus>or|er|ur|ir|a|e|o|i|ṳ|u|o̤|ng|n|m)(?P<coda>(y|yi|i|u)?(m|ng|nn'?h|nn'?|n|p|t|k|h)?))(?P<tone>\d)?)$",
@@ -401,9 +517,9 @@ class PronunciationWilliamDuffus(Pronunciation):
         "\u030D",  # 8 撇号，以竖线符 ̍ 代替
     ]
 
-    def __init__(self, initial: str = '', final: str = '', tone: int = 0):
+    def __new__(cls, initial: str = '', final: str = '', tone: int = 0):
         final = final.replace('oa', 'ua')
-        super().__init__(initial, final, tone)
+        return super().__new__(cls, initial, final, tone)
 
     @classmethod
     def _get_tone_mark_index(cls, final: str) -> int:
@@ -459,6 +575,7 @@ class DPPronunciation(AbstractPronunciation):
     """
     潮拼拼音。
     """
+    __slots__ = ()
 
     # 潮拼单词正则，参考前端 SPuj.ts 的 regexpWordDp。
     REGEXP_WORD = re.compile(
@@ -469,9 +586,6 @@ class DPPronunciation(AbstractPronunciation):
         r"(?P<tone>\d)?$",
         re.IGNORECASE)
 
-    def __init__(self, initial: str = None, final: str = None, tone: int = 0):
-        super().__init__(initial, final, tone)
-
     @classmethod
     def from_written(cls, written: str):
         return cls.from_combination(written)
@@ -504,6 +618,7 @@ class IPAPronunciation(AbstractPronunciation):
     国际音标。内部存储为 X-SAMPA 形式，可输出为书面形式。
     此处存储声调为调序，并非实际调值。实际调值另外建模处理。
     """
+    __slots__ = ()
 
     has_case = False
     """国际音标中大小写表示不同音素，因此不进行大小写转换。"""
@@ -550,9 +665,6 @@ class IPAPronunciation(AbstractPronunciation):
         '||': '‖', '|': '|', '+\\': '⦀', ';': '¡'}
     __ipa_x_sampa_map = {k: v for v, k in __x_sampa_ipa_map.items()}
 
-    def __init__(self, initial: str = None, final: str = None, tone: int = 0):
-        super().__init__(initial, final, tone)
-
     def to_x_sampa(self):
         return f"{self.initial}{self.final}__{self.tone}"
 
@@ -565,6 +677,19 @@ class IPAPronunciation(AbstractPronunciation):
         tone = self.__x_sampa_ipa_map.get(f"__{self.tone}", '')
         return f"{initial}{final}{tone}"
 
+    # 五度标记法的调值数字 -> 赵元任调型符号。
+    CHAO_TONE_LETTERS = {'1': '˩', '2': '˨', '3': '˧', '4': '˦', '5': '˥'}
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def pitch_to_tone_letters(pitch: int) -> str:
+        """
+        将五度标记法的实际调值（如 `52`）转为赵元任调型符号（如 `˥˨`）。调值为 0 时返回空字符串。
+        """
+        if not pitch:
+            return ''
+        return ''.join(IPAPronunciation.CHAO_TONE_LETTERS[digit] for digit in str(pitch))
+
 
 @dataclasses.dataclass
 class Entry:
@@ -576,6 +701,10 @@ class Entry:
     freq: int
     char_ref: str
     details: list[pb.EntryDetail]
+    pron_aka: list[pb.Entry.PronunciationAka] = dataclasses.field(default_factory=list)
+    """各口音点又音"""
+    accents_nasalized: list[str] = dataclasses.field(default_factory=list)
+    """可读鼻化的口音点"""
 
     @classmethod
     def from_pb(cls, entry: pb.Entry) -> 'Entry':
@@ -588,6 +717,8 @@ class Entry:
             freq=entry.freq,
             char_ref=entry.char_ref,
             details=list(entry.details),
+            pron_aka=list(entry.pron_aka),
+            accents_nasalized=list(entry.accents_nasalized),
         )
 
 
@@ -620,6 +751,50 @@ class SandhiGroup:
             raise TypeError(f"{SandhiGroup.__name__}.{SandhiGroup.__getitem__.__name__} only accepts integer index")
 
 
+# 音节在连调单位中的位置，见 `sandhi_tone_contexts`。
+TONE_POSITION_SANDHI = 0
+TONE_POSITION_CITATION = 1
+TONE_POSITION_NEUTRAL = 2
+
+
+def sandhi_tone_contexts(tone_numbers: list[int], citation_index: int) -> list[tuple[int, int, int, int]]:
+    """
+    求连调单位中每个音节的声调环境，即决定其实际调值所需的全部信息，与口音无关。
+
+    声调环境为 (position, tone_number, a, b)：
+    - 本调之前（连读变调）：a 为下一音节是否为本调音节，b 为本调音节的调类；
+    - 本调音节：a 为左邻音节的调类（没有时为 0），b 恒为 0；
+    - 本调之后（轻声）：a、b 恒为 0。
+
+    Args:
+        tone_numbers: 连调单位中各音节的调类。
+        citation_index: 本调音节的下标。
+    """
+    citation_tone_number = tone_numbers[citation_index]
+    result = []
+    for i, tone_number in enumerate(tone_numbers):
+        if i < citation_index:
+            result.append((TONE_POSITION_SANDHI, tone_number, int(i + 1 == citation_index), citation_tone_number))
+        elif i == citation_index:
+            result.append((TONE_POSITION_CITATION, tone_number, tone_numbers[i - 1] if i != 0 else 0, 0))
+        else:
+            result.append((TONE_POSITION_NEUTRAL, tone_number, 0, 0))
+    return result
+
+
+@functools.lru_cache(maxsize=8192)
+def _word_tone_number(word: str) -> int:
+    word = word.lower()
+    try:
+        if word[-1].isdigit():
+            pron = Pronunciation.from_combination(word)
+        else:
+            pron = Pronunciation.from_written(word)
+    except ConversionError:
+        return 0
+    return pron.tone if pron.final else 0
+
+
 @dataclasses.dataclass
 class Sentence:
     entries: list[Entry]
@@ -629,33 +804,85 @@ class Sentence:
     word_groups: list[tuple[int, int, str]]
     """分词列表"""
 
+    # 分词结果类别，与 `_TOKEN_RE` 的分组序号对应。
+    TOKEN_WORD = 1
+    TOKEN_NON_WORD = 2
+
+    # 除 ASCII 字母/数字/撇号外，还包含组合附加符号（U+0300-U+036F），
+    # 使被 NFD 拆开的 ê(→e+◌̂)、ṳ、调符等保持在同一拼音单词内。
+    _TOKEN_RE = re.compile(r"([a-zA-Z0-9'\u0300-\u036f]+)|([^a-zA-Z0-9'\u0300-\u036f]+)")
+
     @staticmethod
-    def for_each_word_in_sentence(sentence: str, func_word = None, func_non_word = None):
+    def iter_tokens(sentence: str) -> Iterator[tuple[int, str, int, int, int]]:
+        """
+        将句子切分为拼音单词与非单词片段。
+
+        句子先做 NFD 规范化，再一次扫描切分。
+
+        Yields:
+            (kind, text, start, end, hyphen_count)。其中 kind 为 `TOKEN_WORD`
+            或 `TOKEN_NON_WORD`；start、end 为片段在 NFD 规范化后句子中的位置；
+            hyphen_count 为单词后紧跟的连字符数（0、1 或 2，非单词片段恒为 0）。
+        """
         sentence = unicodedata.normalize('NFD', sentence)
-        # 除 ASCII 字母/数字/撇号外，还包含组合附加符号（U+0300-U+036F），
-        # 使被 NFD 拆开的 ê(→e+◌̂)、ṳ、调符等保持在同一拼音单词内。
-        regexp = re.compile(r"[a-zA-Z0-9'\u0300-\u036f]")
-        next_hyphen_count = 0
-        i = 0
-        while i < len(sentence):
-            cur = ''
-            if regexp.match(sentence[i]):
-                while i < len(sentence) and regexp.match(sentence[i]):
-                    cur += sentence[i]
-                    i += 1
-                next_hyphen_count = 0
-                if i < len(sentence) and sentence[i] == '-':
-                    next_hyphen_count += 1
-                    if i + 1 < len(sentence) and sentence[i + 1] == '-':
-                        next_hyphen_count += 1
+        for match in Sentence._TOKEN_RE.finditer(sentence):
+            kind = match.lastindex
+            start, end = match.span()
+            hyphen_count = 0
+            if kind == Sentence.TOKEN_WORD and sentence.startswith('-', end):
+                hyphen_count = 2 if sentence.startswith('--', end) else 1
+            yield kind, match.group(), start, end, hyphen_count
+
+    @staticmethod
+    def for_each_word_in_sentence(sentence: str, func_word = None, func_non_word = None):
+        """
+        以回调形式遍历句子中的单词与非单词片段，见 `iter_tokens`。
+
+        单词回调为 func_word(word, next_hyphen_count)，非单词回调为 func_non_word(non_word)。
+        """
+        for kind, text, _, _, hyphen_count in Sentence.iter_tokens(sentence):
+            if kind == Sentence.TOKEN_WORD:
                 if func_word:
-                    func_word(cur, next_hyphen_count)
+                    func_word(text, hyphen_count)
+            elif func_non_word:
+                func_non_word(text)
+
+    @staticmethod
+    def build_sandhi_groups(sentence: str,
+                            tone_number_of: Optional[Callable[[str], int]] = None) -> 'SentenceSandhiGroups':
+        """
+        按连字符将白话字句子划分为连调单位，见 `SentenceSandhiGroups`。
+
+        `-` 连接同一连调单位中的音节；`--` 之后的音节读轻声，`--` 之前的音节为本调音节；
+        没有 `--` 时末音节为本调音节。空格、标点等其他非单词片段结束当前连调单位。
+
+        Args:
+            sentence: 白话字句子。
+            tone_number_of: 求单词调类的函数，按单词在句中的顺序各调用一次；
+                为 None 时按白话字（书面形式或数字调 ASCII 形式）解析，无法解析的单词调类记为 0。
+        """
+        if tone_number_of is None:
+            tone_number_of = _word_tone_number
+        result = SentenceSandhiGroups()
+        begin = citation = None
+        joined = False
+        for kind, text, start, end, _ in Sentence.iter_tokens(sentence):
+            if kind == Sentence.TOKEN_WORD:
+                if not joined:
+                    if begin is not None:
+                        result._add_group(begin, citation)
+                    begin, citation = len(result.words), None
+                result.words.append(text)
+                result.spans.append((start, end))
+                result.tone_numbers.append(tone_number_of(text))
+                joined = False
             else:
-                while i < len(sentence) and not regexp.match(sentence[i]):
-                    cur += sentence[i]
-                    i += 1
-                if func_non_word:
-                    func_non_word(cur)
+                joined = begin is not None and text in ('-', '--')
+                if text == '--' and citation is None:
+                    citation = len(result.words) - 1
+        if begin is not None:
+            result._add_group(begin, citation)
+        return result
 
     # 句子字母大小写类别，与前端 SPuj.ts 的 ESentenceLetterCase 对应。
     LETTER_CASE_NONE = 0
@@ -719,6 +946,33 @@ class Sentence:
         return sentence
 
 
+@dataclasses.dataclass
+class SentenceSandhiGroups:
+    """
+    整句白话字的连调单位划分，由 `Sentence.build_sandhi_groups` 生成。
+
+    只记录各音节的调类与声调环境，不为每个音节建立 `Entry`，
+    可供多个口音反复求实际调值（见 `Accent.get_sentence_actual_tones`）。
+    """
+    words: list[str] = dataclasses.field(default_factory=list)
+    """单词（NFD 规范化后的原文）"""
+    spans: list[tuple[int, int]] = dataclasses.field(default_factory=list)
+    """单词在 NFD 规范化后句子中的位置"""
+    tone_numbers: list[int] = dataclasses.field(default_factory=list)
+    """各音节的调类"""
+    groups: list[tuple[int, int, int]] = dataclasses.field(default_factory=list)
+    """连调单位列表 (begin, end, citation_index)，均为音节下标"""
+    contexts: list[tuple[int, int, int, int]] = dataclasses.field(default_factory=list)
+    """各音节的声调环境，见 `sandhi_tone_contexts`"""
+
+    def _add_group(self, begin: int, citation_index: Optional[int]):
+        end = len(self.words)
+        if citation_index is None:
+            citation_index = end - 1
+        self.groups.append((begin, end, citation_index))
+        self.contexts.extend(sandhi_tone_contexts(self.tone_numbers[begin:end], citation_index - begin))
+
+
 @dataclasses.dataclass
 class Paragraph:
     sentences: list[Sentence]
@@ -729,29 +983,119 @@ class FuzzyRule:
     example_chars: list[str]
 
     def __init__(self):
-        self._possible_pronunciations_map: dict[str, Pronunciation] = {}
+        self._possible_pronunciations_map: dict[Pronunciation, Pronunciation] = {}
         self._possible_pronunciations_map_reverse: dict[Pronunciation, list[Pronunciation]] = {}
+        # 预编译的声韵转换表 {(initial, final): (initial, final)}，为 None 时不启用。
+        self._transitions: Optional[dict[tuple[str, str], tuple[str, str]]] = None
+        self._transitions_lazy = False
+        # 待缓存的读音列表（或返回读音列表的函数），见 `cache_possible_pronunciations_map` 的 `lazy` 参数。
+        self._pending_possible_pronunciations: Optional[
+            Union[list[Pronunciation], Callable[[], Iterable[Pronunciation]]]] = None
         pass
 
-    def _fuzzy(self, result: Pronunciation):
-        pass
+    def _fuzzy(self, result: Pronunciation) -> Pronunciation:
+        return result
 
     def fuzzy_result(self, origin: Pronunciation) -> Pronunciation:
-        if origin.__str__() in self._possible_pronunciations_map:
-            return self._possible_pronunciations_map[origin.__str__()]
+        """
+        求读音 `origin` 应用本规则后的结果。
+        """
+        cached = self._possible_pronunciations_map.get(origin)
+        if cached is not None:
+            return cached
         result = origin.__copy__()
-        self._fuzzy(result)
-        return result
+        if self._transitions is None:
+            return self._fuzzy(result)
+        initial, final = self.transition(result.initial, result.final)
+        return result._replace(initial=initial, final=final)
+
+    def transition(self, initial: str, final: str) -> tuple[str, str]:
+        """
+        求声韵组合 (initial, final) 应用本规则后的结果。
 
-    def cache_possible_pronunciations_map(self, possible_pronunciations: list[Pronunciation]):
-        self._possible_pronunciations_map = {}
-        self._possible_pronunciations_map_reverse = {}
+        优先查声韵转换表；未命中时执行正则规则，并在按需编译模式下记入转换表。
+        """
+        transitions = self._transitions
+        if transitions is not None:
+            transition = transitions.get((initial, final))
+            if transition is not None:
+                return transition
+        transition = self._fuzzy_initial_final(initial, final)
+        if transitions is not None and self._transitions_lazy:
+            transitions[(initial, final)] = transition
+        return transition
+
+    def _fuzzy_initial_final(self, initial: str, final: str) -> tuple[str, str]:
+        # 不经过构造函数的规范化，保证与 `_fuzzy` 逐条改写的结果一致。
+        result = self._fuzzy(Pronunciation._make(initial, final, 0))
+        return result.initial, result.final
+
+    def compile_transitions(self, possible_pronunciations: Iterable[Pronunciation] = (), lazy: bool = True):
+        """
+        预编译声韵转换表，使 `fuzzy_result` 以查表代替逐条正则运算。
+
+        模糊音规则只改写声母与韵母，不改变声调，因此同一声韵组合在任意声调下的
+        结果都相同。对 `possible_pronunciations`（通常为字表中的全部读音）逐一
+        执行规则并记录 (initial, final) -> (initial, final)；表中没有的组合仍
+        退回正则运算，结果与不编译时完全一致。
+
+        Args:
+            possible_pronunciations: 需预先编译的读音；为空时转换表初始为空。
+            lazy: 是否将未命中转换表、经正则运算得到的结果补充进转换表。
+        """
+        self._transitions = {}
+        self._transitions_lazy = True
         for pronunciation in possible_pronunciations:
-            fuzzy_pronunciation = pronunciation.__copy__()
-            self._fuzzy(fuzzy_pronunciation)
-            self._possible_pronunciations_map[pronunciation.__str__()] = fuzzy_pronunciation
-            self._possible_pronunciations_map_reverse.setdefault(fuzzy_pronunciation.__str__(), []).append(
-                pronunciation)
+            try:
+                self.transition(pronunciation.initial, pronunciation.final)
+            except Exception:
+                # 无法应用规则的读音不编译，留待实际转换时按正则路径报错。
+                continue
+        self._transitions_lazy = lazy
+
+    def cache_possible_pronunciations_map(
+            self, possible_pronunciations: Union[Iterable[Pronunciation], Callable[[], Iterable[Pronunciation]]],
+            lazy: bool = False):
+        """
+        缓存 `possible_pronunciations` 中每个读音应用本规则后的结果，并建立反查表。
+
+        正查表供 `fuzzy_result` 直接命中；反查表以规则应用后的读音为键，
+        记录所有可能的原读音。尚未启用声韵转换表时会一并按需启用。
+
+        Args:
+            possible_pronunciations: 需缓存的读音，通常为字表中的全部读音；也可为返回读音的函数，
+                到建立缓存时才调用，读音需要解码时可省去不反查时的解码开销。
+            lazy: 为 True 时只记下读音列表，到第一次反查时才建立缓存。
+        """
+        if lazy:
+            if not callable(possible_pronunciations):
+                possible_pronunciations = list(possible_pronunciations)
+            self._pending_possible_pronunciations = possible_pronunciations
+            return
+        if callable(possible_pronunciations):
+            possible_pronunciations = possible_pronunciations()
+        if self._transitions is None:
+            self.compile_transitions()
+        possible_pronunciations_map: dict[Pronunciation, Pronunciation] = {}
+        possible_pronunciations_map_reverse: dict[Pronunciation, list[Pronunciation]] = {}
+        for pronunciation in possible_pronunciations:
+            pronunciation = pronunciation.__copy__()
+            if pronunciation in possible_pronunciations_map:
+                continue
+            try:
+                fuzzy_pronunciation = self.fuzzy_result(pronunciation)
+            except Exception:
+                continue
+            possible_pronunciations_map[pronunciation] = fuzzy_pronunciation
+            possible_pronunciations_map_reverse.setdefault(fuzzy_pronunciation, []).append(pronunciation)
+        self._possible_pronunciations_map = possible_pronunciations_map
+        self._possible_pronunciations_map_reverse = possible_pronunciations_map_reverse
+
+    def _ensure_possible_pronunciations_map(self):
+        pending = self._pending_possible_pronunciations
+        if pending is not None:
+            self.cache_possible_pronunciations_map(pending)
+            self._pending_possible_pronunciations = None
 
 
 class FuzzyRuleAction(FuzzyRule):
@@ -767,31 +1111,37 @@ class FuzzyRuleAction(FuzzyRule):
         res.replacement = data.replacement_backslash
         return res
 
-    def _fuzzy(self, result: Pronunciation):
+    def _fuzzy(self, result: Pronunciation) -> Pronunciation:
         if self.action == 'final':
-            result.final = re.sub(self.pattern, self.replacement, result.final)
+            result = result._replace(final=self.pattern.sub(self.replacement, result.final))
         if self.action == 'initial+final':
             initial_final = result.initial + result.final
-            new_initial_final = re.sub(self.pattern, self.replacement, initial_final)
+            new_initial_final = self.pattern.sub(self.replacement, initial_final)
             match = Pronunciation.REGEXP_WORD.match(new_initial_final)
             if not match:
                 Pronunciation.REGEXP_WORD.match(new_initial_final)
                 raise Exception(f"New initial+final not matched: {new_initial_final} from {initial_final}")
-            result.initial = match.group('initial') or ''
-            result.final = match.group('final')
+            result = result._replace(initial=match.group('initial') or '', final=match.group('final'))
+        return result
 
 
 class FuzzyRuleDescriptor(FuzzyRule):
     ALL_DESCRIPTORS_MAP = []
+    """
+    全局的规则描述符表，供未指定描述符表的 `Accent.from_pb` 使用。
+    只为兼容旧代码保留，新代码应使用 `AccentSet`，由其持有各自的描述符表。
+    """
     descriptor_id = None
     actions: list[FuzzyRule]
 
+    @classmethod
+    def list_from_pb(cls, data: Iterable[pb.FuzzyRuleDescriptor]) -> list['FuzzyRuleDescriptor']:
+        """解析规则描述符表，下标即口音数据中引用规则所用的编号。"""
+        return [cls.from_pb(desc) for desc in data]
+
     @classmethod
     def init_from_pb(cls, data: list[pb.FuzzyRuleDescriptor]):
-        cls.ALL_DESCRIPTORS_MAP = []
-        for desc in data:
-            descriptor = cls.from_pb(desc)
-            cls.ALL_DESCRIPTORS_MAP.append(descriptor)
+        cls.ALL_DESCRIPTORS_MAP = cls.list_from_pb(data)
 
     @classmethod
     def from_pb(cls, data: pb.FuzzyRuleDescriptor):
@@ -804,9 +1154,10 @@ class FuzzyRuleDescriptor(FuzzyRule):
     def get_rule_from_pb(cls, rule_id: int):
         return cls.ALL_DESCRIPTORS_MAP[rule_id]
 
-    def _fuzzy(self, result: Pronunciation):
+    def _fuzzy(self, result: Pronunciation) -> Pronunciation:
         for action in self.actions:
-            action._fuzzy(result)
+            result = action._fuzzy(result)
+        return result
 
 
 class Accent(FuzzyRule):
@@ -821,23 +1172,82 @@ class Accent(FuzzyRule):
     tones_special_smooth_neutral: bool = False
     tones_special_variable_3rd_2nd: bool = False
 
+    # 所属口音数据的版本，由 `AccentSet` 设置，见 `cache_key`。
+    _generation: Optional[int] = None
+    # `convert.try_deaccent` 最近一次为本口音建立的反推索引。
+    _deaccent_index = None
+
     __tone_2nd_3rd_4th_left_smooth = [0, 0, 23, 32, 3]
     __tone_2nd_right_smooth = 21
     __tone_3rd_left_variant = 25
 
-    def _fuzzy(self, result: Pronunciation):
+    def __init__(self):
+        super().__init__()
+        # 声调环境 -> 实际调值，见 `_actual_tones_of_contexts`。
+        self._actual_tone_cache: dict[tuple[int, int, int, int], int] = {}
+
+    @property
+    def cache_key(self) -> Hashable:
+        """
+        单词缓存（见 `convert.WordCache`）中代表本口音的键。属于 `AccentSet` 的口音为 (口音 id, 数据版本)，
+        不引用口音对象，重新加载数据后旧的口音数据可被回收；其他口音为口音对象本身。
+        """
+        if self._generation is None:
+            return self
+        return self.id, self._generation
+
+    def _fuzzy(self, result: Pronunciation) -> Pronunciation:
+        for rule in self.rules:
+            result = rule._fuzzy(result)
+        return result
+
+    def _fuzzy_initial_final(self, initial: str, final: str) -> tuple[str, str]:
+        # 逐条规则查各自的转换表。规则描述符在口音之间共享，
+        # 因此一个口音编译过的结果可被其他口音直接复用。
+        for rule in self.rules:
+            initial, final = rule.transition(initial, final)
+        return initial, final
+
+    def compile_transitions(self, possible_pronunciations: Iterable[Pronunciation] = (), lazy: bool = True):
         for rule in self.rules:
-            rule._fuzzy(result)
+            if rule._transitions is None:
+                rule.compile_transitions()
+        super().compile_transitions(possible_pronunciations, lazy)
+
+    def candidates_for(self, accented_pron: Union[Pronunciation, str]) -> list[Pronunciation]:
+        """
+        反查口音读音 `accented_pron` 可能对应的所有标准读音。
+
+        仅在 `cache_possible_pronunciations_map` 缓存过的读音范围内查找。
+
+        Args:
+            accented_pron: 口音读音，`Pronunciation` 或 ASCII 白话字（如 `kuinn7`）。
+
+        Returns:
+            标准读音列表；没有对应读音时返回空列表。
+        """
+        if isinstance(accented_pron, str):
+            accented_pron = Pronunciation.from_combination(accented_pron)
+        self._ensure_possible_pronunciations_map()
+        return list(self._possible_pronunciations_map_reverse.get(accented_pron.__copy__(), ()))
 
     @classmethod
-    def from_pb(cls, data: pb.Accent):
-        assert FuzzyRuleDescriptor.ALL_DESCRIPTORS_MAP
+    def from_pb(cls, data: pb.Accent, descriptors: Optional[Sequence[FuzzyRuleDescriptor]] = None):
+        """
+        Args:
+            data: 口音数据。
+            descriptors: 规则描述符表，`data.rules` 中的编号即其下标；为 None 时使用
+                `FuzzyRuleDescriptor.ALL_DESCRIPTORS_MAP`。
+        """
+        if descriptors is None:
+            assert FuzzyRuleDescriptor.ALL_DESCRIPTORS_MAP
+            descriptors = FuzzyRuleDescriptor.ALL_DESCRIPTORS_MAP
         result = Accent()
         result.id = data.id
         result.area = data.area
         result.subarea = data.subarea
         result.rules_input = data.rules
-        result.rules = [FuzzyRuleDescriptor.get_rule_from_pb(rule) for rule in data.rules]
+        result.rules = [descriptors[rule] for rule in data.rules]
         result.citation_tones = [0] + list(data.tones.citation)
         result.sandhi_tones = [0] + list(data.tones.sandhi)
         result.neutral_tones = [0] + list(data.tones.neutral)
@@ -850,46 +1260,143 @@ class Accent(FuzzyRule):
                 result.tones_special_variable_3rd_2nd = True
         return result
 
-    def get_actual_tones(self, sandhi_group: SandhiGroup) -> list[int]:
-        length = len(sandhi_group)
-        citation_index = sandhi_group.citation_index
-        citation_tone_number = sandhi_group[citation_index].pron.tone
-        result = [0] * length
-        i = length - 1
-        while i >= 0:
-            tone_number = sandhi_group[i].pron.tone
-            if i < citation_index:
-                tone = self.sandhi_tones[tone_number]
-                if self.tones_special_smooth_2nd_3rd_4th:
-                    if i + 1 != citation_index and 2 <= tone_number <= 4:
-                        tone = self.__tone_2nd_3rd_4th_left_smooth[tone_number]
-                    else:
-                        if tone_number == 3 and citation_tone_number == 2:
-                            if self.tones_special_variable_3rd_2nd:
-                                tone = self.__tone_3rd_left_variant
-                            else:
-                                tone = self.__tone_2nd_3rd_4th_left_smooth[tone_number]
-                        elif 2 <= tone_number <= 4:
-                            if citation_tone_number not in [2, 5, 8]:
-                                tone = self.__tone_2nd_3rd_4th_left_smooth[tone_number]
-                result[i] = tone
-            elif i == citation_index:
-                tone = self.citation_tones[tone_number]
-                if self.tones_special_smooth_2nd_3rd_4th:
-                    if tone_number == 2 and i != 0:
-                        left_tone_number = sandhi_group[i - 1].pron.tone
-                        if 2 <= left_tone_number <= 4:
-                            tone = self.__tone_2nd_right_smooth
-                result[i] = tone
-            else:
-                tone = self.neutral_tones[tone_number]
-                result[i] = tone
-            i -= 1
+    def _actual_tone(self, context: tuple[int, int, int, int]) -> int:
+        """求声调环境 `context`（见 `sandhi_tone_contexts`）下的实际调值。"""
+        position, tone_number, a, b = context
+        if position == TONE_POSITION_SANDHI:
+            next_is_citation, citation_tone_number = a, b
+            tone = self.sandhi_tones[tone_number]
+            if self.tones_special_smooth_2nd_3rd_4th:
+                if not next_is_citation and 2 <= tone_number <= 4:
+                    tone = self.__tone_2nd_3rd_4th_left_smooth[tone_number]
+                else:
+                    if tone_number == 3 and citation_tone_number == 2:
+                        if self.tones_special_variable_3rd_2nd:
+                            tone = self.__tone_3rd_left_variant
+                        else:
+                            tone = self.__tone_2nd_3rd_4th_left_smooth[tone_number]
+                    elif 2 <= tone_number <= 4:
+                        if citation_tone_number not in [2, 5, 8]:
+                            tone = self.__tone_2nd_3rd_4th_left_smooth[tone_number]
+        elif position == TONE_POSITION_CITATION:
+            left_tone_number = a
+            tone = self.citation_tones[tone_number]
+            if self.tones_special_smooth_2nd_3rd_4th:
+                if tone_number == 2 and 2 <= left_tone_number <= 4:
+                    tone = self.__tone_2nd_right_smooth
+        else:
+            tone = self.neutral_tones[tone_number]
+        return tone
+
+    def _actual_tones_of_contexts(self, contexts: Iterable[tuple[int, int, int, int]]) -> list[int]:
+        # 声调环境的取值有限，逐个口音缓存其实际调值，整句只需查表。
+        cache = self._actual_tone_cache
+        result = []
+        for context in contexts:
+            tone = cache.get(context)
+            if tone is None:
+                tone = cache[context] = self._actual_tone(context)
+            result.append(tone)
         return result
 
+    def get_actual_tones(self, sandhi_group: SandhiGroup) -> list[int]:
+        tone_numbers = [sandhi_group[i].pron.tone for i in range(len(sandhi_group))]
+        contexts = sandhi_tone_contexts(tone_numbers, sandhi_group.citation_index)
+        return self._actual_tones_of_contexts(contexts)
+
+    def get_sentence_actual_tones(self, sentence: Union[str, SentenceSandhiGroups]) -> list[int]:
+        """
+        求整句白话字中每个音节的实际调值。
+
+        Args:
+            sentence: 白话字句子，或 `Sentence.build_sandhi_groups` 的结果。
+
+        Returns:
+            按音节顺序排列的实际调值，与 `SentenceSandhiGroups.words` 一一对应。
+        """
+        if isinstance(sentence, str):
+            sentence = Sentence.build_sandhi_groups(sentence)
+        return self._actual_tones_of_contexts(sentence.contexts)
+
+    @staticmethod
+    def get_sentence_actual_tones_of_accents(accents: Iterable['Accent'],
+                                             sentence: Union[str, SentenceSandhiGroups]) -> dict[str, list[int]]:
+        """
+        对多个口音求整句白话字中每个音节的实际调值。句子只划分一次。
+
+        Returns:
+            口音 ID -> 实际调值列表，见 `get_sentence_actual_tones`。
+        """
+        if isinstance(sentence, str):
+            sentence = Sentence.build_sandhi_groups(sentence)
+        return {accent.id: accent.get_sentence_actual_tones(sentence) for accent in accents}
+
 
 class Accent_Dummy(Accent):
     id = 'Dummy'
     area = ''
     subarea = ''
     rules = []
+    # 没有口音规则，所有实例的转换结果相同。
+    _generation = 0
+
+    def candidates_for(self, accented_pron: Union[Pronunciation, str]) -> list[Pronunciation]:
+        # 没有口音规则，口音读音即标准读音。
+        if isinstance(accented_pron, str):
+            accented_pron = Pronunciation.from_combination(accented_pron)
+        return [accented_pron.__copy__()]
+
+
+# `AccentSet.generation` 的来源，从 1 开始（0 留给 `Accent_Dummy`）。
+_ACCENT_SET_GENERATIONS = itertools.count(1)
+
+
+class AccentSet(Mapping[str, Accent]):
+    """
+    一份口音数据（`accents.pb`）中的全部口音，以口音 id 为键的只读映射。
+
+    规则描述符表由本对象持有，而非 `FuzzyRuleDescriptor.ALL_DESCRIPTORS_MAP`，
+    因此同一进程中可同时加载多份不同版本的口音数据，多个线程同时加载也互不干扰。
+    加载后口音的组成不再改变，各规则的缓存只按需补充、整体替换，多个线程或协程可
+    不加锁地共用同一个实例；更新数据时另行加载新的实例，再整体替换引用即可，
+    正在使用旧实例的转换不受影响。
+    """
+
+    def __init__(self, descriptors: Iterable[FuzzyRuleDescriptor], accents: Iterable[Accent]) -> None:
+        """
+        Args:
+            descriptors: 规则描述符表。
+            accents: 口音，其规则应取自 `descriptors`。
+        """
+        self._descriptors = tuple(descriptors)
+        self._accents: dict[str, Accent] = {accent.id: accent for accent in accents}
+        # 每次加载得到新的版本号，同 id 的新旧口音在单词缓存中互不混淆。
+        self.generation = next(_ACCENT_SET_GENERATIONS)
+        for accent in self._accents.values():
+            if accent._generation is None:
+                accent._generation = self.generation
+
+    @classmethod
+    def from_pb(cls, data: pb.Accents) -> 'AccentSet':
+        descriptors = FuzzyRuleDescriptor.list_from_pb(data.fuzzy_rule_descriptors)
+        return cls(descriptors, (Accent.from_pb(a, descriptors) for a in data.accents))
+
+    @property
+    def descriptors(self) -> tuple[FuzzyRuleDescriptor, ...]:
+        """规则描述符表，下标即口音数据中引用规则所用的编号。"""
+        return self._descriptors
+
+    def get_rule(self, rule_id: int) -> FuzzyRuleDescriptor:
+        return self._descriptors[rule_id]
+
+    def __getitem__(self, accent_id: str) -> Accent:
+        return self._accents[accent_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._accents)
+
+    def __len__(self) -> int:
+        return len(self._accents)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(self._accents)})"
@@ -0,0 +1,579 @@
+# -*- coding: utf-8 -*-
+"""
+字表（`entries.pb`）的按需加载。
+
+`LazyEntries` 以内存映射打开数据文件，只扫描每条记录的位置、繁简字形与读音，
+建立 汉字 -> 记录 的索引；条目的释义、例词、又音等内容到实际查询该字时才解码。
+适用于只需查询少量汉字的短生命周期进程（命令行调用、工作进程等）。
+
+`EntriesIndex` 读取生成数据时一并输出的列式索引文件（`entries.idx`），连扫描也
+省去，打开后即可按汉字或读音查询。
+"""
+
+import array
+import bisect
+import collections.abc
+import heapq
+import itertools
+import mmap
+import pathlib
+import struct
+import sys
+import threading
+
+from typing import Iterator, Optional, Union
+
+import libpuj.pujpb as pb
+from libpuj.pujcommon import Entry, Pronunciation
+
+# 同一个字（或同一读音）的多个条目的优先次序：先按使用频率（“视情况而定”排在常用之后），
+# 再按字音类型，白读最自然，其次俗读、文读。
+_FREQ_RANK = {
+    pb.EF_COMMON: 0,
+    pb.EF_DEPENDS: 1,
+    pb.EF_LESS_COMMON: 2,
+    pb.EF_RARE: 3,
+    pb.EF_VERY_RARE: 4,
+}
+_CAT_RANK = {
+    pb.EC_COLLOQUIAL: 0,
+    pb.EC_CONVENTIONAL: 1,
+    pb.EC_LITERARY: 2,
+    pb.EC_NONE: 3,
+}
+
+
+def reading_rank(entry: pb.Entry) -> tuple[int, int]:
+    """条目的排序键，越常用越小；用于候选字、逐字转写等的排序。"""
+    return _FREQ_RANK.get(entry.freq, len(_FREQ_RANK)), _CAT_RANK.get(entry.cat, len(_CAT_RANK))
+
+
+# protobuf 线格式的字段类型
+_WIRE_VARINT = 0
+_WIRE_FIXED64 = 1
+_WIRE_LENGTH_DELIMITED = 2
+_WIRE_FIXED32 = 5
+
+# `Entries.entries` 字段（field 1, length-delimited）的标签
+_ENTRIES_TAG = (1 << 3) | _WIRE_LENGTH_DELIMITED
+# `Entry` 中需要在扫描时读取的字段
+_ENTRY_CHAR = 2
+_ENTRY_CHAR_SIM = 3
+_ENTRY_PRON = 4
+
+
+def _read_varint(buf, pos: int) -> tuple[int, int]:
+    b = buf[pos]
+    if b < 0x80:
+        return b, pos + 1
+    result = b & 0x7F
+    shift = 7
+    while True:
+        pos += 1
+        b = buf[pos]
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos + 1
+        shift += 7
+
+
+def _skip_field(buf, pos: int, wire_type: int) -> int:
+    if wire_type == _WIRE_VARINT:
+        return _read_varint(buf, pos)[1]
+    if wire_type == _WIRE_FIXED64:
+        return pos + 8
+    if wire_type == _WIRE_LENGTH_DELIMITED:
+        length, pos = _read_varint(buf, pos)
+        return pos + length
+    if wire_type == _WIRE_FIXED32:
+        return pos + 4
+    raise ValueError(f"Unsupported wire type {wire_type} at offset {pos}")
+
+
+class LazyEntries(collections.abc.Mapping):
+    """
+    按需解码的字表，可作为 `load_entries` 返回值的替代。
+
+    行为与 `load_entries` 返回的字典一致：以汉字（繁体与简体）为键，
+    值为 `Entry` 列表，繁简同形的字同一条目出现两次。同一条目只解码一次，
+    在繁体与简体键下返回同一个对象。
+
+    只读映射，不随数据文件的变化而更新。使用完毕后可调用 `close` 释放内存映射，
+    也可用作上下文管理器。
+    """
+
+    def __init__(self, entries_pb_path: Union[str, pathlib.Path]) -> None:
+        """
+        Args:
+            entries_pb_path: `entries.pb` 文件路径。
+        """
+        entries_pb_path = pathlib.Path(entries_pb_path)
+        with open(entries_pb_path, 'rb') as f:
+            # 空文件无法映射，视为空字表。
+            if entries_pb_path.stat().st_size:
+                self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._buf = b''
+        self._starts = array.array('I')
+        self._ends = array.array('I')
+        # 读音以序列化后的字节去重，每条记录只存其编号。
+        self._pron_ids = array.array('I')
+        self._pron_keys: dict[bytes, int] = {}
+        self._trd_index: dict[str, list[int]] = {}
+        self._sim_index: dict[str, list[int]] = {}
+        self._scan()
+        self._lock = threading.Lock()
+        self._pb_entries: dict[int, pb.Entry] = {}
+        self._entries: dict[int, Entry] = {}
+        self._prons: Optional[list[Pronunciation]] = None
+
+    def _scan(self) -> None:
+        buf = self._buf
+        size = len(buf)
+        starts, ends, pron_ids = self._starts, self._ends, self._pron_ids
+        pron_keys, sim_index, trd_index = self._pron_keys, self._sim_index, self._trd_index
+        pos = 0
+        # 标签与字符串长度绝大多数只占一个字节，先按单字节读取，否则再按变长整数读取。
+        while pos < size:
+            key = buf[pos]
+            if key != _ENTRIES_TAG:
+                key, pos = _read_varint(buf, pos)
+                pos = _skip_field(buf, pos, key & 0x07)
+                continue
+            length = buf[pos + 1]
+            if length < 0x80:
+                pos += 2
+            else:
+                length, pos = _read_varint(buf, pos + 1)
+            start, end = pos, pos + length
+            char = char_sim = ''
+            pron = b''
+            # 只读取排在前面的字段，读到读音之后的字段即停止。
+            while pos < end:
+                key = buf[pos]
+                if key < 0x80:
+                    pos += 1
+                else:
+                    key, pos = _read_varint(buf, pos)
+                field = key >> 3
+                if field > _ENTRY_PRON:
+                    break
+                if key & 0x07 != _WIRE_LENGTH_DELIMITED:
+                    # 排在前面的编号（`Entry.index`）为变长整数，多数只占一个字节。
+                    if key & 0x07 == _WIRE_VARINT and buf[pos] < 0x80:
+                        pos += 1
+                    else:
+                        pos = _skip_field(buf, pos, key & 0x07)
+                    continue
+                length = buf[pos]
+                if length < 0x80:
+                    pos += 1
+                else:
+                    length, pos = _read_varint(buf, pos)
+                value = buf[pos:pos + length]
+                pos += length
+                if field == _ENTRY_CHAR:
+                    char = value.decode('utf-8')
+                elif field == _ENTRY_CHAR_SIM:
+                    char_sim = value.decode('utf-8')
+                elif field == _ENTRY_PRON:
+                    pron = value
+            record = len(starts)
+            starts.append(start)
+            ends.append(end)
+            pron_ids.append(pron_keys.setdefault(pron, len(pron_keys)))
+            sim_index.setdefault(char_sim, []).append(record)
+            trd_index.setdefault(char, []).append(record)
+            pos = end
+
+    def close(self) -> None:
+        """释放内存映射。已解码的条目仍可使用，但不能再查询未解码的条目。"""
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+
+    def __enter__(self) -> 'LazyEntries':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._sim_index.keys() | self._trd_index.keys())
+
+    def __contains__(self, han: str) -> bool:
+        return han in self._sim_index or han in self._trd_index
+
+    def __iter__(self) -> Iterator[str]:
+        # 与 `load_entries` 的插入顺序一致：按记录顺序，先简体后繁体。
+        sim_of = {record: han for han, records in self._sim_index.items() for record in records}
+        trd_of = {record: han for han, records in self._trd_index.items() for record in records}
+        return iter(dict.fromkeys(itertools.chain.from_iterable(
+            (sim_of[record], trd_of[record]) for record in range(self.record_count))))
+
+    def __getitem__(self, han: str) -> list[Entry]:
+        if han not in self:
+            raise KeyError(han)
+        return [self.entry(record) for record in self.records(han)]
+
+    @property
+    def record_count(self) -> int:
+        """数据文件中的条目数。"""
+        return len(self._starts)
+
+    def records(self, han: str, simplified: Optional[bool] = None) -> list[int]:
+        """
+        汉字 `han` 对应的记录编号，按数据文件中的顺序排列。
+
+        Args:
+            han: 汉字。
+            simplified: 为 True 时只查简体字形，为 False 时只查繁体字形；
+                为 None 时两者都查，繁简同形的条目出现两次。
+        """
+        if simplified is not None:
+            index = self._sim_index if simplified else self._trd_index
+            return list(index.get(han, ()))
+        return list(heapq.merge(self._sim_index.get(han, ()), self._trd_index.get(han, ())))
+
+    def pb_entry(self, record: int) -> pb.Entry:
+        """解码第 `record` 条记录，返回 protobuf 条目。"""
+        entry = self._pb_entries.get(record)
+        if entry is None:
+            entry = pb.Entry.FromString(self._buf[self._starts[record]:self._ends[record]])
+            with self._lock:
+                entry = self._pb_entries.setdefault(record, entry)
+        return entry
+
+    def entry(self, record: int) -> Entry:
+        """解码第 `record` 条记录，返回 `Entry` 对象。"""
+        entry = self._entries.get(record)
+        if entry is None:
+            entry = Entry.from_pb(self.pb_entry(record))
+            with self._lock:
+                entry = self._entries.setdefault(record, entry)
+        return entry
+
+    def pronunciation(self, record: int) -> Pronunciation:
+        """第 `record` 条记录的读音，不解码条目的其他内容。"""
+        return self._decoded_pronunciations()[self._pron_ids[record]]
+
+    def possible_pronunciations(self) -> list[Pronunciation]:
+        """字表中出现的全部读音（去重），按首次出现的顺序排列。"""
+        return list(dict.fromkeys(self._decoded_pronunciations()))
+
+    def _decoded_pronunciations(self) -> list[Pronunciation]:
+        prons = self._prons
+        if prons is None:
+            prons = [Pronunciation.from_pb(pb.Pronunciation.FromString(key)) for key in self._pron_keys]
+            self._prons = prons
+        return prons
+
+
+# 列式索引文件（`entries.idx`）格式，所有整数均为小端序：
+#
+#   文件头    magic(8s) version records strings char_keys pron_keys blob_size entries_pb_size reserved (u32)
+#   读音键    pron_keys 个 u64，(initial_id * strings + final_id) * 16 + tone，升序
+#   字符串表  strings + 1 个 u32，各字符串在字符串数据中的起止位置
+#   记录列    records 个 u32/i32 一列：在 entries.pb 中的起止位置、繁体字、简体字、声母、韵母
+#             （以上为字符串编号）、声调、字音类型、使用频率
+#   汉字键    char_keys 个 u32，汉字的字符串编号，升序
+#   汉字倒排  char_keys + 1 个 u32 的起止位置，及对应的记录编号（每个键内升序）
+#   读音倒排  pron_keys + 1 个 u32 的起止位置，及对应的记录编号（每个键内升序）
+#   字符串数据 UTF-8，按字节序排序，因此字符串编号的大小顺序即字符串的大小顺序
+_INDEX_MAGIC = b'PUJEIDX\0'
+_INDEX_VERSION = 1
+_INDEX_HEADER = struct.Struct('<8s8I')
+_INDEX_RECORD_COLUMNS = (
+    ('start', 'I'), ('end', 'I'), ('char', 'I'), ('char_sim', 'I'),
+    ('initial', 'I'), ('final', 'I'), ('tone', 'I'), ('cat', 'i'), ('freq', 'i'),
+)
+
+
+def _pron_key(initial_id: int, final_id: int, tone: int, string_count: int) -> int:
+    return (initial_id * string_count + final_id) * 16 + tone
+
+
+def build_entries_index(entries_pb_data: bytes) -> bytes:
+    """
+    由 `entries.pb` 的内容生成列式索引文件的内容。
+
+    索引记录每个条目在 `entries.pb` 中的位置，读取时据此按需解码条目。
+
+    Args:
+        entries_pb_data: `entries.pb` 文件的全部字节。
+
+    Returns:
+        索引文件的字节。
+    """
+    offsets = []
+    pos = 0
+    while pos < len(entries_pb_data):
+        key, pos = _read_varint(entries_pb_data, pos)
+        if key != _ENTRIES_TAG:
+            pos = _skip_field(entries_pb_data, pos, key & 0x07)
+            continue
+        length, pos = _read_varint(entries_pb_data, pos)
+        offsets.append((pos, pos + length))
+        pos += length
+    # 逐个解码条目，只保留建立索引所需的字段 (char, char_sim, initial, final, tone, cat, freq)，不构造整个字表。
+    fields = []
+    for start, end in offsets:
+        e = pb.Entry.FromString(entries_pb_data[start:end])
+        fields.append((e.char, e.char_sim, e.pron.initial, e.pron.final, e.pron.tone, e.cat, e.freq))
+
+    strings = sorted({s for f in fields for s in f[:4]}, key=lambda s: s.encode('utf-8'))
+    string_ids = {s: i for i, s in enumerate(strings)}
+    blob = bytearray()
+    string_offsets = array.array('I', [0])
+    for s in strings:
+        blob += s.encode('utf-8')
+        string_offsets.append(len(blob))
+
+    columns = {name: array.array(typecode) for name, typecode in _INDEX_RECORD_COLUMNS}
+    char_postings: dict[int, list[int]] = {}
+    pron_postings: dict[int, list[int]] = {}
+    for record, ((char, char_sim, initial, final, tone, cat, freq), (start, end)) in enumerate(zip(fields, offsets)):
+        values = {
+            'start': start, 'end': end,
+            'char': string_ids[char], 'char_sim': string_ids[char_sim],
+            'initial': string_ids[initial], 'final': string_ids[final], 'tone': tone,
+            'cat': cat, 'freq': freq,
+        }
+        for name, column in columns.items():
+            column.append(values[name])
+        for char_id in dict.fromkeys((values['char'], values['char_sim'])):
+            char_postings.setdefault(char_id, []).append(record)
+        key = _pron_key(values['initial'], values['final'], tone, len(strings))
+        pron_postings.setdefault(key, []).append(record)
+
+    def postings_arrays(postings: dict[int, list[int]]) -> tuple[array.array, array.array, array.array]:
+        keys = sorted(postings)
+        starts = array.array('I', [0])
+        records = array.array('I')
+        for key in keys:
+            records.extend(postings[key])
+            starts.append(len(records))
+        return keys, starts, records
+
+    char_keys, char_starts, char_records = postings_arrays(char_postings)
+    pron_keys, pron_starts, pron_records = postings_arrays(pron_postings)
+    sections = [
+        array.array('Q', pron_keys),
+        string_offsets,
+        *columns.values(),
+        array.array('I', char_keys), char_starts, char_records,
+        pron_starts, pron_records,
+    ]
+    out = bytearray(_INDEX_HEADER.pack(
+        _INDEX_MAGIC, _INDEX_VERSION, len(fields), len(strings), len(char_keys), len(pron_keys),
+        len(blob), len(entries_pb_data), 0))
+    for section in sections:
+        if sys.byteorder != 'little':
+            section.byteswap()
+        out += section.tobytes()
+    out += blob
+    return bytes(out)
+
+
+def write_entries_index(entries_pb_path: Union[str, pathlib.Path], index_path: Union[str, pathlib.Path]) -> None:
+    """为 `entries_pb_path` 生成列式索引文件，写入 `index_path`。"""
+    data = pathlib.Path(entries_pb_path).read_bytes()
+    # 写入临时文件再改名，正在读取旧索引的进程不会读到写了一半的文件。
+    tmp_path = pathlib.Path(f'{index_path}.tmp')
+    tmp_path.write_bytes(build_entries_index(data))
+    tmp_path.replace(index_path)
+
+
+class _StringTable(collections.abc.Sequence):
+    """索引文件中的字符串表，按下标取得 UTF-8 字节，用于二分查找。"""
+
+    def __init__(self, blob: memoryview, offsets) -> None:
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]])
+
+    def find(self, s: str) -> int:
+        """返回字符串 `s` 的编号；不存在时返回 -1。"""
+        key = s.encode('utf-8')
+        i = bisect.bisect_left(self, key)
+        if i < len(self) and self[i] == key:
+            return i
+        return -1
+
+
+class EntriesIndex:
+    """
+    `entries.pb` 的列式索引（`entries.idx`，由 `write_entries_index` 生成）。
+
+    以内存映射打开索引文件，各列直接以 `memoryview` 读取，打开时不为条目创建任何
+    Python 对象。按汉字或读音查询得到记录编号，再按编号读取声韵调等列；
+    需要释义、又音等完整内容时，从 `entries.pb` 中按记录位置解码。
+
+    与 `LazyEntries` 不同，按汉字查询的结果中每个条目只出现一次。
+    """
+
+    def __init__(self, index_path: Union[str, pathlib.Path],
+                 entries_pb_path: Union[str, pathlib.Path, None] = None) -> None:
+        """
+        Args:
+            index_path: `entries.idx` 文件路径。
+            entries_pb_path: 生成该索引的 `entries.pb` 文件路径；不需要解码完整条目时可省略。
+
+        Raises:
+            ValueError: 索引文件格式不正确。
+        """
+        with open(index_path, 'rb') as f:
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views: list[memoryview] = [memoryview(self._buf)]
+        if len(self._buf) < _INDEX_HEADER.size:
+            self.close()
+            raise ValueError(f"Invalid entries index: {index_path}")
+        (magic, version, self._record_count, string_count, char_key_count, pron_key_count,
+         blob_size, self._entries_pb_size, _) = _INDEX_HEADER.unpack_from(self._buf)
+        if magic != _INDEX_MAGIC or version != _INDEX_VERSION:
+            self.close()
+            raise ValueError(f"Invalid entries index: {index_path}")
+        self._pos = _INDEX_HEADER.size
+        self._pron_keys = self._column('Q', pron_key_count)
+        string_offsets = self._column('I', string_count + 1)
+        self._columns = {name: self._column(typecode, self._record_count)
+                         for name, typecode in _INDEX_RECORD_COLUMNS}
+        self._char_keys = self._column('I', char_key_count)
+        self._char_starts = self._column('I', char_key_count + 1)
+        self._char_records = self._column('I', self._char_starts[-1])
+        self._pron_starts = self._column('I', pron_key_count + 1)
+        self._pron_records = self._column('I', self._pron_starts[-1])
+        self._strings = _StringTable(self._views[0][self._pos:self._pos + blob_size], string_offsets)
+        self._views.append(self._strings._blob)
+        self._decoded_strings: dict[int, str] = {}
+        self._entries_pb_path = entries_pb_path
+        self._entries_pb_buf: Optional[mmap.mmap] = None
+        self._pb_entries: dict[int, pb.Entry] = {}
+        self._entries: dict[int, Entry] = {}
+
+    def _column(self, typecode: str, count: int):
+        size = array.array(typecode).itemsize * count
+        view = self._views[0][self._pos:self._pos + size]
+        self._pos += size
+        if sys.byteorder != 'little':
+            column = array.array(typecode, view.tobytes())
+            column.byteswap()
+            view.release()
+            return column
+        view = view.cast(typecode)
+        self._views.append(view)
+        return view
+
+    def close(self) -> None:
+        """释放内存映射。"""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._buf.close()
+        if self._entries_pb_buf is not None:
+            self._entries_pb_buf.close()
+
+    def __enter__(self) -> 'EntriesIndex':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._record_count
+
+    def _string(self, string_id: int) -> str:
+        s = self._decoded_strings.get(string_id)
+        if s is None:
+            s = self._strings[string_id].decode('utf-8')
+            self._decoded_strings[string_id] = s
+        return s
+
+    def _postings(self, keys, starts, records, lo: int, hi: int) -> list[int]:
+        """键在 [lo, hi) 范围内的所有记录编号，升序。"""
+        begin = bisect.bisect_left(keys, lo)
+        end = bisect.bisect_left(keys, hi, begin)
+        if begin == end:
+            return []
+        if end - begin == 1:
+            return records[starts[begin]:starts[end]].tolist()
+        return sorted(records[starts[begin]:starts[end]].tolist())
+
+    def records(self, han: str) -> list[int]:
+        """汉字 `han`（繁体或简体）对应的记录编号，升序。"""
+        char_id = self._strings.find(han)
+        if char_id < 0:
+            return []
+        return self._postings(self._char_keys, self._char_starts, self._char_records, char_id, char_id + 1)
+
+    def records_for_pronunciation(self, initial: str, final: str, tone: Optional[int] = None) -> list[int]:
+        """
+        读音为 (initial, final, tone) 的记录编号，升序。
+
+        Args:
+            initial: 声母，零声母为空字符串或 `0`。
+            final: 韵母。
+            tone: 声调；为 None 时不限声调。
+        """
+        pron = Pronunciation(initial, final, tone or 0)
+        initial_id = self._strings.find(pron.initial)
+        final_id = self._strings.find(pron.final)
+        if initial_id < 0 or final_id < 0:
+            return []
+        key = _pron_key(initial_id, final_id, tone or 0, len(self._strings))
+        hi = key + 1 if tone is not None else key + 16
+        return self._postings(self._pron_keys, self._pron_starts, self._pron_records, key, hi)
+
+    def char(self, record: int) -> str:
+        return self._string(self._columns['char'][record])
+
+    def char_sim(self, record: int) -> str:
+        return self._string(self._columns['char_sim'][record])
+
+    def pronunciation(self, record: int) -> Pronunciation:
+        columns = self._columns
+        return Pronunciation(self._string(columns['initial'][record]), self._string(columns['final'][record]),
+                             columns['tone'][record])
+
+    def cat(self, record: int) -> int:
+        return self._columns['cat'][record]
+
+    def freq(self, record: int) -> int:
+        return self._columns['freq'][record]
+
+    def pb_entry(self, record: int) -> pb.Entry:
+        """
+        从 `entries.pb` 解码第 `record` 条记录。
+
+        Raises:
+            ValueError: 未提供 `entries.pb`，或其与索引不匹配。
+        """
+        entry = self._pb_entries.get(record)
+        if entry is None:
+            buf = self._entries_pb()
+            entry = pb.Entry.FromString(buf[self._columns['start'][record]:self._columns['end'][record]])
+            entry = self._pb_entries.setdefault(record, entry)
+        return entry
+
+    def entry(self, record: int) -> Entry:
+        """从 `entries.pb` 解码第 `record` 条记录，返回 `Entry` 对象。参见 `pb_entry`。"""
+        entry = self._entries.get(record)
+        if entry is None:
+            entry = self._entries.setdefault(record, Entry.from_pb(self.pb_entry(record)))
+        return entry
+
+    def _entries_pb(self) -> mmap.mmap:
+        if self._entries_pb_buf is None:
+            if self._entries_pb_path is None:
+                raise ValueError("entries.pb is required to decode entries")
+            with open(self._entries_pb_path, 'rb') as f:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(buf) != self._entries_pb_size:
+                buf.close()
+                raise ValueError(f"{self._entries_pb_path} does not match the entries index")
+            self._entries_pb_buf = buf
+        return self._entries_pb_buf
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+词表（`phrases.pb`）的加载与查询。
+
+`PhraseStore` 一次加载全部词条，并为潮州话写法、白话字读音、普通话对译、
+非正式写法建立有序索引，按二分查找回答精确查询与前缀查询；按标签查询则直接查表。
+"""
+
+import bisect
+import functools
+
+from typing import Iterable, Optional, Union
+
+import libpuj.pujpb as pb
+from libpuj.pujcommon import ConversionError, Pronunciation, Sentence
+
+# 大于任何实际字符的码位，作为前缀查询的上界。
+_MAX_CHAR = '\U0010FFFF'
+
+
+@functools.lru_cache(maxsize=8192)
+def _normalize_puj_word(word: str) -> Optional[str]:
+    try:
+        if word[-1].isdigit():
+            pron = Pronunciation.from_combination(word)
+        else:
+            pron = Pronunciation.from_written(word)
+    except ConversionError:
+        return None
+    return pron.to_combination() if pron.final else None
+
+
+def normalize_puj(text: str, partial: bool = False) -> str:
+    """
+    将白话字（书面形式或数字调 ASCII 形式均可）规范为小写的数字调 ASCII 形式，如 `tsêng-sennh` ->
+    `tseng5-sennh4`。连字符、空格等非单词部分原样保留，无法解析的单词只转为小写。
+
+    Args:
+        text: 白话字。
+        partial: 是否为正在输入、尚未完整的读音（用于前缀查询）。为 True 时，
+            最后一个单词若既无调符也无数字调，则不补充默认声调，原样保留。
+    """
+    tokens = list(Sentence.iter_tokens(text.lower()))
+    result = []
+    for i, (kind, token, _, _, _) in enumerate(tokens):
+        if kind == Sentence.TOKEN_WORD:
+            is_last = i == len(tokens) - 1
+            if not (partial and is_last and token.isascii() and not token[-1].isdigit()):
+                token = _normalize_puj_word(token) or token
+        result.append(token)
+    return ''.join(result)
+
+
+class _SortedIndex:
+    """字符串 -> 词条编号 的有序索引。同一词条以多个写法收录时，各写法分别建立索引项。"""
+
+    def __init__(self, items: Iterable[tuple[str, int]]) -> None:
+        items = sorted(set(items))
+        self.keys = [key for key, _ in items]
+        self.ids = [i for _, i in items]
+
+    def exact(self, key: str) -> list[int]:
+        lo = bisect.bisect_left(self.keys, key)
+        hi = bisect.bisect_right(self.keys, key, lo)
+        return self.ids[lo:hi]
+
+    def prefix(self, prefix: str) -> list[int]:
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + _MAX_CHAR, lo)
+        # 按匹配到的键排序（较短的键在前），同一词条只保留第一次出现。
+        return list(dict.fromkeys(self.ids[lo:hi]))
+
+
+class PhraseStore:
+    """
+    词表及其索引。
+
+    可查询的字段：
+    - `teochew`：潮州话写法（所有写法）；
+    - `puj`：白话字读音，查询时书面形式与数字调形式均可，统一规范为数字调 ASCII 形式（见 `normalize_puj`）；
+    - `cmn`：普通话对译；
+    - `informal`：非正式写法。
+
+    精确查询的结果按词条顺序排列；前缀查询的结果按匹配到的写法排序。
+    """
+
+    FIELDS = ('teochew', 'puj', 'cmn', 'informal')
+
+    def __init__(self, phrases: pb.Phrases) -> None:
+        """
+        Args:
+            phrases: 已解析的词表数据。
+        """
+        self._phrases = list(phrases.phrases)
+        self._tag_display = list(phrases.phrase_tag_display)
+        self._indexes: dict[str, _SortedIndex] = {}
+        for field in self.FIELDS:
+            normalize = normalize_puj if field == 'puj' else str.strip
+            self._indexes[field] = _SortedIndex(
+                (normalize(value), i)
+                for i, phrase in enumerate(self._phrases)
+                for value in getattr(phrase, field) if value)
+        self._tag_index: dict[int, list[int]] = {}
+        for i, phrase in enumerate(self._phrases):
+            for tag in dict.fromkeys(phrase.tag):
+                self._tag_index.setdefault(tag, []).append(i)
+
+    def __len__(self) -> int:
+        return len(self._phrases)
+
+    def __getitem__(self, index: int) -> pb.Phrase:
+        return self._phrases[index]
+
+    @property
+    def tag_display(self) -> list[str]:
+        """标签编号 -> 标签名称。"""
+        return list(self._tag_display)
+
+    def _index(self, field: str) -> _SortedIndex:
+        if field not in self._indexes:
+            raise ValueError(f"Unknown phrase field: {field!r}, expected one of {self.FIELDS}")
+        return self._indexes[field]
+
+    def lookup(self, field: str, value: str) -> list[pb.Phrase]:
+        """
+        查找字段 `field` 中有写法与 `value` 完全一致的词条。
+
+        Raises:
+            ValueError: `field` 不是可查询的字段。
+        """
+        key = normalize_puj(value) if field == 'puj' else value.strip()
+        return [self._phrases[i] for i in sorted(set(self._index(field).exact(key)))]
+
+    def prefix(self, field: str, prefix: str, limit: Optional[int] = None) -> list[pb.Phrase]:
+        """
+        查找字段 `field` 中有写法以 `prefix` 开头的词条。
+
+        Args:
+            field: 查询的字段。
+            prefix: 前缀。查询 `puj` 时，最后一个音节可以不完整（见 `normalize_puj`）。
+            limit: 最多返回的词条数；为 None 时不限。
+
+        Raises:
+            ValueError: `field` 不是可查询的字段。
+        """
+        key = normalize_puj(prefix, partial=True) if field == 'puj' else prefix.strip()
+        ids = self._index(field).prefix(key)
+        if limit is not None:
+            ids = ids[:limit]
+        return [self._phrases[i] for i in ids]
+
+    def by_tag(self, tag: Union[int, str]) -> list[pb.Phrase]:
+        """
+        查找带有标签 `tag` 的词条。
+
+        Args:
+            tag: 标签编号或标签名称。
+        """
+        if isinstance(tag, str):
+            if tag not in self._tag_display:
+                return []
+            tag = self._tag_display.index(tag)
+        return [self._phrases[i] for i in self._tag_index.get(tag, [])]
+
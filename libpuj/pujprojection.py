@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+全部口音的读音投影：一组标准读音在每个口音下的读音矩阵。
+
+口音规则只改写声母与韵母，不改变声调，因此只需对不同的声韵组合应用规则。各口音的规则链按
+规则描述符建成前缀树，多个口音共有的前几条规则只应用一次；每条规则对同一声韵组合的结果也
+只求一次。结果中的读音驻留为整数编号，矩阵以 `array` 紧凑存储。
+"""
+
+import array
+import csv
+
+from typing import Iterable, Optional, Sequence, TextIO, Union
+
+from .pujcommon import Accent, FuzzyRule, Pronunciation
+
+# 矩阵中应用规则失败的格子。
+MISSING = -1
+
+
+class AccentProjection:
+    """
+    `project_accents` 的结果：以口音为行、输入读音为列的读音编号矩阵。
+
+    Attributes:
+        accents: 各行的口音。
+        inputs: 各列的标准读音。
+        syllables: 读音表，矩阵中的编号即其下标。
+        matrix: 按行存储的读音编号，第 i 行第 j 列为 `matrix[i * len(inputs) + j]`；应用规则失败时为 `MISSING`。
+    """
+
+    def __init__(self, accents: Sequence[Accent], inputs: Sequence[Pronunciation],
+                 syllables: Sequence[Pronunciation], matrix: array.array) -> None:
+        self.accents = list(accents)
+        self.inputs = list(inputs)
+        self.syllables = list(syllables)
+        self.matrix = matrix
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return len(self.accents), len(self.inputs)
+
+    def _row_index(self, accent: Union[str, int]) -> int:
+        if isinstance(accent, int):
+            return accent
+        for i, a in enumerate(self.accents):
+            if a.id == accent:
+                return i
+        raise KeyError(accent)
+
+    def row_ids(self, accent: Union[str, int]) -> memoryview:
+        """口音（id 或行号）对应的一行读音编号。"""
+        columns = len(self.inputs)
+        start = self._row_index(accent) * columns
+        return memoryview(self.matrix)[start:start + columns]
+
+    def row(self, accent: Union[str, int]) -> list[Optional[Pronunciation]]:
+        """口音（id 或行号）对应的一行读音；应用规则失败的格子为 None。"""
+        syllables = self.syllables
+        return [syllables[i] if i != MISSING else None for i in self.row_ids(accent)]
+
+    def get(self, accent: Union[str, int], column: int) -> Optional[Pronunciation]:
+        """口音在第 `column` 列的读音，即 `accent.fuzzy_result(inputs[column])`。"""
+        syllable_id = self.matrix[self._row_index(accent) * len(self.inputs) + column]
+        return self.syllables[syllable_id] if syllable_id != MISSING else None
+
+    def write_csv(self, file: TextIO, delimiter: str = ',', column_labels: Optional[Sequence[str]] = None,
+                  corner: str = '口音') -> None:
+        """
+        写出为 CSV（与 `data/accents_expected.csv` 格式相同）。首行为表头，此后每个口音一行，
+        首列为 `<地区><分区>/<口音 id>`，各格为 ASCII 白话字，应用规则失败的格子为空。
+
+        Args:
+            file: 以 `newline=''` 打开的文本文件。
+            delimiter: 分隔符，TSV 为 `\\t`。
+            column_labels: 各列的表头，默认为输入读音的 ASCII 白话字。
+            corner: 左上角的表头。
+        """
+        if column_labels is None:
+            column_labels = [pron.to_combination() for pron in self.inputs]
+        elif len(column_labels) != len(self.inputs):
+            raise ValueError(f"表头有 {len(column_labels)} 列，输入读音有 {len(self.inputs)} 个")
+        cells = [syllable.to_combination() for syllable in self.syllables]
+        writer = csv.writer(file, delimiter=delimiter, lineterminator='\n')
+        writer.writerow([corner, *column_labels])
+        for i, accent in enumerate(self.accents):
+            writer.writerow([f'{accent.area}{accent.subarea}/{accent.id}',
+                             *(cells[j] if j != MISSING else '' for j in self.row_ids(i))])
+
+    def write_tsv(self, file: TextIO, column_labels: Optional[Sequence[str]] = None, corner: str = '口音') -> None:
+        self.write_csv(file, '\t', column_labels, corner)
+
+
+class _RuleNode:
+    # 规则链前缀树的节点：`pairs` 为应用前缀中全部规则后，各输入声韵组合的结果编号。
+    __slots__ = ('pairs', 'children')
+
+    def __init__(self, pairs: list[int]) -> None:
+        self.pairs = pairs
+        self.children: dict[int, '_RuleNode'] = {}
+
+
+def project_accents(accents: Iterable[Accent], pronunciations: Iterable[Pronunciation]) -> AccentProjection:
+    """
+    求每个口音下每个读音应用口音规则后的读音，结果与逐个调用 `accent.fuzzy_result` 相同。
+
+    Args:
+        accents: 口音，如 `load_accents` 的结果的 `values()`。
+        pronunciations: 标准读音，如字表中的全部读音。
+
+    Returns:
+        以口音为行、读音为列的 `AccentProjection`。
+    """
+    accents = list(accents)
+    inputs = list(pronunciations)
+
+    # 声韵组合驻留为编号；输入中的声韵组合在前。
+    pairs: list[tuple[str, str]] = []
+    pair_ids: dict[tuple[str, str], int] = {}
+
+    def pair_id(pair: tuple[str, str]) -> int:
+        i = pair_ids.get(pair)
+        if i is None:
+            i = pair_ids[pair] = len(pairs)
+            pairs.append(pair)
+        return i
+
+    # 输入中不同的 (声韵组合编号, 声调)，以其第一个读音为构造结果读音的模板；每行只需对这些组合求读音编号。
+    input_keys: dict[tuple[int, int], int] = {}
+    templates: list[Pronunciation] = []
+    columns = []
+    for pron in inputs:
+        key = (pair_id((pron.initial, pron.final)), pron.tone)
+        k = input_keys.get(key)
+        if k is None:
+            k = input_keys[key] = len(templates)
+            templates.append(pron)
+        columns.append(k)
+    root = _RuleNode(list(range(len(pairs))))
+    # 每条规则（以对象区分）对每个声韵组合的结果，在前缀树的不同位置共用；失败时为 MISSING。
+    rule_results: dict[int, dict[int, int]] = {}
+
+    def apply(rule: FuzzyRule, source: list[int]) -> list[int]:
+        results = rule_results.get(id(rule))
+        if results is None:
+            results = rule_results[id(rule)] = {MISSING: MISSING}
+        for i in set(source).difference(results):
+            try:
+                results[i] = pair_id(rule.transition(*pairs[i]))
+            except Exception:
+                results[i] = MISSING
+        return [results[i] for i in source]
+
+    syllables: list[Pronunciation] = []
+    syllable_ids: dict[tuple[int, int], int] = {}
+    matrix = array.array('i')
+    for accent in accents:
+        # 没有规则链的模糊音规则视为只有其自身一条规则。
+        rules = getattr(accent, 'rules', None)
+        if rules is None:
+            rules = [accent]
+        node = root
+        for rule in rules:
+            child = node.children.get(id(rule))
+            if child is None:
+                child = node.children[id(rule)] = _RuleNode(apply(rule, node.pairs))
+            node = child
+        final_pairs = node.pairs
+        row = []
+        for (i, tone), template in zip(input_keys, templates):
+            result = final_pairs[i]
+            if result == MISSING:
+                row.append(MISSING)
+                continue
+            key = (result, tone)
+            syllable_id = syllable_ids.get(key)
+            if syllable_id is None:
+                syllable_id = syllable_ids[key] = len(syllables)
+                initial, final = pairs[result]
+                syllables.append(template._replace(initial=initial, final=final))
+            row.append(syllable_id)
+        matrix.extend([row[k] for k in columns])
+    return AccentProjection(accents, inputs, syllables, matrix)
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+可热更新的数据句柄。
+
+长期运行的服务持有 `ReloadablePUJUtils`，处理每个请求时以 `get()` 取得当前的 `PUJUtils`。
+数据文件（`accents.pb`、`entries.pb`、`phrases.pb`）更新后，新的 `PUJUtils` 在后台线程中加载，
+加载完成后整体替换当前对象。替换前后取得的对象各自完整可用，正在进行的查询继续使用旧对象，
+不会读到新旧混杂的数据；加载失败时保留旧对象。
+
+数据文件应以写入临时文件再改名的方式整体替换（`generate_db.py` 生成 `accents.pb`、`entries.pb`、
+`entries.idx`、`phrases.pb` 时即如此），不应原地改写：原地改写时可能加载到写了一半的文件，
+且字表以 mmap 映射，会影响仍在使用旧数据的查询。
+"""
+
+import concurrent.futures
+import dataclasses
+import pathlib
+import threading
+import time
+import tracemalloc
+
+from typing import Any, NamedTuple, Optional, Union
+
+from .generate_manifest import file_sha256
+from .pujutils import PUJUtils
+
+PathLike = Union[str, pathlib.Path]
+
+
+class DataFileState(NamedTuple):
+    """数据文件的状态，用于判断文件是否更新。"""
+    mtime_ns: int
+    size: int
+    sha256: Optional[str] = None
+    """内容的 SHA-256，仅在按内容哈希判断时计算"""
+
+
+@dataclasses.dataclass(frozen=True)
+class _Snapshot:
+    utils: PUJUtils
+    states: dict[str, Optional[DataFileState]]
+    generation: int
+    loaded_at: float
+    seconds: float
+
+
+class ReloadablePUJUtils:
+    """
+    可热更新的 `PUJUtils` 句柄。
+
+    `poll` 检查数据文件是否更新，有更新时在后台加载；`watch` 启动后台线程定期执行 `poll`。
+    `get` 只读取一次引用，不加锁，可在任意线程或协程中调用。
+    """
+
+    def __init__(self, accents_pb_path: PathLike, entries_pb_path: PathLike,
+                 phrases_pb_path: Optional[PathLike] = None, compile_accents: bool = False,
+                 use_hash: bool = False, trace_memory: bool = False) -> None:
+        """
+        构造时在当前线程中完成第一次加载。
+
+        Args:
+            accents_pb_path: `accents.pb` 文件路径。
+            entries_pb_path: `entries.pb` 文件路径。
+            phrases_pb_path: `phrases.pb` 文件路径；为 None 时不加载词表。
+            compile_accents: 见 `PUJUtils.__init__`。为 True 时各口音的缓存在后台加载时一并建立，
+                替换后的第一次反查无需等待。
+            use_hash: 为 True 时按文件内容的 SHA-256 判断是否更新，只改动修改时间不会触发重新加载；
+                否则按修改时间与文件大小判断。
+            trace_memory: 加载期间是否以 tracemalloc 统计各数据占用的内存（见 `info`）。
+                追踪期间整个进程的内存分配都会变慢。
+        """
+        self._paths: dict[str, pathlib.Path] = {
+            'accents': pathlib.Path(accents_pb_path),
+            'entries': pathlib.Path(entries_pb_path),
+        }
+        if phrases_pb_path is not None:
+            self._paths['phrases'] = pathlib.Path(phrases_pb_path)
+        self._compile_accents = compile_accents
+        self._use_hash = use_hash
+        self._trace_memory = trace_memory
+        # 按内容哈希判断时，修改时间与大小未变的文件沿用上次的哈希。
+        self._hashes: dict[pathlib.Path, DataFileState] = {}
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._reloading: Optional[concurrent.futures.Future] = None
+        self._failed_states: Optional[dict[str, Optional[DataFileState]]] = None
+        self._last_error: Optional[str] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+        self._snapshot = self._load(self._file_states(), generation=1)
+
+    def get(self) -> PUJUtils:
+        """当前的 `PUJUtils`。同一个请求应只取一次，以免前后使用不同版本的数据。"""
+        return self._snapshot.utils
+
+    @property
+    def generation(self) -> int:
+        """当前数据的版本号，第一次加载为 1，每替换一次加一。"""
+        return self._snapshot.generation
+
+    def _file_state(self, path: pathlib.Path) -> Optional[DataFileState]:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        state = DataFileState(stat.st_mtime_ns, stat.st_size)
+        if not self._use_hash:
+            return state
+        cached = self._hashes.get(path)
+        if cached is not None and cached[:2] == state[:2]:
+            return cached
+        try:
+            state = state._replace(sha256=file_sha256(path))
+        except OSError:
+            return None
+        self._hashes[path] = state
+        return state
+
+    def _file_states(self) -> dict[str, Optional[DataFileState]]:
+        return {name: self._file_state(path) for name, path in self._paths.items()}
+
+    def _same_states(self, a: dict[str, Optional[DataFileState]], b: dict[str, Optional[DataFileState]]) -> bool:
+        if not self._use_hash:
+            return a == b
+        # 按内容判断时忽略修改时间。
+        return {name: state and (state.size, state.sha256) for name, state in a.items()} == \
+            {name: state and (state.size, state.sha256) for name, state in b.items()}
+
+    def _load(self, states: dict[str, Optional[DataFileState]], generation: int) -> _Snapshot:
+        start_tracing = self._trace_memory and not tracemalloc.is_tracing()
+        if start_tracing:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            utils = PUJUtils(self._paths['accents'], self._paths['entries'], compile_accents=self._compile_accents,
+                             phrases_pb_path=self._paths.get('phrases'))
+        finally:
+            if start_tracing:
+                tracemalloc.stop()
+        return _Snapshot(utils, states, generation, time.time(), time.perf_counter() - start)
+
+    def check(self) -> bool:
+        """
+        数据文件是否有更新，即当前文件与已加载的数据不同，且不是上次加载失败时的文件。
+        """
+        states = self._file_states()
+        if self._same_states(states, self._snapshot.states):
+            return False
+        failed_states = self._failed_states
+        return failed_states is None or not self._same_states(states, failed_states)
+
+    def _reload(self) -> PUJUtils:
+        # 先记录文件状态再加载：加载期间文件再次更新时，下一次检查仍能发现。
+        states = self._file_states()
+        try:
+            snapshot = self._load(states, self._snapshot.generation + 1)
+        except Exception as exc:
+            self._failed_states = states
+            self._last_error = f"{type(exc).__name__}: {exc}"
+            raise
+        self._snapshot = snapshot
+        self._failed_states = None
+        self._last_error = None
+        return snapshot.utils
+
+    def reload(self) -> concurrent.futures.Future:
+        """
+        在后台线程中重新加载全部数据，加载完成后替换当前对象。已有加载在进行时返回该次加载。
+
+        Returns:
+            结果为新的 `PUJUtils` 的 Future；加载失败时其异常为加载时的异常，当前对象保持不变。
+        """
+        with self._lock:
+            future = self._reloading
+            if future is None or future.done():
+                future = self._reloading = self._executor.submit(self._reload)
+            return future
+
+    def poll(self) -> Optional[concurrent.futures.Future]:
+        """数据文件有更新时开始重新加载并返回其 Future（见 `reload`），否则返回 None。"""
+        if self.check():
+            return self.reload()
+        return None
+
+    def watch(self, interval: float = 5.0) -> None:
+        """
+        启动后台线程，每隔 `interval` 秒执行一次 `poll`。已在监视时不做任何事。
+        """
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._stop_watching.clear()
+            self._watcher = threading.Thread(target=self._watch, args=(interval,), daemon=True)
+            self._watcher.start()
+
+    def _watch(self, interval: float) -> None:
+        while not self._stop_watching.wait(interval):
+            self.poll()
+
+    def stop_watching(self) -> None:
+        with self._lock:
+            watcher, self._watcher = self._watcher, None
+        if watcher is not None:
+            self._stop_watching.set()
+            watcher.join()
+
+    def close(self) -> None:
+        """停止监视并等待正在进行的加载结束。"""
+        self.stop_watching()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> 'ReloadablePUJUtils':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def info(self) -> dict[str, Any]:
+        """
+        当前数据的加载情况，可直接序列化为 JSON：
+
+        - `generation`：数据版本号，见 `generation`；
+        - `loaded_at`：加载完成的时间（Unix 时间戳）；
+        - `seconds`：加载总耗时（秒）；
+        - `reloading`：是否正在后台加载；
+        - `last_error`：上一次加载失败的原因，成功后清除；
+        - `data_sets`：各数据文件的路径、修改时间、大小、加载耗时与占用内存
+          （见 `pujutils.DataLoadInfo`；未启用 `trace_memory` 时 `memory` 为 None）。
+        """
+        snapshot = self._snapshot
+        reloading = self._reloading
+        data_sets = {}
+        for name, load_info in snapshot.utils.get_load_info().items():
+            state = snapshot.states.get(name)
+            data_set = {
+                'path': str(load_info.path),
+                'mtime_ns': state.mtime_ns if state else None,
+                'size': state.size if state else None,
+                'seconds': load_info.seconds,
+                'memory': load_info.memory,
+            }
+            if self._use_hash:
+                data_set['sha256'] = state.sha256 if state else None
+            data_sets[name] = data_set
+        return {
+            'generation': snapshot.generation,
+            'loaded_at': snapshot.loaded_at,
+            'seconds': snapshot.seconds,
+            'reloading': reloading is not None and not reloading.done(),
+            'last_error': self._last_error,
+            'data_sets': data_sets,
+        }
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+常驻转换服务。
+
+一次加载口音与字表数据，此后以换行分隔的 JSON（NDJSON）处理转换请求，可经标准输入输出或 Unix 套接字通信，
+省去每次启动命令行工具时重新导入模块、解析数据、编译口音规则的开销。
+
+每行一个请求：
+
+    {"id": 1, "text": "peng1 tshout3", "source": "apuj", "target": "dp", "accent": null, "deaccent": false}
+
+- `text`：待转换的文本，或文本列表（批量转换）；
+- `source`、`target`：源方案与目标方案，默认为 `apuj`、`puj`；
+- `accent`：口音 id，可省略；
+- `deaccent`：为 true 时反推标准音，`text` 的格式为 `<汉字>/<带口音的拼音>`，多个以空白分隔，须指定 `accent`；
+- `id`：任意 JSON 值，原样写回响应，可省略。
+
+每个请求对应一行响应。`text` 为字符串时响应为 `{"id": ..., "result": "...", "errors": [...]}`；
+为列表时响应为 `{"id": ..., "results": [...], "errors": [[...], ...]}`，`errors` 为逐项的解析错误。
+整个请求无法处理（JSON 格式错误、请求过长、未知口音、不支持的方案等）时响应为 `{"id": ..., "error": "..."}`。
+
+同一连接中的请求在线程池中并行处理，响应按请求的顺序写回；多个连接之间互不阻塞。
+"""
+
+import asyncio
+import concurrent.futures
+import contextlib
+import functools
+import json
+import pathlib
+import sys
+import threading
+
+from typing import Any, Awaitable, Callable, Optional, Union
+
+from .convert import DeaccentIndex, convert_many, load_accents, load_entries
+from .pujcommon import Accent, AccentSet, ConversionError
+
+# 请求中 `source`、`target` 的默认值，与命令行工具一致。
+DEFAULT_SOURCE = 'apuj'
+DEFAULT_TARGET = 'puj'
+# 同一连接中同时处理的请求数上限，超过后暂停读取，直到较早的请求写回响应。
+MAX_PENDING_REQUESTS = 256
+# 经 Unix 套接字通信时单行请求的字节数上限；超过时丢弃该行并响应错误。
+MAX_REQUEST_BYTES = 1 << 20
+
+
+class ConversionServer:
+    """
+    持有已加载数据的转换服务。
+
+    `handle` 处理单个请求，可在多个线程中同时调用；`serve_stdio`、`serve_unix` 在 asyncio 事件循环中读写请求。
+    """
+
+    def __init__(self, accent_data: Optional[Union[str, pathlib.Path]] = None,
+                 entry_data: Optional[Union[str, pathlib.Path]] = None, workers: int = 4) -> None:
+        """
+        Args:
+            accent_data: 口音数据文件（`accents.pb`）路径，启动时加载；为 None 时不支持指定口音。
+            entry_data: 字表数据文件（`entries.pb`）路径，第一次反推标准音时加载；为 None 时不支持反推标准音。
+            workers: 处理请求的线程数。
+        """
+        self._accents = load_accents(accent_data) if accent_data is not None else AccentSet((), ())
+        self._entry_data = entry_data
+        self._han_to_entry = None
+        self._deaccent_indexes: dict[str, DeaccentIndex] = {}
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _accent(self, accent_id: str) -> Accent:
+        if not self._accents:
+            raise ValueError("未加载口音数据，无法指定口音")
+        accent = self._accents.get(accent_id)
+        if accent is None:
+            raise ValueError(f"未知口音：{accent_id!r}。可用口音：{'、'.join(sorted(self._accents))}")
+        return accent
+
+    def _deaccent_index(self, accent_id: Optional[str]) -> DeaccentIndex:
+        if accent_id is None:
+            raise ValueError("反推标准音须指定口音")
+        accent = self._accent(accent_id)
+        if self._entry_data is None:
+            raise ValueError("未指定字表数据，无法反推标准音")
+        index = self._deaccent_indexes.get(accent_id)
+        if index is None:
+            # 字表与索引只建立一次；建立期间其他请求的转换不受影响。
+            with self._lock:
+                index = self._deaccent_indexes.get(accent_id)
+                if index is None:
+                    if self._han_to_entry is None:
+                        self._han_to_entry = load_entries(self._entry_data)
+                    index = self._deaccent_indexes[accent_id] = DeaccentIndex(accent, self._han_to_entry)
+        return index
+
+    @staticmethod
+    def _deaccent(index: DeaccentIndex, text: str) -> tuple[str, list[str]]:
+        results = []
+        errors = []
+        for pair in text.split():
+            if '/' not in pair:
+                errors.append(f"无法解析输入 {pair!r}，格式应为 <汉字>/<带口音的拼音>")
+                results.append(pair)
+                continue
+            char, accent_pron = pair.split('/', 1)
+            try:
+                results.append(index.deaccent(char, accent_pron))
+            except ConversionError as exc:
+                errors.append(str(exc))
+                results.append(accent_pron)
+        return ' '.join(results), errors
+
+    def handle(self, request: Any) -> dict[str, Any]:
+        """
+        处理一个已解析的请求，返回响应。请求格式见模块说明。
+        """
+        response: dict[str, Any] = {}
+        if isinstance(request, dict) and 'id' in request:
+            response['id'] = request['id']
+        try:
+            if not isinstance(request, dict):
+                raise ValueError("请求应为 JSON 对象")
+            texts = request.get('text')
+            single = isinstance(texts, str)
+            if single:
+                texts = [texts]
+            if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                raise ValueError("text 应为字符串或字符串列表")
+            accent_id = request.get('accent')
+            if request.get('deaccent'):
+                index = self._deaccent_index(accent_id)
+                items = [self._deaccent(index, text) for text in texts]
+            else:
+                fuzzy_rule = self._accent(accent_id) if accent_id is not None else None
+                items = list(convert_many(texts, source=request.get('source', DEFAULT_SOURCE),
+                                          target=request.get('target', DEFAULT_TARGET), fuzzy_rule=fuzzy_rule))
+        except Exception as exc:
+            response['error'] = str(exc)
+            return response
+        if single:
+            response['result'], response['errors'] = items[0]
+        else:
+            response['results'] = [result for result, _ in items]
+            response['errors'] = [errors for _, errors in items]
+        return response
+
+    def handle_line(self, line: str) -> str:
+        """处理一行 JSON 请求，返回一行 JSON 响应（含换行符）。"""
+        try:
+            request = json.loads(line)
+        except ValueError as exc:
+            response = {'error': f"无法解析请求：{exc}"}
+        else:
+            response = self.handle(request)
+        return json.dumps(response, ensure_ascii=False) + '\n'
+
+    async def _serve_lines(self, read_line: Callable[[], Awaitable[str]],
+                           write: Callable[[str], Awaitable[None]]) -> None:
+        # 读取任务逐行读取请求并交给线程池，写回任务按请求顺序等待结果并写回。
+        # `read_line` 抛出 ValueError 表示该行无法读取（过长、编码错误等），以错误响应代替，继续读取下一行。
+        # 任一任务出错（如连接断开）时结束另一任务，并取消尚未处理的请求，不会阻塞在已满的队列上。
+        loop = asyncio.get_running_loop()
+        pending: asyncio.Queue = asyncio.Queue(maxsize=MAX_PENDING_REQUESTS)
+
+        async def read_requests():
+            while True:
+                try:
+                    line = await read_line()
+                except ValueError as exc:
+                    future = loop.create_future()
+                    future.set_result(json.dumps({'error': f"无法读取请求：{exc}"}, ensure_ascii=False) + '\n')
+                    await pending.put(future)
+                    continue
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                await pending.put(loop.run_in_executor(self._executor, self.handle_line, line))
+            await pending.put(None)
+
+        async def write_responses():
+            while True:
+                future = await pending.get()
+                if future is None:
+                    return
+                await write(await future)
+
+        tasks = [asyncio.create_task(read_requests()), asyncio.create_task(write_responses())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            while not pending.empty():
+                future = pending.get_nowait()
+                if future is not None:
+                    future.cancel()
+
+    async def serve_stdio(self) -> None:
+        """从标准输入读取请求、向标准输出写回响应，直到标准输入结束。"""
+        loop = asyncio.get_running_loop()
+        # 标准输入可能是普通文件，不一定能注册到事件循环，因此在单独的线程中读取。
+        reader = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+        async def read_line() -> str:
+            return await loop.run_in_executor(reader, sys.stdin.readline)
+
+        async def write(response: str) -> None:
+            sys.stdout.write(response)
+            sys.stdout.flush()
+
+        try:
+            await self._serve_lines(read_line, write)
+        finally:
+            reader.shutdown(wait=False)
+
+    @staticmethod
+    async def _read_request_line(reader: asyncio.StreamReader, limit: int) -> str:
+        # 读取一行请求；超过 `limit` 字节时丢弃到行尾（或连接结束）为止，抛出 ValueError。
+        try:
+            return (await reader.readuntil(b'\n')).decode('utf-8')
+        except asyncio.IncompleteReadError as exc:
+            return exc.partial.decode('utf-8')
+        except asyncio.LimitOverrunError as exc:
+            consumed = exc.consumed
+        while True:
+            await reader.readexactly(consumed)
+            try:
+                await reader.readuntil(b'\n')
+                break
+            except asyncio.IncompleteReadError:
+                break
+            except asyncio.LimitOverrunError as exc:
+                consumed = exc.consumed
+        raise ValueError(f"请求超过 {limit} 字节")
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                                limit: int = MAX_REQUEST_BYTES) -> None:
+        async def read_line() -> str:
+            return await self._read_request_line(reader, limit)
+
+        async def write(response: str) -> None:
+            writer.write(response.encode('utf-8'))
+            await writer.drain()
+
+        try:
+            await self._serve_lines(read_line, write)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def start_unix_server(self, path: Union[str, pathlib.Path],
+                                limit: int = MAX_REQUEST_BYTES) -> asyncio.AbstractServer:
+        """
+        在 Unix 套接字 `path` 上开始监听，返回 asyncio 服务器对象。已存在的套接字文件会被替换。
+
+        Args:
+            path: 套接字文件路径。
+            limit: 单行请求的字节数上限。
+        """
+        path = pathlib.Path(path)
+        if path.is_socket():
+            path.unlink()
+        return await asyncio.start_unix_server(functools.partial(self._serve_connection, limit=limit),
+                                               path=str(path), limit=limit)
+
+    async def serve_unix(self, path: Union[str, pathlib.Path]) -> None:
+        """在 Unix 套接字 `path` 上持续提供服务。"""
+        server = await self.start_unix_server(path)
+        async with server:
+            await server.serve_forever()
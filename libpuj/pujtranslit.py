@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+汉字文本转白话字。
+
+以词表中全部潮州话写法（含非正式写法）建立字典树，从左到右按最长匹配切分文本：
+能匹配词条的部分取词条读音（如“龙眼” nek8-oinn2），其余汉字逐字取字表中
+最常用的读音，非汉字原样保留。每个位置最多向后查找最长词条的长度，因此耗时与
+文本长度成正比。
+"""
+
+import dataclasses
+
+from typing import Callable, Optional
+
+import libpuj.pujpb as pb
+from libpuj.pujcommon import Pronunciation
+from libpuj.pujentries import reading_rank
+from libpuj.pujphrases import PhraseStore
+
+# 字典树中标记词条结尾的键。汉字均为单个字符，不会与之冲突。
+_END = ''
+
+@dataclasses.dataclass
+class Segment:
+    text: str
+    """原文"""
+    puj: Optional[str] = None
+    """读音（数字调 ASCII 白话字，多音节以 - 相连）；非汉字或无法转写时为 None"""
+    phrase: Optional[pb.Phrase] = None
+    """匹配到的词条"""
+    entries: list[pb.Entry] = dataclasses.field(default_factory=list)
+    """逐字转写时该字的字表条目，首个为所取读音的条目"""
+
+
+class Transliterator:
+    """
+    基于词表字典树的汉字转白话字引擎。
+
+    同一写法对应多个词条时取词表中最靠前的词条，多个读音时取第一个读音。
+    逐字转写时取最常用的读音，同样常用时优先取白读。
+    """
+
+    def __init__(self, phrases: PhraseStore, get_entries: Callable[[str], list[pb.Entry]]) -> None:
+        """
+        Args:
+            phrases: 词表。
+            get_entries: 查询单个汉字的字表条目，如 `PUJUtils.get_entry_from_han`。
+        """
+        self._phrases = phrases
+        self._get_entries = get_entries
+        self._trie: dict = {}
+        self._max_length = 0
+        # 汉字 -> (读音, 排好序的字表条目)，逐字转写时缓存。
+        self._char_readings: dict[str, tuple[Optional[str], list[pb.Entry]]] = {}
+        # 先收录所有正式写法，再收录非正式写法，写法相同时以正式写法为准。
+        for field in ('teochew', 'informal'):
+            for i in range(len(phrases)):
+                phrase = phrases[i]
+                if not phrase.puj:
+                    continue
+                for spelling in getattr(phrase, field):
+                    self._add(spelling, i)
+
+    def _add(self, spelling: str, phrase_index: int) -> None:
+        if not spelling:
+            return
+        node = self._trie
+        for c in spelling:
+            node = node.setdefault(c, {})
+        node.setdefault(_END, phrase_index)
+        self._max_length = max(self._max_length, len(spelling))
+
+    def _longest_match(self, text: str, start: int) -> tuple[int, Optional[int]]:
+        """自 `start` 起能匹配的最长词条，返回 (结束位置, 词条编号)；没有匹配时词条编号为 None。"""
+        node = self._trie
+        end, phrase_index = start, None
+        for i in range(start, min(len(text), start + self._max_length)):
+            node = node.get(text[i])
+            if node is None:
+                break
+            if _END in node:
+                end, phrase_index = i + 1, node[_END]
+        return end, phrase_index
+
+    def _char_reading(self, char: str) -> tuple[Optional[str], list[pb.Entry]]:
+        reading = self._char_readings.get(char)
+        if reading is None:
+            entries = sorted(self._get_entries(char), key=reading_rank)
+            puj = Pronunciation.from_pb(entries[0].pron).to_combination() if entries else None
+            reading = self._char_readings[char] = (puj, entries)
+        return reading
+
+    def segment(self, text: str) -> list[Segment]:
+        """
+        切分文本并求各部分的读音。
+
+        Returns:
+            按原文顺序排列的片段；连续的非汉字（及字表中没有的字）合并为一个片段。
+        """
+        segments = []
+        pending_start = None
+        i = 0
+        while i < len(text):
+            end, phrase_index = self._longest_match(text, i)
+            segment = None
+            if phrase_index is not None:
+                phrase = self._phrases[phrase_index]
+                segment = Segment(text[i:end], phrase.puj[0], phrase=phrase)
+            else:
+                end = i + 1
+                puj, entries = self._char_reading(text[i])
+                if puj is not None:
+                    segment = Segment(text[i], puj, entries=list(entries))
+            if segment is None:
+                if pending_start is None:
+                    pending_start = i
+            else:
+                if pending_start is not None:
+                    segments.append(Segment(text[pending_start:i]))
+                    pending_start = None
+                segments.append(segment)
+            i = end
+        if pending_start is not None:
+            segments.append(Segment(text[pending_start:]))
+        return segments
+
+    def transliterate(self, text: str) -> str:
+        """
+        将文本转为白话字（数字调 ASCII 形式），如 `食龙眼。` -> `tsiah8 nek8-oinn2。`。
+
+        相邻的两个有读音的片段以空格分隔，其余内容原样保留。
+        """
+        result = []
+        previous_has_puj = False
+        for segment in self.segment(text):
+            if segment.puj is None:
+                result.append(segment.text)
+            else:
+                if previous_has_puj:
+                    result.append(' ')
+                result.append(segment.puj)
+            previous_has_puj = segment.puj is not None
+        return ''.join(result)
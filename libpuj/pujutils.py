@@ -1,75 +1,275 @@
 # -*- coding: utf-8 -*-
 
+import contextlib
+import dataclasses
 import pathlib
 import re
+import time
+import tracemalloc
 import unicodedata
 
+from typing import Optional
+
 import libpuj.pujpb as pb
 from libpuj.pujcommon import (
     Accent as _Accent,
     Accent_Dummy as _Accent_Dummy,
+    AccentSet as _AccentSet,
     FuzzyRule as _FuzzyRule,
     FuzzyRuleDescriptor as _FuzzyRuleDescriptor,
     Pronunciation as _Pronunciation,
     Sentence as _Sentence, Sentence,
 )
+from libpuj.pujentries import LazyEntries as _LazyEntries, reading_rank as _reading_rank
+from libpuj.pujphrases import PhraseStore as _PhraseStore
+from libpuj.pujtranslit import Transliterator as _Transliterator
 
 from libpuj.pujcommon import Pronunciation
 
 
+@dataclasses.dataclass
+class DataLoadInfo:
+    """一个数据文件的加载情况，见 `PUJUtils.get_load_info`。"""
+    path: pathlib.Path
+    """数据文件路径"""
+    seconds: float = 0.0
+    """加载耗时（秒），含解析、建立索引与编译口音规则"""
+    memory: Optional[int] = None
+    """
+    加载期间新分配且加载后仍在使用的 Python 内存（字节），不含以 mmap 映射的文件。
+    仅在 tracemalloc 追踪内存时统计，否则为 None；统计的是整个进程的分配，其他线程同时分配内存时偏大。
+    """
+
+
 class PUJUtils:
     _accents_raw: pb.Accents
-    _entries_raw: pb.Entries
-    _accents: dict[str, _Accent]
-    _possible_pronunciations: list[pb.Pronunciation] = None
+    _entries: _LazyEntries
+    _accents: _AccentSet
+    _possible_pronunciations_list: Optional[list[_Pronunciation]] = None
     _han_trd_to_entry: dict[str, list[pb.Entry]] = None
     _han_sim_to_entry: dict[str, list[pb.Entry]] = None
+    _phrases: Optional[_PhraseStore] = None
+    _transliterator: Optional[_Transliterator] = None
+    _load_info: dict[str, DataLoadInfo]
     _pronunciation_fast_map: dict[str, dict[str, dict[int, list[pb.Entry]]]] = None
     """
     This maps {initial: {final: {tone: [entry, ...]}.
+    第一次按读音查询时建立，见 `_get_pronunciation_fast_map`。
     """
 
-    def __init__(self, accents_pb_path, entries_pb_path):
+    def __init__(self, accents_pb_path, entries_pb_path, compile_accents: bool = False, phrases_pb_path=None):
+        """
+        Args:
+            accents_pb_path: `accents.pb` 文件路径。
+            entries_pb_path: `entries.pb` 文件路径。
+            compile_accents: 是否立即以字表中的全部读音填充各口音的缓存（声韵转换表、
+                正查表与反查表）；为 False 时转换表在转换过程中按需补充，
+                正查表与反查表在第一次反查时建立。
+            phrases_pb_path: `phrases.pb` 文件路径；为 None 时不加载词表。
+        """
+        self._load_info = {}
         accents_pb_path = pathlib.Path(accents_pb_path)
-        with open(accents_pb_path, 'rb') as f:
-            self._accents_raw = pb.Accents()
-            self._accents_raw.ParseFromString(f.read())
-        _FuzzyRuleDescriptor.init_from_pb(self._accents_raw.fuzzy_rule_descriptors)
-        self._accents = {}
-        for a in self._accents_raw.accents:
-            accent = _Accent.from_pb(a)
-            self._accents[a.id] = accent
-
-        entries_pb_path = pathlib.Path(entries_pb_path)
-        with open(entries_pb_path, 'rb') as f:
-            self._entries_raw = pb.Entries()
-            self._entries_raw.ParseFromString(f.read())
-        self._possible_pronunciations = [_Pronunciation.from_pb(e.pron) for e in self._entries_raw.entries]
+        with self._measure_load('accents', accents_pb_path):
+            with open(accents_pb_path, 'rb') as f:
+                self._accents_raw = pb.Accents()
+                self._accents_raw.ParseFromString(f.read())
+            self._accents = _AccentSet.from_pb(self._accents_raw)
+
+        # 字表按需解码，查询某个字时才解码其条目并记入 `_han_sim_to_entry` 等。
+        # 字表中的全部读音只在建立各口音的反查表时用到，同样到第一次反查时才解码。
+        with self._measure_load('entries', entries_pb_path):
+            self._entries = _LazyEntries(entries_pb_path)
         self._han_trd_to_entry = {}
         self._han_sim_to_entry = {}
-        for e in self._entries_raw.entries:
-            self._han_sim_to_entry.setdefault(e.char_sim, []).append(e)
-            self._han_trd_to_entry.setdefault(e.char, []).append(e)
-        for l in [self._han_trd_to_entry, self._han_sim_to_entry]:
-            for han in l:
-                entry = l[han]
-                if len(entry) > 1:
-                    l[han] = sorted(entry, key=lambda e: (-int(e.freq), -int(e.cat)))
         self._pronunciation_map = {}
+        with self._measure_load('accents', accents_pb_path):
+            for accent in self._accents.values():
+                accent.compile_transitions()
+                accent.cache_possible_pronunciations_map(
+                    self._get_possible_pronunciations if not compile_accents else self._possible_pronunciations,
+                    lazy=not compile_accents)
+
+        if phrases_pb_path is not None:
+            with self._measure_load('phrases', phrases_pb_path):
+                phrases_raw = pb.Phrases()
+                phrases_raw.ParseFromString(pathlib.Path(phrases_pb_path).read_bytes())
+                self._phrases = _PhraseStore(phrases_raw)
+
+    def _get_possible_pronunciations(self) -> list[_Pronunciation]:
+        # 多个口音可能同时在不同线程中第一次反查，重复解码的结果相同。
+        prons = self._possible_pronunciations_list
+        if prons is None:
+            prons = self._possible_pronunciations_list = self._entries.possible_pronunciations()
+        return prons
+
+    @property
+    def _possible_pronunciations(self) -> list[_Pronunciation]:
+        """字表中的全部读音（驻留的 `Pronunciation`，去重），第一次使用时解码。"""
+        return self._get_possible_pronunciations()
+
+    @contextlib.contextmanager
+    def _measure_load(self, name: str, path):
+        # 同一数据的多个加载步骤（如口音的解析与编译）累计到同一项。
+        info = self._load_info.get(name)
+        if info is None:
+            info = self._load_info[name] = DataLoadInfo(pathlib.Path(path))
+        tracing = tracemalloc.is_tracing()
+        memory_before = tracemalloc.get_traced_memory()[0] if tracing else 0
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            info.seconds += time.perf_counter() - start
+            if tracing:
+                info.memory = (info.memory or 0) + tracemalloc.get_traced_memory()[0] - memory_before
+
+    def get_load_info(self) -> dict[str, DataLoadInfo]:
+        """
+        各数据文件的加载情况，键为 `accents`、`entries`、`phrases`（未加载词表时没有此项）。
+        """
+        return {name: dataclasses.replace(info) for name, info in self._load_info.items()}
 
     def get_entry_from_han(self, han) -> list[pb.Entry]:
-        if han in self._han_sim_to_entry:
-            return self._han_sim_to_entry[han]
-        if han in self._han_trd_to_entry:
-            return self._han_trd_to_entry[han]
+        for simplified, l in [(True, self._han_sim_to_entry), (False, self._han_trd_to_entry)]:
+            entry = l.get(han)
+            if entry is None:
+                records = self._entries.records(han, simplified)
+                if not records:
+                    continue
+                entry = sorted((self._entries.pb_entry(r) for r in records), key=lambda e: (-int(e.freq), -int(e.cat)))
+                l[han] = entry
+            return entry
         return []
 
+    def _get_pronunciation_fast_map(self) -> dict[str, dict[str, dict[int, list[pb.Entry]]]]:
+        if self._pronunciation_fast_map is None:
+            fast_map = {}
+            for record in range(self._entries.record_count):
+                pron = self._entries.pronunciation(record)
+                fast_map.setdefault(pron.initial, {}).setdefault(pron.final, {}).setdefault(
+                    pron.tone, []).append(self._entries.pb_entry(record))
+            for finals in fast_map.values():
+                for tones in finals.values():
+                    for tone, entry in tones.items():
+                        if len(entry) > 1:
+                            tones[tone] = sorted(entry, key=_reading_rank)
+            self._pronunciation_fast_map = fast_map
+        return self._pronunciation_fast_map
+
+    def get_entry_from_pronunciation(self, initial: str, final: str, tone: Optional[int] = None,
+                                     final_prefix: bool = False) -> list[pb.Entry]:
+        """
+        按读音查找字表条目，即 `get_entry_from_han` 的反方向。
+
+        Args:
+            initial: 声母，零声母为空字符串或 `0`。
+            final: 韵母；`final_prefix` 为 True 时为韵母的前缀。
+            tone: 声调；为 None 时不限声调。
+            final_prefix: 是否查找所有以 `final` 开头的韵母。
+
+        Returns:
+            条目列表，常用的排在前面；没有对应条目时返回空列表。
+        """
+        pron = Pronunciation(initial, final, tone or 0)
+        finals = self._get_pronunciation_fast_map().get(pron.initial, {})
+        if final_prefix:
+            matched = [tones for f, tones in finals.items() if f.startswith(pron.final)]
+        else:
+            matched = [finals[pron.final]] if pron.final in finals else []
+        return self._collect_entries(matched, tone)
+
+    def get_entry_from_prefix(self, prefix: str, tone: Optional[int] = None) -> list[pb.Entry]:
+        """
+        查找读音（ASCII 白话字，声母与韵母相连）以 `prefix` 开头的字表条目，供输入法等使用。
+
+        例如 `tsia` 可查得 tsiang、tsiah 等读音的条目。
+
+        Args:
+            prefix: 读音的前缀，不含声调。
+            tone: 声调；为 None 时不限声调。
+
+        Returns:
+            条目列表，常用的排在前面。
+        """
+        prefix = prefix.lower()
+        matched = []
+        for initial, finals in self._get_pronunciation_fast_map().items():
+            if prefix.startswith(initial):
+                rest = prefix[len(initial):]
+                matched.extend(tones for f, tones in finals.items() if f.startswith(rest))
+            elif initial.startswith(prefix):
+                matched.extend(finals.values())
+        return self._collect_entries(matched, tone)
+
+    def get_entry_from_accent_pronunciation(self, accent_id: str, initial: str, final: str,
+                                            tone: Optional[int] = None) -> list[pb.Entry]:
+        """
+        按某口音的读音查找字表条目。
+
+        先经口音的反查表（见 `Accent.candidates_for`）求得可能的标准读音，再查找这些读音的条目。
+
+        Args:
+            accent_id: 口音 id。
+            initial: 口音读音的声母。
+            final: 口音读音的韵母。
+            tone: 声调；为 None 时不限声调。
+
+        Returns:
+            条目列表，常用的排在前面。
+        """
+        accent = self.get_accent(accent_id)
+        tones = [tone] if tone is not None else range(9)
+        fast_map = self._get_pronunciation_fast_map()
+        matched = []
+        for t in tones:
+            for candidate in accent.candidates_for(Pronunciation(initial, final, t)):
+                entry = fast_map.get(candidate.initial, {}).get(candidate.final, {}).get(candidate.tone)
+                if entry:
+                    matched.append({candidate.tone: entry})
+        return self._collect_entries(matched, None)
+
+    @staticmethod
+    def _collect_entries(matched: list[dict[int, list[pb.Entry]]], tone: Optional[int]) -> list[pb.Entry]:
+        if tone is not None:
+            lists = [tones[tone] for tones in matched if tone in tones]
+        else:
+            lists = [entry for tones in matched for entry in tones.values()]
+        if len(lists) == 1:
+            return list(lists[0])
+        return sorted((e for entry in lists for e in entry), key=_reading_rank)
+
+    def get_phrases(self) -> _PhraseStore:
+        """
+        词表及其索引。
+
+        Raises:
+            ValueError: 构造时没有提供 `phrases_pb_path`。
+        """
+        if self._phrases is None:
+            raise ValueError("phrases.pb was not loaded")
+        return self._phrases
+
+    def get_transliterator(self) -> _Transliterator:
+        """
+        以词表与字表建立的汉字转白话字引擎，第一次调用时建立。
+
+        Raises:
+            ValueError: 构造时没有提供 `phrases_pb_path`。
+        """
+        if self._transliterator is None:
+            self._transliterator = _Transliterator(self.get_phrases(), self.get_entry_from_han)
+        return self._transliterator
+
     def get_accent(self, accent_id: str):
         return self._accents.get(accent_id, _Accent_Dummy())
 
     def get_accents(self):
         return self._accents.values()
 
+    def get_accent_set(self) -> _AccentSet:
+        """全部口音及其规则描述符表，可交给其他线程或 `libpuj.convert` 中的函数共用。"""
+        return self._accents
+
     @staticmethod
     def is_cjk_character(char, basic_only=False) -> bool:
         # CJK Unified Ideographs                  4E00-9FFF   Common
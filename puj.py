@@ -7,10 +7,16 @@
     python puj.py --convert puj2ipa --input tshout3
     python puj.py -c puj2xsampa -i iann5
     echo "eu1" | python puj.py -c puj2apuj -i - --accent ChaoZhou_FuCheng --accent-data dist/accents.pb
+    python puj.py -c puj2ipa --input-file corpus.txt --stream > corpus.ipa.txt
+    python puj.py -c apuj2pitch -i "kuan2-ka3--lur2" --accent ShanTou_ShiQu --accent-data dist/accents.pb
+    python puj.py -c apuj2ipa --input-file corpus.txt --accent ShanTou_ShiQu --accent-data dist/accents.pb --stats
+    python puj.py serve --accent-data dist/accents.pb --entry-data dist/entries.pb --socket /tmp/puj.sock
+    python puj.py project --accent-data dist/accents.pb --entry-data dist/entries.pb --format tsv > accents.tsv
 """
 
 from __future__ import annotations
 
+import json
 import sys
 
 import click
@@ -18,23 +24,25 @@ import click
 from libpuj import (
     SUPPORTED_SOURCES,
     SUPPORTED_TARGETS,
+    SANDHI_TARGETS,
     ConversionError,
+    ConversionStats,
+    DeaccentIndex,
     convert,
+    convert_lines,
     load_accents,
     load_entries,
-    try_deaccent,
+    project_accents,
 )
 
 # 允许通过 -h 打印帮助信息。
 CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
 
 
-def _run_try_deaccent(input_text: str, accent: str, accent_data: str,
-                      entry_data: str) -> str:
+def _load_deaccent_index(accent: str, accent_data: str, entry_data: str) -> DeaccentIndex:
     """
-    执行"反推标准音"逻辑。
+    加载"反推标准音"所需的数据并建立索引。
 
-    输入格式为 <汉字>/<带口音的拼音>，多个以空白分隔；例如：练/lieng7。
     需指定 --accent、--accent-data 与 --entry-data。
     """
     if accent is None or accent_data is None or entry_data is None:
@@ -43,7 +51,7 @@ def _run_try_deaccent(input_text: str, accent: str, accent_data: str,
 
     try:
         accents = load_accents(accent_data)
-        han_to_entry = load_entries(entry_data)
+        han_to_entry = load_entries(entry_data, lazy=True)
     except Exception as exc:
         raise click.ClickException(f"加载数据失败：{exc}")
 
@@ -53,8 +61,15 @@ def _run_try_deaccent(input_text: str, accent: str, accent_data: str,
             f"未知口音：{accent!r}。可用口音：{available}。",
             param_hint='--accent',
         )
-    accent_obj = accents[accent]
+    return DeaccentIndex(accents[accent], han_to_entry)
 
+
+def _run_try_deaccent(input_text: str, index: DeaccentIndex) -> str:
+    """
+    执行"反推标准音"逻辑。
+
+    输入格式为 <汉字>/<带口音的拼音>，多个以空白分隔；例如：练/lieng7。
+    """
     results = []
     for pair in input_text.split():
         if '/' not in pair:
@@ -64,13 +79,13 @@ def _run_try_deaccent(input_text: str, accent: str, accent_data: str,
             )
         char, accent_pron = pair.split('/', 1)
         try:
-            results.append(try_deaccent(char, accent_pron, accent_obj, han_to_entry))
+            results.append(index.deaccent(char, accent_pron))
         except ConversionError as exc:
             raise click.ClickException(str(exc))
     return " ".join(results)
 
 
-@click.command(context_settings=CONTEXT_SETTINGS)
+@click.group(context_settings=CONTEXT_SETTINGS, invoke_without_command=True)
 @click.option(
     '--convert', '-c',
     'convert_spec',
@@ -80,7 +95,8 @@ def _run_try_deaccent(input_text: str, accent: str, accent_data: str,
     help=(
         '转换类型，格式为 <源方案>2<目标方案>，如 puj2dp 表示白话字转潮拼。'
         f'源方案目前支持 {"、".join(SUPPORTED_SOURCES)}；'
-        f'目标方案支持 {"、".join(SUPPORTED_TARGETS)}。'
+        f'目标方案支持 {"、".join(SUPPORTED_TARGETS)}，'
+        f'其中 {"、".join(SANDHI_TARGETS)} 按口音的连读变调输出实际调值，须指定 --accent。'
     ),
 )
 @click.option(
@@ -92,6 +108,18 @@ def _run_try_deaccent(input_text: str, accent: str, accent_data: str,
          '也支持由空格与连字符分割的整句话。'
          '若指定为 -，则从标准输入读取。',
 )
+@click.option(
+    '--input-file', '-f',
+    type=click.File('r', encoding='utf-8'),
+    default=None,
+    help='从文件读取需要转换的拼音，- 表示标准输入。',
+)
+@click.option(
+    '--stream',
+    is_flag=True,
+    default=False,
+    help='逐行读取、转换并输出，每行单独恢复大小写，适用于大文件或管道输入。',
+)
 @click.option(
     '--accent', '-a',
     type=str,
@@ -118,20 +146,48 @@ def _run_try_deaccent(input_text: str, accent: str, accent_data: str,
     default=None,
     help='字表数据文件（entries.pb）的路径，用于反推标准音时查找汉字读音。',
 )
-def main(convert_spec: str, input_text: str, accent: str, accent_data: str,
-         deaccent: bool, entry_data: str) -> None:
-    """潮汕方言白话字工具。"""
+@click.option(
+    '--stats',
+    is_flag=True,
+    default=False,
+    help='转换结束后向标准错误输出各阶段（分词、解析、口音规则、格式化等）的计数和累计耗时（JSON）。',
+)
+@click.option(
+    '--stats-rules',
+    is_flag=True,
+    default=False,
+    help='同 --stats，并按口音规则逐条计时。逐条应用规则比实际转换慢，口音规则阶段的耗时相应偏高。',
+)
+@click.pass_context
+def main(ctx: click.Context, convert_spec: str, input_text: str, input_file, stream: bool, accent: str,
+         accent_data: str, deaccent: bool, entry_data: str, stats: bool, stats_rules: bool) -> None:
+    """潮汕方言白话字工具。不指定子命令时转换 --input 给出的拼音。"""
+    if ctx.invoked_subcommand is not None:
+        return
     # 解析输入：- 表示从标准输入读取。
+    if input_text is not None and input_file is not None:
+        raise click.UsageError("--input 与 --input-file 不能同时指定。")
     if input_text == '-':
-        input_text = sys.stdin.read()
-    if not input_text:
+        input_file = click.get_text_stream('stdin')
+        input_text = None
+    if input_file is not None and not stream:
+        input_text = input_file.read()
+        input_file = None
+    if input_file is None and not input_text:
         raise click.UsageError(
             "请通过 --input 指定需要转换的拼音，或使用 - 从标准输入读取。")
+    # 流式模式下逐行处理；给定 --input 字符串时视为单行输入。
+    lines = input_file if input_file is not None else [input_text]
 
     # 反推标准音模式：--deaccent。
     if deaccent:
-        result = _run_try_deaccent(input_text, accent, accent_data, entry_data)
-        click.echo(result)
+        index = _load_deaccent_index(accent, accent_data, entry_data)
+        if not stream:
+            click.echo(_run_try_deaccent(input_text, index))
+            return
+        out = click.get_text_stream('stdout')
+        for line in lines:
+            out.write(_run_try_deaccent(line, index) + '\n')
         return
 
     # 解析 <源方案>2<目标方案>，例如 puj2dp -> (puj, dp)。
@@ -173,13 +229,174 @@ def main(convert_spec: str, input_text: str, accent: str, accent_data: str,
             )
         fuzzy_rule = accents[accent]
 
+    conversion_stats = ConversionStats(rule_detail=stats_rules) if stats or stats_rules else None
     try:
-        result, err = convert(input_text, source=source, target=target, fuzzy_rule=fuzzy_rule)
-        click.echo(result)
-        if err:
-            raise click.ClickException('；'.join(err))
+        if stream:
+            _run_stream(lines, source, target, fuzzy_rule, conversion_stats)
+            return
+
+        try:
+            result, err = convert(input_text, source=source, target=target, fuzzy_rule=fuzzy_rule,
+                                  stats=conversion_stats)
+            click.echo(result)
+            if err:
+                raise click.ClickException('；'.join(err))
+        except ConversionError as exc:
+            raise click.ClickException(str(exc))
+    finally:
+        if conversion_stats is not None:
+            click.echo(json.dumps(conversion_stats.snapshot(), indent=2, ensure_ascii=False), err=True)
+
+
+def _run_stream(lines, source: str, target: str, fuzzy_rule, stats: ConversionStats = None) -> None:
+    """
+    流式转换：逐行转换并立即输出，解析错误逐行输出到标准错误。
+
+    所有行处理完毕后，若出现过错误则以非零状态退出。
+    """
+    out = click.get_text_stream('stdout')
+    error_count = 0
+    try:
+        for line_number, (result, errors) in enumerate(
+                convert_lines(lines, source=source, target=target, fuzzy_rule=fuzzy_rule, stats=stats), 1):
+            # 保留原行的换行符；没有换行符的行（--input 给出的文本、文件的最后一行）补上换行符。
+            out.write(result if result.endswith('\n') else result + '\n')
+            for error in errors:
+                click.echo(f"第 {line_number} 行：{error}", err=True)
+            error_count += len(errors)
     except ConversionError as exc:
         raise click.ClickException(str(exc))
+    out.flush()
+    if error_count:
+        raise click.ClickException(f"共有 {error_count} 处无法解析。")
+
+
+@main.command()
+@click.option(
+    '--accent-data',
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help='口音数据文件（accents.pb）的路径，启动时加载，请求中可指定口音。',
+)
+@click.option(
+    '--entry-data',
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help='字表数据文件（entries.pb）的路径，第一次反推标准音时加载。',
+)
+@click.option(
+    '--socket', 'socket_path',
+    type=click.Path(dir_okay=False),
+    default=None,
+    help='监听的 Unix 套接字路径；不指定时从标准输入读取请求、向标准输出写回响应。',
+)
+@click.option(
+    '--workers',
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help='处理请求的线程数。',
+)
+def serve(accent_data: str, entry_data: str, socket_path: str, workers: int) -> None:
+    """
+    常驻服务：一次加载数据，处理换行分隔的 JSON 转换请求。
+
+    每行一个请求，如 {"id": 1, "text": "peng1", "source": "apuj", "target": "dp"}，
+    可选字段 accent、deaccent；格式说明见 libpuj.pujserver。
+    """
+    # 只在常驻服务中用到，避免拖慢一次性的转换。
+    import asyncio
+    from libpuj.pujserver import ConversionServer
+
+    try:
+        server = ConversionServer(accent_data, entry_data, workers=workers)
+    except Exception as exc:
+        raise click.ClickException(f"加载数据失败：{exc}")
+    with server:
+        try:
+            if socket_path is None:
+                asyncio.run(server.serve_stdio())
+            else:
+                click.echo(f"正在监听 {socket_path}", err=True)
+                asyncio.run(server.serve_unix(socket_path))
+        except KeyboardInterrupt:
+            pass
+
+
+
+@main.command()
+@click.option(
+    '--accent-data',
+    type=click.Path(exists=True, dir_okay=False),
+    required=True,
+    help='口音数据文件（accents.pb）的路径。',
+)
+@click.option(
+    '--entry-data',
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help='字表数据文件（entries.pb）的路径；指定时投影字表中的全部读音（去重，按首次出现的顺序）。',
+)
+@click.option(
+    '--input', '-i',
+    'input_text',
+    type=str,
+    default=None,
+    help='以空白分隔的 ASCII 白话字读音（如 "kuan1 seu1"），排在字表读音之后；- 表示从标准输入读取。',
+)
+@click.option(
+    '--accent', '-a',
+    'accent_ids',
+    multiple=True,
+    help='只输出这些口音，可多次指定；不指定时输出全部口音。',
+)
+@click.option(
+    '--format', 'output_format',
+    type=click.Choice(['csv', 'tsv']),
+    default='csv',
+    show_default=True,
+    help='输出格式。',
+)
+@click.option(
+    '--output', '-o',
+    type=click.File('w', encoding='utf-8', lazy=True),
+    default='-',
+    help='输出文件，默认为标准输出。',
+)
+def project(accent_data: str, entry_data: str, input_text: str, accent_ids: tuple[str, ...], output_format: str,
+            output) -> None:
+    """
+    输出各口音的读音对照表：每个口音一行，每个读音一列。
+
+    例如 python puj.py project --accent-data dist/accents.pb --entry-data dist/entries.pb --format tsv
+    """
+    from libpuj.pujcommon import Pronunciation
+    from libpuj.pujentries import LazyEntries
+
+    try:
+        accents = load_accents(accent_data, compiled=False)
+    except Exception as exc:
+        raise click.ClickException(f"加载口音数据失败：{exc}")
+    unknown = [accent_id for accent_id in accent_ids if accent_id not in accents]
+    if unknown:
+        raise click.BadParameter(
+            f"未知口音：{'、'.join(unknown)}。可用口音：{'、'.join(accents)}。", param_hint='--accent')
+    pronunciations = []
+    if entry_data is not None:
+        with LazyEntries(entry_data) as entries:
+            pronunciations.extend(dict.fromkeys(entries.pronunciation(r) for r in range(entries.record_count)))
+    if input_text == '-':
+        input_text = click.get_text_stream('stdin').read()
+    for word in (input_text or '').split():
+        try:
+            pronunciations.append(Pronunciation.from_combination(word))
+        except ConversionError as exc:
+            raise click.ClickException(str(exc))
+    if not pronunciations:
+        raise click.UsageError("请通过 --entry-data 或 --input 指定需要投影的读音。")
+    selected = [accents[accent_id] for accent_id in accent_ids] if accent_ids else accents.values()
+    projection = project_accents(selected, pronunciations)
+    projection.write_csv(output, delimiter='\t' if output_format == 'tsv' else ',')
 
 
 if __name__ == '__main__':
@@ -1,6 +1,15 @@
+import concurrent.futures
+import gc
+import unicodedata
 import unittest
+import weakref
+import libpuj.pujpb as pb
 import libpuj.pujutils
-from libpuj.pujcommon import Accent, Pronunciation, SandhiGroup, Entry
+from libpuj.convert import DeaccentIndex, load_accents, load_entries, try_deaccent
+from libpuj.pujentries import reading_rank
+from libpuj.pujcommon import (
+    Accent, AccentSet, FuzzyRuleDescriptor, Pronunciation, SandhiGroup, Sentence, Entry,
+)
 from pathlib import Path
 
 
@@ -124,6 +133,206 @@ class AccentActualTonesTest(AccentTestCase):
                     expected_actual_tones,
                 )
 
+    def test_build_sandhi_groups(self):
+        groups = Sentence.build_sandhi_groups('Kuán-kà-lṳ́-nek8--thiann3, ua2 ai3-ki6.')
+        self.assertEqual(['Kuán', 'kà', 'lṳ́', 'nek8', 'thiann3', 'ua2', 'ai3', 'ki6'],
+                         [unicodedata.normalize('NFC', word) for word in groups.words])
+        self.assertEqual([2, 3, 2, 8, 3, 2, 3, 6], groups.tone_numbers)
+        self.assertEqual([(0, 5, 3), (5, 6, 5), (6, 8, 7)], groups.groups)
+        self.assertEqual(len(groups.words), len(groups.contexts))
+
+    def test_sentence_actual_tones(self):
+        test_cases = [
+            [['liah8', 'ngiau2', 'tshur2'], 2],
+            [['si6', 'tua7', 'meng5', 'tshenn1'], 3],
+            [['kuan2', 'ka3', 'lur2', 'nek8', 'thiann3'], 3],
+            [['kio3', 'i1', 'hue5', 'lau6', 'ke1'], 4],
+            [['tsi2', 'ainn3', 'ua2'], 2],
+            [['ia7', 'u6', 'kui2', 'siann5'], 1],
+            [['mai3', 'ke2', 'gau5'], 0],
+            [['ua2'], 0],
+        ]
+        sentence = ' '.join(
+            '-'.join(combs[:citation_index + 1]) + ''.join('--' + comb for comb in combs[citation_index + 1:])
+            for combs, citation_index in test_cases)
+        accents = list(self.pujutils.get_accents())
+        found = Accent.get_sentence_actual_tones_of_accents(accents, sentence)
+        for accent in accents:
+            expected = []
+            for combs, citation_index in test_cases:
+                expected += accent.get_actual_tones(self.create_sandhi_group(combs, citation_index))
+            with self.subTest(accent=accent.id):
+                self.assertEqual(expected, found[accent.id])
+                self.assertEqual(expected, accent.get_sentence_actual_tones(sentence))
+
+
+class AccentCompiledTransitionsTest(AccentTestCase):
+    def test_compiled_matches_regex(self):
+        pujutils = libpuj.pujutils.PUJUtils(
+            (Path(__file__).parent / '..' / 'dist' / 'accents.pb').resolve(),
+            (Path(__file__).parent / '..' / 'dist' / 'entries.pb').resolve(),
+            compile_accents=True,
+        )
+        prons = set(pujutils._possible_pronunciations)
+        for accent in pujutils.get_accents():
+            for pron in prons:
+                expected = accent._fuzzy(pron)
+                self.assertEqual(expected, accent.fuzzy_result(pron), f"{accent.id} {pron}")
+
+    def test_lazy_transitions(self):
+        accent = self.pujutils.get_accent('ChaoZhou_FuCheng')
+        self.assertEqual(Pronunciation('k', 'uinn', 7), accent.fuzzy_result(Pronunciation('k', 'uoinn', 7)))
+        self.assertEqual(('k', 'uinn'), accent._transitions[('k', 'uoinn')])
+        self.assertEqual(Pronunciation('k', 'uinn', 3), accent.fuzzy_result(Pronunciation('k', 'uoinn', 3)))
+
+
+class AccentPossiblePronunciationsMapTest(AccentTestCase):
+    def test_deferred_decoding(self):
+        # 字表中的全部读音到第一次反查时才解码。
+        self.assertIsNone(self.pujutils._possible_pronunciations_list)
+        accent = self.pujutils.get_accent('ChaoZhou_FuCheng')
+        self.assertIn(Pronunciation('k', 'uoinn', 7), accent.candidates_for('kuinn7'))
+        self.assertIs(self.pujutils._possible_pronunciations_list, self.pujutils._possible_pronunciations)
+
+    def test_candidates_for(self):
+        accent = self.pujutils.get_accent('ChaoZhou_FuCheng')
+        self.assertIn(Pronunciation('k', 'uoinn', 7), accent.candidates_for('kuinn7'))
+        self.assertIn(Pronunciation('k', 'uoinn', 7), accent.candidates_for(Pronunciation('k', 'uinn', 7)))
+        self.assertEqual([], accent.candidates_for('kuoinn7'))
+
+    def test_cached_results_are_immutable(self):
+        accent = self.pujutils.get_accent('ChaoZhou_FuCheng')
+        accent.candidates_for('kuinn7')
+        pron = Pronunciation('k', 'uoinn', 7)
+        with self.assertRaises(AttributeError):
+            accent.fuzzy_result(pron).final = 'a'
+        self.assertIs(Pronunciation('k', 'uinn', 7), accent.fuzzy_result(pron))
+        accent.candidates_for('kuinn7').clear()
+        self.assertIn(pron, accent.candidates_for('kuinn7'))
+
+
+class DeaccentIndexTest(AccentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.han_to_entry = load_entries((Path(__file__).parent / '..' / 'dist' / 'entries.pb').resolve())
+
+    def test_deaccent(self):
+        accent = self.pujutils.get_accent('PuNing_LiuSha')
+        index = DeaccentIndex(accent, self.han_to_entry)
+        self.assertEqual('lian7', index.deaccent('练', 'liang7'))
+        self.assertEqual('lian7', index.deaccent('練', 'liang7'))
+        self.assertEqual('lieng7', index.deaccent('练', 'lieng7'))
+        # 又音
+        self.assertEqual('thoinn2', index.deaccent('睇', 'khoinn2'))
+        self.assertEqual(['thoinn2'], index.lookup('睇', 'thoinn2'))
+        self.assertEqual([], index.lookup('睇', 'thainn2'))
+        self.assertIn('lian7', index.candidates('liang7'))
+        self.assertEqual(index.deaccent('练', 'liang7'), try_deaccent('练', 'liang7', accent, self.han_to_entry))
+
+    def test_lazy(self):
+        # 查询单个字时只转换该字的读音；可直接使用按需解码的字表。
+        accent = self.pujutils.get_accent('PuNing_LiuSha')
+        with load_entries((Path(__file__).parent / '..' / 'dist' / 'entries.pb').resolve(), lazy=True) as entries:
+            index = DeaccentIndex(accent, entries)
+            self.assertEqual('lian7', index.deaccent('练', 'liang7'))
+            self.assertEqual({'练'}, set(index._char_maps))
+            self.assertEqual('liang7', index.deaccent('不是汉字', 'liang7'))
+            self.assertEqual({'练'}, set(index._char_maps))
+            self.assertIsNone(index._pron_map)
+            self.assertEqual(DeaccentIndex(accent, self.han_to_entry).candidates('liang7'), index.candidates('liang7'))
+
+    def test_try_deaccent_releases_accent(self):
+        # try_deaccent 缓存的索引不应让口音（及其字表）常驻内存。
+        accents = load_accents(Path(__file__).parent / '..' / 'dist' / 'accents.pb')
+        accent = accents['PuNing_LiuSha']
+        self.assertEqual('lian7', try_deaccent('练', 'liang7', accent, self.han_to_entry))
+        ref = weakref.ref(accent)
+        del accents, accent
+        gc.collect()
+        self.assertIsNone(ref())
+
+
+class PronunciationIndexTest(AccentTestCase):
+    def test_get_entry_from_pronunciation(self):
+        chars = [e.char for e in self.pujutils.get_entry_from_pronunciation('n', 'ang', 5)]
+        # 同样常用时白读（儂）排在俗读（人）之前。
+        self.assertLess(chars.index('儂'), chars.index('人'))
+        entries = self.pujutils.get_entry_from_pronunciation('n', 'ang')
+        self.assertTrue(set(chars) < {e.char for e in entries})
+        self.assertEqual(sorted(entries, key=reading_rank), entries)
+        self.assertEqual([], self.pujutils.get_entry_from_pronunciation('n', 'ang', 4))
+        self.assertIn('人', [e.char for e in self.pujutils.get_entry_from_han('人')])
+
+    def test_common_before_rare(self):
+        # 候选字按常用程度排列：常用的“關”在极少用的“官”（kuan1 为其罕用读音）之前。
+        chars = [e.char for e in self.pujutils.get_entry_from_pronunciation('k', 'uan', 1)]
+        self.assertLess(chars.index('關'), chars.index('官'))
+        freqs = [e.freq for e in self.pujutils.get_entry_from_pronunciation('k', 'uan', 1)]
+        self.assertEqual(pb.EF_COMMON, freqs[0])
+        self.assertEqual(pb.EF_VERY_RARE, freqs[-1])
+        entries = self.pujutils.get_entry_from_prefix('kuan')
+        self.assertEqual(sorted(entries, key=reading_rank), entries)
+
+    def test_prefix(self):
+        entries = self.pujutils.get_entry_from_prefix('tsia')
+        self.assertIn('iang', {e.pron.final for e in entries})
+        self.assertEqual({'ts'}, {e.pron.initial for e in entries})
+        self.assertEqual(len(entries), len(self.pujutils.get_entry_from_pronunciation('ts', 'ia', final_prefix=True)))
+        self.assertEqual({'ts', 'tsh'}, {e.pron.initial for e in self.pujutils.get_entry_from_prefix('ts')})
+
+    def test_accent_pronunciation(self):
+        self.assertEqual([], self.pujutils.get_entry_from_pronunciation('k', 'uinn', 7))
+        entries = self.pujutils.get_entry_from_accent_pronunciation('ChaoZhou_FuCheng', 'k', 'uinn', 7)
+        self.assertIn(Pronunciation('k', 'uoinn', 7), {Pronunciation.from_pb(e.pron) for e in entries})
+        self.assertEqual(self.pujutils.get_entry_from_pronunciation('n', 'ang', 5),
+                         self.pujutils.get_entry_from_accent_pronunciation('Dummy', 'n', 'ang', 5))
+
+
+class AccentSetTest(unittest.TestCase):
+    def setUp(self):
+        self.data = pb.Accents()
+        self.data.ParseFromString((Path(__file__).parent / '..' / 'dist' / 'accents.pb').read_bytes())
+
+    def test_independent_versions(self):
+        # 第二份数据中去掉 N_As_NG 规则的动作，两份数据各自生效，且不改动全局的描述符表。
+        modified = pb.Accents()
+        modified.CopyFrom(self.data)
+        for desc in modified.fuzzy_rule_descriptors:
+            if desc.id == 'N_As_NG':
+                del desc.actions[:]
+        global_descriptors = FuzzyRuleDescriptor.ALL_DESCRIPTORS_MAP
+        original, changed = AccentSet.from_pb(self.data), AccentSet.from_pb(modified)
+        self.assertIs(global_descriptors, FuzzyRuleDescriptor.ALL_DESCRIPTORS_MAP)
+        pron = Pronunciation.from_combination('kuan1')
+        self.assertEqual('kuang1', original['ShanTou_ShiQu'].fuzzy_result(pron).to_combination())
+        self.assertEqual('kuan1', changed['ShanTou_ShiQu'].fuzzy_result(pron).to_combination())
+        self.assertEqual(list(original), list(changed))
+        self.assertIs(original.get_rule(original['ShanTou_ShiQu'].rules_input[0]),
+                      original['ShanTou_ShiQu'].rules[0])
+
+    def test_concurrent_loads(self):
+        words = ['kuan1', 'tsin1', 'ien5', 'or2', 'eu3']
+
+        def load_and_convert(_):
+            accents = AccentSet.from_pb(self.data)
+            return {accent_id: [accent.fuzzy_result(Pronunciation.from_combination(w)) for w in words]
+                    for accent_id, accent in accents.items()}
+
+        expected = load_and_convert(None)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            for found in executor.map(load_and_convert, range(8)):
+                self.assertEqual(expected, found)
+
+    def test_shared_across_threads(self):
+        accent = AccentSet.from_pb(self.data)['ChaoZhou_FuCheng']
+        accent.compile_transitions()
+        prons = [Pronunciation(initial, final, 1) for initial in ('k', 'ts', 'h', '') for final in
+                 ('uan', 'in', 'ien', 'or', 'eu', 'uoinn')]
+        expected = [accent.fuzzy_result(pron) for pron in prons]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: [accent.fuzzy_result(pron) for pron in prons], range(8)))
+        self.assertEqual([expected] * 8, results)
+
 
 if __name__ == '__main__':
     unittest.main()
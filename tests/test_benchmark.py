@@ -0,0 +1,33 @@
+import unittest
+import libpuj.pujpb as pb
+from benchmark import DIST_PATH, build_corpus, compare_results, run_benchmarks
+
+
+class BenchmarkTestCase(unittest.TestCase):
+    def test_corpus_is_deterministic(self):
+        phrases = pb.Phrases()
+        phrases.ParseFromString((DIST_PATH / 'phrases.pb').read_bytes())
+        corpus = build_corpus(phrases, 50)
+        self.assertEqual(50, len(corpus.sentences))
+        self.assertEqual(corpus.sha256(), build_corpus(phrases, 50).sha256())
+        self.assertNotEqual(corpus.sha256(), build_corpus(phrases, 50, seed=1).sha256())
+        self.assertTrue(all(s[0].isupper() and s.endswith('.') for s in corpus.sentences))
+
+    def test_run_and_compare(self):
+        results = run_benchmarks(rounds=1, sentences=20, filters=['parse', 'convert.apuj2puj'])
+        self.assertEqual({'parse.combination', 'parse.written', 'convert.apuj2puj', 'convert.apuj2puj.uncached'},
+                         set(results['results']))
+        for result in results['results'].values():
+            self.assertGreater(result['ops'], 0)
+            self.assertLessEqual(result['p50_us'], result['p99_us'])
+        self.assertEqual([], [c for c in compare_results(results, results) if c['regressed']])
+
+        slower = {'results': {name: dict(result, p50_us=result['p50_us'] * 2, ops_per_sec=result['ops_per_sec'] / 2)
+                              for name, result in results['results'].items()}}
+        comparisons = compare_results(slower, results, threshold=0.5)
+        self.assertTrue(all(c['regressed'] for c in comparisons))
+        self.assertFalse(any(c['regressed'] for c in compare_results(results, slower, threshold=0.5)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import tempfile
+import unittest
+from pathlib import Path
+from click.testing import CliRunner
+from puj import main
+
+
+class CliTestCase(unittest.TestCase):
+    def invoke(self, *args, input=None) -> str:
+        result = CliRunner().invoke(main, ['-c', 'apuj2dp', *args], input=input)
+        self.assertEqual(0, result.exit_code, result.output)
+        return result.stdout
+
+    def test_output_ends_with_newline(self):
+        self.assertEqual('bêng1\n', self.invoke('-i', 'peng1'))
+        self.assertEqual('bêng1\n', self.invoke('-i', 'peng1', '--stream'))
+        # 最后一行没有换行符的输入同样以换行符结尾。
+        self.assertEqual('bêng1\ncoud3\n', self.invoke('-i', '-', '--stream', input='peng1\ntshout3'))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'input.txt'
+            path.write_text('peng1\ntshout3\n', encoding='utf-8')
+            self.assertEqual('bêng1\ncoud3\n', self.invoke('-f', str(path), '--stream'))
+            path.write_text('peng1\ntshout3', encoding='utf-8')
+            self.assertEqual('bêng1\ncoud3\n', self.invoke('-f', str(path), '--stream'))
+
+
+if __name__ == '__main__':
+    unittest.main()
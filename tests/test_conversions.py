@@ -1,6 +1,11 @@
+import gc
+import pickle
+import unicodedata
 import unittest
+import libpuj.pujpb as pb
+import libpuj.pujcommon
 import libpuj.pujutils
-from libpuj.pujcommon import Accent, Pronunciation, IPAPronunciation
+from libpuj.pujcommon import Accent, DPPronunciation, Pronunciation, PronunciationWilliamDuffus, IPAPronunciation, Sentence
 from pathlib import Path
 
 
@@ -120,6 +125,154 @@ class ConversionTestCase(unittest.TestCase):
         expect('h', 'u', 1, 'h', 'u', 1)
         expect('h', 'am', 3, 'h', 'am', 3)
 
+    def test_pronunciation_interned(self):
+        pron = Pronunciation('ch', 'a', 1)
+        self.assertIs(Pronunciation('ts', 'a', 1), pron)
+        self.assertIs(Pronunciation.from_combination('tsa1'), pron)
+        self.assertIs(pickle.loads(pickle.dumps(pron)), pron)
+        self.assertEqual({pron: 1}, {Pronunciation('ts', 'a', 1): 1})
+        self.assertNotEqual(PronunciationWilliamDuffus('ts', 'a', 1), pron)
+        with self.assertRaises(AttributeError):
+            pron.tone = 2
+
+    def test_pronunciation_intern_table_bounded(self):
+        # 潮拼韵尾的写法没有长度限制，任意输入都可能得到新的读音；不再使用的读音应从驻留表中回收。
+        pron = Pronunciation('ts', 'a', 1)
+        gc.collect()
+        size = len(libpuj.pujcommon._INTERNED_PRONUNCIATIONS)
+        for i in range(2000):
+            word = 'ba' + ''.join('mnbdgh'[int(digit) % 6] for digit in str(i)) + 'ng1'
+            self.assertEqual('b', DPPronunciation.from_combination(word).initial)
+        gc.collect()
+        self.assertLessEqual(len(libpuj.pujcommon._INTERNED_PRONUNCIATIONS), size)
+        self.assertIs(Pronunciation('ts', 'a', 1), pron)
+
+    def test_sentence_iter_tokens(self):
+        W, N = Sentence.TOKEN_WORD, Sentence.TOKEN_NON_WORD
+        self.assertEqual([
+            (W, 'i1', 0, 2, 0),
+            (N, ' ', 2, 3, 0),
+            (W, 'au6', 3, 6, 2),
+            (N, '--', 6, 8, 0),
+            (W, 'jit8', 8, 12, 0),
+            (N, ' ', 12, 13, 0),
+            (W, 'kue3', 13, 17, 1),
+            (N, '-', 17, 18, 0),
+            (W, 'la\u0302i', 18, 22, 0),
+            (N, '.', 22, 23, 0),
+        ], list(Sentence.iter_tokens('i1 au6--jit8 kue3-lâi.')))
+        words = []
+        Sentence.for_each_word_in_sentence('au6--jit8', lambda w, h: words.append((w, h)))
+        self.assertEqual([('au6', 2), ('jit8', 0)], words)
+
+
+class TransliteratorTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        dist = (Path(__file__).parent / '..' / 'dist').resolve()
+        cls.pujutils = libpuj.pujutils.PUJUtils(
+            dist / 'accents.pb', dist / 'entries.pb', phrases_pb_path=dist / 'phrases.pb')
+
+    def test_transliterate(self):
+        transliterator = self.pujutils.get_transliterator()
+        # 词表读音优先于逐字读音
+        self.assertEqual('tsiah8 nek8-oinn2。', transliterator.transliterate('食龙眼。'))
+        # 最长匹配
+        self.assertEqual('tsap8-ngou6-menn5-kue3', transliterator.transliterate('十五暝过'))
+        self.assertEqual('ua2 ho2 nang5', transliterator.transliterate('我好人'))
+        self.assertEqual('abc, ua2', transliterator.transliterate('abc, 我'))
+
+    def test_segment(self):
+        segments = self.pujutils.get_transliterator().segment('a龙眼x𠀀食')
+        self.assertEqual(['a', '龙眼', 'x𠀀', '食'], [segment.text for segment in segments])
+        self.assertEqual([None, 'nek8-oinn2', None, 'tsiah8'], [segment.puj for segment in segments])
+        self.assertIn('龙眼', segments[1].phrase.teochew)
+        self.assertIn('sek8', [Pronunciation.from_pb(e.pron).to_combination() for e in segments[3].entries])
+
+
+def _reference_from_written(cls, written: str):
+    """`Pronunciation.from_written` 的原始实现，用于对照测试。"""
+    possible_tone_marks = [
+        [],
+        [],
+        ["\u0301", "\u0341"],
+        ["\u0300", "\u0340"],
+        [],
+        ["\u0302"],
+        ["\u0303", "\u0342", "\u030C", "\u0306"],
+        ["\u0304"],
+        ["\u0301", "\u0341", "\u0302", "\u030D"],
+    ]
+    if not written:
+        return cls()
+    written = unicodedata.normalize('NFD', written)
+    tone = 1
+    for i, possible_marks in enumerate(possible_tone_marks):
+        for possible_tone_mark in possible_marks:
+            if possible_tone_mark in written:
+                written = written.replace(possible_tone_mark, '')
+                tone = i
+                break
+        else:
+            continue
+        break
+    if written[-1].isdigit():
+        if tone:
+            return cls()
+        tone = int(written[-1])
+        if not (1 <= tone <= 8):
+            return cls()
+        written = written[:-1]
+    written = written.replace(cls._special_vowels['ur'], 'ur')
+    written = written.replace(cls._special_vowels['or'], 'or')
+    written = written.replace(cls._special_vowels['nn'], 'nn')
+    if written[-1] in 'ptkhPTKH':
+        tone = 8 if tone else 4
+    match = cls.REGEXP_WORD.match(written)
+    if not match:
+        return cls()
+    initial = match.group('initial') or ''
+    final = match.group('final')
+    return cls(initial, final, tone)
+
+
+class FromWrittenDifferentialTest(unittest.TestCase):
+    def setUp(self):
+        dist = (Path(__file__).parent / '..' / 'dist').resolve()
+        self.entries = pb.Entries()
+        self.entries.ParseFromString((dist / 'entries.pb').read_bytes())
+        self.phrases = pb.Phrases()
+        self.phrases.ParseFromString((dist / 'phrases.pb').read_bytes())
+
+    def expect_same(self, written: str):
+        for cls in (Pronunciation, PronunciationWilliamDuffus):
+            expected = _reference_from_written(cls, written)
+            found = cls.from_written(written)
+            self.assertEqual(
+                (type(expected), expected.initial, expected.final, expected.tone),
+                (type(found), found.initial, found.final, found.tone),
+                f"{cls.__name__} {written!r}")
+
+    def test_entries(self):
+        for entry in self.entries.entries:
+            pron = Pronunciation.from_pb(entry.pron)
+            for written in {pron.to_written(), pron.to_combination(), f"{pron.initial}{pron.final}",
+                            PronunciationWilliamDuffus(pron.initial, pron.final, pron.tone).to_written()}:
+                self.expect_same(written)
+                self.expect_same(written.upper())
+                self.expect_same(unicodedata.normalize('NFC', written))
+
+    def test_phrases(self):
+        words = set()
+        for phrase in self.phrases.phrases:
+            for puj in phrase.puj:
+                Sentence.for_each_word_in_sentence(puj, lambda word, _: words.add(word))
+        for word in words:
+            self.expect_same(word)
+            written = Pronunciation.from_combination(word).to_written()
+            self.expect_same(written)
+            self.expect_same(unicodedata.normalize('NFC', written))
+
 
 if __name__ == '__main__':
     unittest.main()
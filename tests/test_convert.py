@@ -0,0 +1,284 @@
+import dataclasses
+import gc
+import tempfile
+import weakref
+import unittest
+from pathlib import Path
+from libpuj.convert import (
+    ConversionError,
+    ConversionStats,
+    LazyEntries,
+    clear_word_cache,
+    convert,
+    convert_many,
+    load_accents,
+    load_entries,
+    load_phrases,
+    puj2dp,
+    set_word_cache_capacity,
+    word_cache_info,
+)
+from libpuj.pujcommon import Paragraph, Pronunciation, Sentence, SentenceSandhiGroups
+from libpuj.pujentries import EntriesIndex, write_entries_index
+from libpuj.pujphrases import normalize_puj
+
+
+class ConvertManyTestCase(unittest.TestCase):
+    def test_convert_many_same_as_convert(self):
+        texts = ['peng1', 'Tshout3 iann5', 'ua2 xx9', 'peng1', '', 'UA2--NANG5']
+        expected = [convert(text, 'apuj', 'dp') for text in texts]
+        self.assertEqual(expected, list(convert_many(texts, 'apuj', 'dp')))
+
+    def test_convert_many_errors_per_item(self):
+        results = list(convert_many(iter(['peng1', 'xx9', 'xx9 yy9', 'peng1']), 'apuj', 'puj'))
+        self.assertEqual([0, 1, 2, 0], [len(errors) for _, errors in results])
+        self.assertEqual('peng xx9', next(convert_many(['peng1 xx9'], 'apuj', 'puj'))[0])
+
+
+class WordCacheTestCase(unittest.TestCase):
+    def tearDown(self):
+        set_word_cache_capacity(65536)
+        clear_word_cache()
+
+    def test_word_cache(self):
+        clear_word_cache()
+        self.assertEqual(('bêng1 bêng1', []), convert('peng1 peng1', 'apuj', 'dp'))
+        info = word_cache_info()
+        self.assertEqual((1, 1, 1), (info['hits'], info['misses'], info['size']))
+        self.assertEqual('bêng5', puj2dp('pêng'))
+        self.assertEqual('bêng5', puj2dp('pêng'))
+        self.assertEqual(2, word_cache_info()['hits'])
+
+    def test_word_cache_capacity(self):
+        set_word_cache_capacity(2)
+        convert('peng1 tshout3 iann5', 'apuj', 'dp')
+        self.assertEqual(2, word_cache_info()['size'])
+        set_word_cache_capacity(0)
+        self.assertEqual(0, word_cache_info()['size'])
+        self.assertEqual(('bêng1', []), convert('peng1', 'apuj', 'dp'))
+
+    def test_reloaded_accents(self):
+        # 缓存键不引用口音对象：重新加载口音数据后，旧的口音可被回收，同 id 的新口音不会命中旧结果。
+        clear_word_cache()
+        path = Path(__file__).parent / '..' / 'dist' / 'accents.pb'
+        old = load_accents(path)
+        self.assertEqual(('kuang1', []), convert('kuan1', 'apuj', 'apuj', old['ShanTou_ShiQu']))
+        new = load_accents(path)
+        self.assertNotEqual(old['ShanTou_ShiQu'].cache_key, new['ShanTou_ShiQu'].cache_key)
+        self.assertEqual(('kuang1', []), convert('kuan1', 'apuj', 'apuj', new['ShanTou_ShiQu']))
+        self.assertEqual(0, word_cache_info()['hits'])
+        ref = weakref.ref(old['ShanTou_ShiQu'])
+        del old
+        gc.collect()
+        self.assertIsNone(ref())
+
+
+class SandhiTargetTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.accents = load_accents(Path(__file__).parent / '..' / 'dist' / 'accents.pb')
+
+    def test_pitch(self):
+        accent = self.accents['ShanTou_ShiQu']
+        sentence = 'kuan2-ka3-lur2-nek8--thiann3, ua2.'
+        pitches = accent.get_sentence_actual_tones(sentence)
+        self.assertEqual([23, 55, 23, 5, 21, 52], pitches)
+        self.assertEqual(('kuang23-ka55-lur23-nek5--thiann21, ua52.', []),
+                         convert(sentence, 'apuj', 'pitch', fuzzy_rule=accent))
+        self.assertEqual(('Ua52 ho52', []), convert('Uá hó', 'puj', 'pitch', fuzzy_rule=accent))
+
+    def test_ipa_sandhi(self):
+        accent = self.accents['ShanTou_ShiQu']
+        self.assertEqual(('ua˥˨ kʰui˨˩˨', []), convert('ua2 khui3', 'apuj', 'ipa-sandhi', fuzzy_rule=accent))
+        result, errors = convert('ua2-xx9 khui3', 'apuj', 'ipa-sandhi', fuzzy_rule=accent)
+        self.assertEqual('ua˨˧-xx9 kʰui˨˩˨', result)
+        self.assertEqual(1, len(errors))
+
+    def test_same_as_actual_tones(self):
+        sentence = 'si6-tua7-meng5-tshenn1 kio3-i1-hue5-lau6--ke1 tsi2-ainn3-ua2'
+        words = Sentence.build_sandhi_groups(sentence).words
+        for accent in self.accents.values():
+            with self.subTest(accent=accent.id):
+                pitches = accent.get_sentence_actual_tones(sentence)
+                result, _ = convert(sentence, 'apuj', 'pitch', fuzzy_rule=accent)
+                found = [int(word.lstrip('abcdefghijklmnopqrstuvwxyz')) for word in result.replace('--', ' ').replace('-', ' ').split()]
+                self.assertEqual(pitches, found)
+                self.assertEqual(len(words), len(found))
+
+    def test_requires_accent(self):
+        with self.assertRaises(ConversionError):
+            convert('ua2', 'apuj', 'pitch')
+
+    def test_dataclasses(self):
+        self.assertTrue(dataclasses.is_dataclass(SentenceSandhiGroups))
+        self.assertTrue(dataclasses.is_dataclass(Paragraph))
+        sentence = Sentence(entries=[], sandhi_groups=[], word_groups=[])
+        paragraph = Paragraph(sentences=[sentence])
+        self.assertEqual([sentence], paragraph.sentences)
+
+
+class ConversionStatsTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.accent = load_accents(Path(__file__).parent / '..' / 'dist' / 'accents.pb')['ShanTou_ShiQu']
+
+    def setUp(self):
+        clear_word_cache()
+
+    def tearDown(self):
+        clear_word_cache()
+
+    def test_same_results(self):
+        sentences = ['Kuan1-ka3--lur2, ua2 ho2.', 'tsiah8 nek8-oinn2 xx9', 'EU1 SI7']
+        for target in ('puj', 'ipa', 'pitch'):
+            expected = list(convert_many(sentences, 'apuj', target, fuzzy_rule=self.accent))
+            clear_word_cache()
+            stats = ConversionStats()
+            self.assertEqual(expected, list(convert_many(sentences, 'apuj', target, self.accent, stats=stats)))
+            self.assertEqual(len(sentences), stats.snapshot()['stages']['tokenize']['count'])
+
+    def test_counts(self):
+        stats = ConversionStats()
+        result, errors = convert('Kuan1-ka3 ua2 xx9', 'apuj', 'puj', self.accent, stats=stats)
+        self.assertEqual(1, len(errors))
+        convert('ua2', 'apuj', 'puj', self.accent, stats=stats)
+        snapshot = stats.snapshot()
+        stages = snapshot['stages']
+        self.assertEqual(1, snapshot['cache_hits'])
+        self.assertEqual(2, stages['tokenize']['count'])
+        self.assertEqual(2, stages['case']['count'])
+        self.assertEqual(4, stages['parse']['count'])
+        self.assertEqual(3, stages['fuzzy']['count'])
+        self.assertEqual(3, stages['format']['count'])
+        self.assertEqual(0, stages['sandhi']['count'])
+        self.assertEqual({}, snapshot['rules'])
+        stats.reset()
+        self.assertEqual(0, stats.snapshot()['stages']['parse']['count'])
+
+    def test_rule_detail(self):
+        expected = convert('Kuan1-ka3 ua2', 'apuj', 'puj', self.accent)
+        clear_word_cache()
+        stats = ConversionStats(rule_detail=True)
+        self.assertEqual(expected, convert('Kuan1-ka3 ua2', 'apuj', 'puj', self.accent, stats=stats))
+        snapshot = stats.snapshot()
+        self.assertEqual([rule.descriptor_id for rule in self.accent.rules], list(snapshot['rules']))
+        self.assertTrue(all(rule['count'] == 3 for rule in snapshot['rules'].values()))
+
+    def test_sandhi_stages(self):
+        stats = ConversionStats()
+        convert('kuan2-ka3--lur2, ua2.', 'apuj', 'pitch', self.accent, stats=stats)
+        stages = stats.snapshot()['stages']
+        self.assertEqual(1, stages['tokenize']['count'])
+        self.assertEqual(1, stages['sandhi']['count'])
+        self.assertEqual(4, stages['format']['count'])
+
+
+class LazyEntriesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.entries_pb_path = (Path(__file__).parent / '..' / 'dist' / 'entries.pb').resolve()
+
+    def test_same_as_load_entries(self):
+        expected = load_entries(self.entries_pb_path)
+        with load_entries(self.entries_pb_path, lazy=True) as entries:
+            self.assertEqual(list(expected), list(entries))
+            for han in expected:
+                self.assertEqual(expected[han], entries[han])
+
+    def test_decode_on_demand(self):
+        with LazyEntries(self.entries_pb_path) as entries:
+            self.assertEqual({}, entries._entries)
+            self.assertNotIn('x', entries)
+            self.assertIsNone(entries.get('x'))
+            # 繁简同形的字，同一条目在两个键下为同一个对象
+            self.assertIs(entries['人'][0], entries['人'][1])
+            self.assertEqual({entry.index for entry in entries['人']},
+                             {entries.entry(record).index for record in entries._entries})
+
+    def test_empty_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'entries.pb'
+            path.write_bytes(b'')
+            entries = LazyEntries(path)
+            self.assertEqual(0, len(entries))
+            self.assertEqual([], entries.possible_pronunciations())
+
+
+class EntriesIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.entries_pb_path = (Path(__file__).parent / '..' / 'dist' / 'entries.pb').resolve()
+        self.tmp = tempfile.TemporaryDirectory()
+        index_path = Path(self.tmp.name) / 'entries.idx'
+        write_entries_index(self.entries_pb_path, index_path)
+        self.index = EntriesIndex(index_path, self.entries_pb_path)
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def test_same_as_lazy_entries(self):
+        with LazyEntries(self.entries_pb_path) as entries:
+            self.assertEqual(entries.record_count, len(self.index))
+            for han in entries:
+                self.assertEqual(sorted(set(entries.records(han))), self.index.records(han), han)
+            for record in range(entries.record_count):
+                self.assertEqual(entries.pronunciation(record), self.index.pronunciation(record))
+                self.assertEqual(entries.entry(record), self.index.entry(record))
+
+    def test_records_for_pronunciation(self):
+        records = self.index.records_for_pronunciation('n', 'ang', 5)
+        self.assertIn('人', [self.index.char(record) for record in records])
+        self.assertTrue(all(self.index.pronunciation(record) == Pronunciation('n', 'ang', 5) for record in records))
+        all_tones = self.index.records_for_pronunciation('n', 'ang')
+        self.assertTrue(set(records) < set(all_tones))
+        self.assertEqual({'ang'}, {self.index.pronunciation(record).final for record in all_tones})
+        self.assertEqual([], self.index.records_for_pronunciation('x', 'ang'))
+        self.assertEqual([], self.index.records('x'))
+
+    def test_zero_initial(self):
+        # 零声母可写作空字符串或 `0`，与 PUJUtils 的查询一致。
+        records = self.index.records_for_pronunciation('', 'ang', 1)
+        self.assertTrue(records)
+        self.assertEqual(records, self.index.records_for_pronunciation('0', 'ang', 1))
+        self.assertTrue(all(self.index.pronunciation(record) == Pronunciation('', 'ang', 1) for record in records))
+        self.assertEqual(self.index.records_for_pronunciation('ts', 'ia'),
+                         self.index.records_for_pronunciation('ch', 'ia'))
+
+
+class PhraseStoreTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.phrases = load_phrases((Path(__file__).parent / '..' / 'dist' / 'phrases.pb').resolve())
+
+    def test_normalize_puj(self):
+        self.assertEqual('tseng5-senn1', normalize_puj('Tsêng-senn'))
+        self.assertEqual('ua2--nang5', normalize_puj('uá--nâng'))
+        self.assertEqual('tseng1-se', normalize_puj('tseng1-se', partial=True))
+        self.assertEqual('tseng1-se1', normalize_puj('tseng1-se'))
+
+    def test_lookup(self):
+        self.assertEqual(['牲牲'], [p.teochew[0] for p in self.phrases.lookup('puj', 'tseng1-senn1')])
+        self.assertEqual(['牲牲'], [p.teochew[0] for p in self.phrases.lookup('puj', 'tseng-senn')])
+        self.assertEqual(['牲牲'], [p.teochew[0] for p in self.phrases.lookup('cmn', '畜牲')])
+        self.assertEqual(self.phrases.lookup('teochew', '十五夜过'), self.phrases.lookup('teochew', '十五暝过'))
+        self.assertEqual([], self.phrases.lookup('teochew', '不存在'))
+        with self.assertRaises(ValueError):
+            self.phrases.lookup('desc', '')
+
+    def test_prefix(self):
+        phrases = self.phrases.prefix('puj', 'tsap8-ng')
+        self.assertEqual('tsap8-ngou6-menn5', phrases[0].puj[0])
+        self.assertTrue(all(any(puj.startswith('tsap8-ng') for puj in p.puj) for p in phrases))
+        self.assertEqual(1, len(self.phrases.prefix('teochew', '十五', limit=1)))
+        expected = [p for p in self.phrases if any(t.startswith('十五') for t in p.teochew)]
+        self.assertEqual(sorted(p.index for p in expected),
+                         sorted(p.index for p in self.phrases.prefix('teochew', '十五')))
+
+    def test_by_tag(self):
+        tag = self.phrases.tag_display.index('动物')
+        self.assertEqual(self.phrases.by_tag(tag), self.phrases.by_tag('动物'))
+        self.assertTrue(all(tag in p.tag for p in self.phrases.by_tag(tag)))
+        self.assertEqual([], self.phrases.by_tag('不存在'))
+
+
+if __name__ == '__main__':
+    unittest.main()
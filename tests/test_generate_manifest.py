@@ -0,0 +1,48 @@
+import tempfile
+import unittest
+from pathlib import Path
+from libpuj.generate_manifest import BuildManifest
+
+
+class BuildManifestTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.manifest_path = self.dir / 'manifest.json'
+        self.input = self.dir / 'input.yml'
+        self.output = self.dir / 'output.pb'
+        self.input.write_text('a')
+        self.output.write_bytes(b'A')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def record(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record('target', [self.input], [self.output])
+        manifest.save()
+
+    def up_to_date(self, clean=False):
+        return BuildManifest(self.manifest_path, clean=clean).up_to_date('target', [self.input], [self.output])
+
+    def test_up_to_date(self):
+        self.assertFalse(self.up_to_date())
+        self.record()
+        self.assertTrue(self.up_to_date())
+        self.assertFalse(self.up_to_date(clean=True))
+
+    def test_input_changed(self):
+        self.record()
+        self.input.write_text('b')
+        self.assertFalse(self.up_to_date())
+
+    def test_output_changed_or_removed(self):
+        self.record()
+        self.output.write_bytes(b'B')
+        self.assertFalse(self.up_to_date())
+        self.output.unlink()
+        self.assertFalse(self.up_to_date())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import csv
+import io
+import unittest
+from pathlib import Path
+from libpuj.convert import load_accents
+from libpuj.pujcommon import Accent_Dummy, Pronunciation
+from libpuj.pujentries import LazyEntries
+from libpuj.pujprojection import MISSING, project_accents
+
+ROOT_PATH = Path(__file__).parent / '..'
+
+
+class AccentProjectionTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.accents = load_accents(ROOT_PATH / 'dist' / 'accents.pb', compiled=False)
+
+    def test_same_as_fuzzy_result(self):
+        with LazyEntries(ROOT_PATH / 'dist' / 'entries.pb') as entries:
+            prons = list(dict.fromkeys(entries.pronunciation(r) for r in range(entries.record_count)))
+        accents = [*self.accents.values(), Accent_Dummy()]
+        projection = project_accents(accents, prons)
+        self.assertEqual((len(accents), len(prons)), projection.shape)
+        for i, accent in enumerate(accents):
+            with self.subTest(accent=accent.id):
+                self.assertEqual([accent.fuzzy_result(pron) for pron in prons], projection.row(i))
+        self.assertEqual(prons, projection.row('Dummy'))
+        self.assertEqual(len(projection.syllables), len(set(projection.syllables)))
+
+    def test_accents_expected_csv(self):
+        path = ROOT_PATH / 'data' / 'accents_expected.csv'
+        with open(path, encoding='utf-8', newline='') as f:
+            rows = list(csv.reader(f))
+        header = rows[0]
+        accents = [self.accents[row[0].split('/')[1]] for row in rows[1:]]
+        prons = [Pronunciation.from_combination(label.split('/')[1]) for label in header[1:]]
+        output = io.StringIO(newline='')
+        project_accents(accents, prons).write_csv(output, column_labels=header[1:], corner=header[0])
+        self.assertEqual(path.read_text(encoding='utf-8').splitlines(), output.getvalue().splitlines())
+
+    def test_missing(self):
+        # 无法解析的读音（空读音）应用规则失败，与 fuzzy_result 抛出异常对应。
+        accent = self.accents['ShanTou_ShiQu']
+        prons = [Pronunciation.from_combination('kuan1'), Pronunciation()]
+        projection = project_accents([accent], prons)
+        self.assertEqual(MISSING, projection.matrix[1])
+        self.assertEqual([Pronunciation.from_combination('kuang1'), None], projection.row('ShanTou_ShiQu'))
+        output = io.StringIO(newline='')
+        projection.write_tsv(output, column_labels=['关', '空'])
+        self.assertEqual('口音\t关\t空\n汕头市区/ShanTou_ShiQu\tkuang1\t\n', output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import libpuj.pujpb as pb
+from libpuj.pujcommon import Pronunciation
+from libpuj.pujreload import ReloadablePUJUtils
+from pathlib import Path
+
+DIST_PATH = (Path(__file__).parent / '..' / 'dist').resolve()
+
+
+class ReloadablePUJUtilsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        for name in ('accents.pb', 'entries.pb', 'phrases.pb'):
+            shutil.copy(DIST_PATH / name, self.dir / name)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def make_handle(self, **kwargs) -> ReloadablePUJUtils:
+        handle = ReloadablePUJUtils(self.dir / 'accents.pb', self.dir / 'entries.pb',
+                                    phrases_pb_path=self.dir / 'phrases.pb', **kwargs)
+        self.addCleanup(handle.close)
+        return handle
+
+    def replace_accents(self, data: bytes):
+        # 与生成脚本一样写入临时文件再改名，并确保修改时间变化。
+        path = self.dir / 'accents.pb'
+        mtime_ns = path.stat().st_mtime_ns
+        tmp_path = self.dir / 'accents.pb.tmp'
+        tmp_path.write_bytes(data)
+        os.utime(tmp_path, ns=(mtime_ns + 10 ** 9, mtime_ns + 10 ** 9))
+        tmp_path.replace(path)
+
+    def modified_accents(self) -> bytes:
+        # 去掉 N_As_NG 规则的动作，汕头话的 kuan1 不再转为 kuang1。
+        data = pb.Accents()
+        data.ParseFromString((DIST_PATH / 'accents.pb').read_bytes())
+        for desc in data.fuzzy_rule_descriptors:
+            if desc.id == 'N_As_NG':
+                del desc.actions[:]
+        return data.SerializeToString()
+
+    @staticmethod
+    def shantou_kuan1(utils) -> str:
+        return utils.get_accent('ShanTou_ShiQu').fuzzy_result(Pronunciation.from_combination('kuan1')).to_combination()
+
+    def test_reload(self):
+        handle = self.make_handle()
+        old = handle.get()
+        self.assertFalse(handle.check())
+        self.assertIsNone(handle.poll())
+        self.replace_accents(self.modified_accents())
+        self.assertTrue(handle.check())
+        new = handle.poll().result()
+        self.assertIs(new, handle.get())
+        self.assertEqual(2, handle.generation)
+        self.assertFalse(handle.check())
+        # 旧对象仍然完整可用。
+        self.assertEqual('kuang1', self.shantou_kuan1(old))
+        self.assertEqual('kuan1', self.shantou_kuan1(new))
+        self.assertEqual(old.get_entry_from_han('人'), new.get_entry_from_han('人'))
+
+    def test_failed_reload(self):
+        handle = self.make_handle()
+        old = handle.get()
+        self.replace_accents(b'\xff' * 16)
+        with self.assertRaises(Exception):
+            handle.reload().result()
+        self.assertIs(old, handle.get())
+        info = handle.info()
+        self.assertEqual(1, info['generation'])
+        self.assertIsNotNone(info['last_error'])
+        # 同一份损坏的文件不再重复加载，修复后恢复。
+        self.assertFalse(handle.check())
+        self.replace_accents(self.modified_accents())
+        handle.poll().result()
+        self.assertEqual(2, handle.generation)
+        self.assertIsNone(handle.info()['last_error'])
+
+    def test_use_hash(self):
+        handle = self.make_handle(use_hash=True)
+        path = self.dir / 'accents.pb'
+        mtime_ns = path.stat().st_mtime_ns + 10 ** 9
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+        self.assertFalse(handle.check())
+        self.replace_accents(self.modified_accents())
+        self.assertTrue(handle.check())
+
+    def test_watch(self):
+        handle = self.make_handle()
+        handle.watch(interval=0.01)
+        self.replace_accents(self.modified_accents())
+        deadline = time.monotonic() + 30
+        while handle.generation == 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        handle.stop_watching()
+        self.assertEqual(2, handle.generation)
+        self.assertEqual('kuan1', self.shantou_kuan1(handle.get()))
+
+    def test_info(self):
+        info = self.make_handle(trace_memory=True).info()
+        self.assertEqual({'accents', 'entries', 'phrases'}, set(info['data_sets']))
+        for name, data_set in info['data_sets'].items():
+            self.assertEqual(str(self.dir / f'{name}.pb'), data_set['path'])
+            self.assertEqual((self.dir / f'{name}.pb').stat().st_size, data_set['size'])
+            self.assertGreater(data_set['seconds'], 0)
+            self.assertGreater(data_set['memory'], 0)
+        self.assertFalse(info['reloading'])
+
+
+if __name__ == '__main__':
+    unittest.main()
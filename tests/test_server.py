@@ -0,0 +1,116 @@
+import asyncio
+import gc
+import json
+import tempfile
+import unittest
+import libpuj.pujcommon
+from pathlib import Path
+from libpuj.pujserver import ConversionServer
+
+
+class ConversionServerTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        dist = (Path(__file__).parent / '..' / 'dist').resolve()
+        cls.server = ConversionServer(dist / 'accents.pb', dist / 'entries.pb')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close()
+
+    def test_convert(self):
+        self.assertEqual({'id': 1, 'result': 'bêng1 xx9', 'errors': ["无法解析白话字拼音：'xx9'"]},
+                         self.server.handle({'id': 1, 'text': 'peng1 xx9', 'target': 'dp'}))
+        self.assertEqual({'results': ['ua52', 'ho52'], 'errors': [[], []]},
+                         self.server.handle({'text': ['ua2', 'ho2'], 'target': 'pitch', 'accent': 'ShanTou_ShiQu'}))
+
+    def test_deaccent(self):
+        response = self.server.handle({'text': '练/lieng7 x', 'deaccent': True, 'accent': 'ChaoZhou_FuCheng'})
+        self.assertEqual('lian7 x', response['result'])
+        self.assertEqual(1, len(response['errors']))
+
+    def test_request_errors(self):
+        self.assertIn('error', self.server.handle({'id': 2, 'text': 'ua2', 'accent': 'Nope'}))
+        self.assertIn('error', self.server.handle({'text': 'ua2', 'target': 'nope'}))
+        self.assertIn('error', self.server.handle({'text': 1}))
+        self.assertIn('error', self.server.handle({'text': 'ua2', 'deaccent': True}))
+        self.assertIn('error', json.loads(self.server.handle_line('not json')))
+
+    def test_unix_socket(self):
+        requests = [{'id': i, 'text': f'peng{i % 8 + 1}', 'target': 'dp'} for i in range(50)]
+
+        async def client(path):
+            reader, writer = await asyncio.open_unix_connection(str(path))
+            writer.write(''.join(json.dumps(request) + '\n' for request in requests).encode('utf-8'))
+            await writer.drain()
+            responses = [json.loads(await reader.readline()) for _ in requests]
+            writer.close()
+            return responses
+
+        async def run(path):
+            server = await self.server.start_unix_server(path)
+            async with server:
+                return await asyncio.gather(client(path), client(path))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            results = asyncio.run(run(Path(tmp) / 'puj.sock'))
+        for responses in results:
+            self.assertEqual(list(range(50)), [response['id'] for response in responses])
+            self.assertEqual('bêng1', responses[0]['result'])
+
+    def test_line_too_long(self):
+        # 过长的行以错误响应代替，其后的请求照常处理；连接末尾没有换行的过长数据同样如此。
+        async def client(path):
+            reader, writer = await asyncio.open_unix_connection(str(path))
+            long_request = json.dumps({'id': 'long', 'text': 'peng1 ' * 1000})
+            writer.write(f'{long_request}\n{{"id": 1, "text": "peng1", "target": "dp"}}\n{long_request}'.encode('utf-8'))
+            writer.write_eof()
+            responses = [json.loads(line) async for line in reader]
+            writer.close()
+            return responses
+
+        async def run(path):
+            server = await self.server.start_unix_server(path, limit=1024)
+            async with server:
+                return await client(path)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            responses = asyncio.run(run(Path(tmp) / 'puj.sock'))
+        self.assertEqual(3, len(responses))
+        self.assertIn('1024', responses[0]['error'])
+        self.assertEqual({'id': 1, 'result': 'bêng1', 'errors': []}, responses[1])
+        self.assertIn('error', responses[2])
+
+    def test_memory_bounded(self):
+        # 客户端发送的大量不同输入不应让常驻服务的内存无限增长：读音驻留表与反推索引的大小有上限。
+        words = ['ba' + ''.join('mnbdgh'[int(digit) % 6] for digit in str(i)) + 'ng1' for i in range(3000)]
+        requests = [{'id': i, 'text': words[i:i + 10], 'source': 'dp', 'target': 'puj'} for i in range(0, len(words), 10)]
+        requests += [{'id': f'd{i}', 'text': f'字{i}/liang7 练/liang7', 'deaccent': True, 'accent': 'PuNing_LiuSha'}
+                     for i in range(300)]
+
+        async def client(path):
+            reader, writer = await asyncio.open_unix_connection(str(path))
+            writer.write(''.join(json.dumps(request) + '\n' for request in requests).encode('utf-8'))
+            await writer.drain()
+            responses = [json.loads(await reader.readline()) for _ in requests]
+            writer.close()
+            return responses
+
+        async def run(path):
+            server = await self.server.start_unix_server(path)
+            async with server:
+                return await client(path)
+
+        gc.collect()
+        interned = len(libpuj.pujcommon._INTERNED_PRONUNCIATIONS)
+        with tempfile.TemporaryDirectory() as tmp:
+            responses = asyncio.run(run(Path(tmp) / 'puj.sock'))
+        self.assertTrue(all('error' not in response for response in responses))
+        self.assertEqual('lian7', responses[-1]['result'].split()[1])
+        gc.collect()
+        self.assertLess(len(libpuj.pujcommon._INTERNED_PRONUNCIATIONS), interned + 100)
+        self.assertLessEqual(len(self.server._deaccent_index('PuNing_LiuSha')._char_maps), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()